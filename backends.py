@@ -0,0 +1,258 @@
+"""MILP backends for the pattern model.
+
+``patterns.solve_master`` builds a PuLP problem and hands it to one of the
+registered backends:
+
+- ``cbc``: CBC as a subprocess through PuLP (always available). The model
+  is written to a temp file and CBC started per solve, but it takes the
+  heuristic warm start and is killed together with the worker on cancel.
+- ``highs``: HiGHS in-process through PuLP (needs ``highspy``)
+- ``scipy``: SciPy's ``milp``/``linprog`` (HiGHS) in-process, straight from
+  the model's matrices (needs ``scipy``)
+
+Neither in-process backend takes a warm start, so the exact engines give
+them the incumbent's waste as a cutoff instead (see ``Backend.warm_starts``).
+
+``"auto"`` picks by model size: the process start and temp file round trip
+of CBC cost about 5 ms here and several times that on Windows, more than a
+small model takes to solve, so models up to ``IN_PROCESS_MAX_COLUMNS``
+patterns go to an in-process backend when one is installed. Larger models
+go to CBC, where the warm start pays for the start-up.
+"""
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pulp as plp
+
+# Pattern columns up to which an in-process backend is preferred
+IN_PROCESS_MAX_COLUMNS = 5000
+
+
+class ScipyMilp(plp.LpSolver):
+    """PuLP solver that runs SciPy's HiGHS bindings in-process.
+
+    Integer problems go to ``scipy.optimize.milp``; continuous ones to
+    ``linprog`` so the constraint duals are available for pricing.
+    ``milp`` has no cutoff option, so a ``cutoff`` is added as an objective
+    row.
+    """
+    name = "SCIPY_MILP"
+
+    def __init__(self, *args, cutoff=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cutoff = cutoff
+
+    def available(self):
+        try:
+            from scipy.optimize import milp  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def actualSolve(self, lp):
+        from scipy.optimize import Bounds, LinearConstraint, linprog, milp
+        from scipy.sparse import csr_matrix
+
+        variables = lp.variables()
+        index = {v.name: i for i, v in enumerate(variables)}
+        c = np.zeros(len(variables))
+        for v, coef in lp.objective.items():
+            c[index[v.name]] = coef
+        lb = np.array([-np.inf if v.lowBound is None else v.lowBound for v in variables], dtype=float)
+        ub = np.array([np.inf if v.upBound is None else v.upBound for v in variables], dtype=float)
+
+        names = list(lp.constraints)
+        rows, cols, data = [], [], []
+        rhs = np.zeros(len(names))
+        sense = np.zeros(len(names), dtype=int)
+        for r, name in enumerate(names):
+            con = lp.constraints[name]
+            for v, coef in con.items():
+                rows.append(r)
+                cols.append(index[v.name])
+                data.append(coef)
+            rhs[r] = -con.constant
+            sense[r] = con.sense
+        A = csr_matrix((data, (rows, cols)), shape=(len(names), len(variables)))
+
+        options = {"disp": bool(self.msg)}
+        if self.timeLimit is not None:
+            options["time_limit"] = self.timeLimit
+        integrality = np.array([v.cat == plp.LpInteger for v in variables], dtype=int)
+
+        if self.mip and integrality.any():
+            lo = np.where(sense == plp.LpConstraintLE, -np.inf, rhs)
+            hi = np.where(sense == plp.LpConstraintGE, np.inf, rhs)
+            constraints = [LinearConstraint(A, lo, hi)]
+            if self.cutoff is not None:
+                constraints.append(LinearConstraint(c, -np.inf, self.cutoff - (lp.objective.constant or 0.0)))
+            res = milp(c, constraints=constraints, integrality=integrality,
+                       bounds=Bounds(lb, ub), options=options)
+            if res.status == 0:
+                status, sol_status = plp.LpStatusOptimal, plp.LpSolutionOptimal
+            elif res.x is not None:
+                # Time limit with an integer solution, as CBC reports it
+                status, sol_status = plp.LpStatusOptimal, plp.LpSolutionIntegerFeasible
+            else:
+                status, sol_status = {2: (plp.LpStatusInfeasible, plp.LpSolutionInfeasible),
+                                      3: (plp.LpStatusUnbounded, plp.LpSolutionUnbounded)}.get(
+                    res.status, (plp.LpStatusNotSolved, plp.LpSolutionNoSolutionFound))
+        else:
+            eq = sense == plp.LpConstraintEQ
+            # linprog takes A_ub @ x <= b_ub, so >= rows are negated
+            flip = np.where(sense == plp.LpConstraintGE, -1.0, 1.0)[~eq]
+            A_ub = A[~eq].multiply(flip[:, None]).tocsr()
+            res = linprog(c, A_ub=A_ub if len(flip) else None, b_ub=rhs[~eq] * flip if len(flip) else None,
+                          A_eq=A[eq] if eq.any() else None, b_eq=rhs[eq] if eq.any() else None,
+                          bounds=list(zip(lb, ub)), method="highs", options=options)
+            if res.status == 0:
+                status, sol_status = plp.LpStatusOptimal, plp.LpSolutionOptimal
+                pi = np.zeros(len(names))
+                if eq.any():
+                    pi[eq] = res.eqlin.marginals
+                if len(flip):
+                    pi[~eq] = res.ineqlin.marginals * flip
+                lp.assignConsPi(dict(zip(names, pi)))
+            else:
+                status, sol_status = {2: (plp.LpStatusInfeasible, plp.LpSolutionInfeasible),
+                                      3: (plp.LpStatusUnbounded, plp.LpSolutionUnbounded)}.get(
+                    res.status, (plp.LpStatusNotSolved, plp.LpSolutionNoSolutionFound))
+
+        self.result = res
+        if res.x is not None:
+            lp.assignVarsVals({v.name: float(x) for v, x in zip(variables, res.x)})
+        lp.assignStatus(status, sol_status)
+        return status
+
+
+# Summary lines at the end of a CBC log and the statistic each one holds
+CBC_LOG_FIELDS = {
+    "Objective value": "objective",
+    "Lower bound": "best_bound",
+    "Gap": "gap",
+    "Enumerated nodes": "nodes",
+    "Total iterations": "iterations",
+    "Time (CPU seconds)": "cpu",
+}
+
+
+def parse_cbc_log(path):
+    """Node count, best bound, gap etc. from a CBC log file."""
+    stats = {}
+    try:
+        with open(path) as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return stats
+    for line in lines:
+        if line.startswith("Result - "):
+            stats["result"] = line[len("Result - "):].strip()
+        key, sep, value = line.partition(":")
+        if sep and key.strip() in CBC_LOG_FIELDS:
+            try:
+                stats[CBC_LOG_FIELDS[key.strip()]] = float(value.split()[0])
+            except (ValueError, IndexError):
+                pass
+    # CBC only prints the bound and gap when it stops early
+    if stats.get("result", "").startswith("Optimal") and "objective" in stats:
+        stats.setdefault("best_bound", stats["objective"])
+        stats.setdefault("gap", 0.0)
+    return stats
+
+
+def _cbc_stats(solver, lp, log_path):
+    return {} if log_path is None else parse_cbc_log(log_path)
+
+
+def _highs_stats(solver, lp, log_path):
+    info = lp.solverModel.getInfo()
+    return {"nodes": info.mip_node_count, "best_bound": info.mip_dual_bound, "gap": info.mip_gap,
+            "iterations": info.simplex_iteration_count}
+
+
+def _scipy_stats(solver, lp, log_path):
+    res = getattr(solver, "result", None)
+    if res is None:
+        return {}
+    return {"nodes": getattr(res, "mip_node_count", None), "best_bound": getattr(res, "mip_dual_bound", None),
+            "gap": getattr(res, "mip_gap", None), "iterations": getattr(res, "nit", None)}
+
+
+@dataclass(frozen=True)
+class Backend:
+    """A registered MILP backend.
+
+    ``make(msg, time_limit, warm_start, log_path, seed=None, cutoff=None)``
+    returns the PuLP solver object; ``log_path`` is only used by backends
+    with ``writes_log``. ``seed`` varies the solver's random choices and
+    ``cutoff`` prunes every solution not better than it, where supported.
+    ``stats(solver, problem, log_path)`` returns the solver statistics after
+    a solve. ``warm_starts`` tells whether the solver starts from the
+    initial values of the variables.
+    """
+    name: str
+    in_process: bool
+    make: Callable[..., plp.LpSolver]
+    stats: Callable[[plp.LpSolver, plp.LpProblem, Optional[str]], dict]
+    writes_log: bool = False
+    warm_starts: bool = False
+
+    def available(self) -> bool:
+        return self.make(False, None, False, None).available()
+
+
+BACKENDS: Dict[str, Backend] = {}
+
+
+def register(backend: Backend) -> None:
+    BACKENDS[backend.name] = backend
+
+
+def _make_cbc(msg, time_limit, warm, log_path, seed=None, cutoff=None):
+    options = []
+    if seed is not None:
+        options.append(f"randomCbcSeed {int(seed)}")
+    if cutoff is not None:
+        options.append(f"cutoff {float(cutoff)!r}")
+    return plp.PULP_CBC_CMD(msg=msg, timeLimit=time_limit, warmStart=warm, logPath=log_path, options=options)
+
+
+def _make_highs(msg, time_limit, warm, log_path, seed=None, cutoff=None):
+    params = {}
+    if seed is not None:
+        params["random_seed"] = int(seed)
+    if cutoff is not None:
+        params["objective_bound"] = float(cutoff)
+    return plp.HiGHS(msg=msg, timeLimit=time_limit, **params)
+
+
+def _make_scipy(msg, time_limit, warm, log_path, seed=None, cutoff=None):
+    return ScipyMilp(msg=msg, timeLimit=time_limit, cutoff=cutoff)
+
+
+register(Backend("cbc", False, _make_cbc, _cbc_stats, writes_log=True, warm_starts=True))
+register(Backend("highs", True, _make_highs, _highs_stats))
+register(Backend("scipy", True, _make_scipy, _scipy_stats))
+
+
+def available_backends() -> List[str]:
+    """Names of the installed backends, ``"auto"`` first."""
+    return ["auto"] + [name for name, backend in BACKENDS.items() if backend.available()]
+
+
+def choose_backend(name: str, columns: int) -> Backend:
+    """Resolve ``name`` (or ``"auto"``) for a model with ``columns`` patterns."""
+    if name != "auto":
+        backend = BACKENDS.get(name)
+        if backend is None:
+            raise ValueError(f"Unknown solver backend: {name}")
+        if not backend.available():
+            raise ValueError(f"Solver backend {name} is not installed")
+        return backend
+    if columns <= IN_PROCESS_MAX_COLUMNS:
+        for backend in BACKENDS.values():
+            if backend.in_process and backend.available():
+                return backend
+    return BACKENDS["cbc"]
+
@@ -0,0 +1,306 @@
+"""Benchmark suite for the solver engines.
+
+Generates reproducible bin-packing style instances, solves each one with
+every requested engine, and times the phases separately:
+
+- ``parse``: parsing the order from its comma separated text form
+- the phases of the solve's trace (see ``solve_trace``): ``validate``,
+  ``presolve``, ``engine`` and inside it ``build`` (pattern enumeration and
+  the PuLP model) and ``solve`` (the backend run), then ``verify``
+- ``render``: formatting the results text and drawing the plan off-screen
+  as the desktop app does (text only without matplotlib)
+
+Each case is run ``--repeats`` times and the median of every phase is
+kept, so one slow run does not count. Results, with waste and gap, are
+written as JSON. A run can be compared against a stored baseline; phases
+that are slower by more than the relative tolerance and by more than
+``--min-delta`` seconds are reported and make the command exit with
+status 1.
+
+Instance families (classic bin-packing benchmarks, mapped to one stock
+length with enough bars for a first-fit-decreasing packing):
+
+- ``uniform``: Falkenauer U, item sizes uniform in [20, 100], capacity 150
+- ``triplet``: Falkenauer T, capacity 1000, items in triplets that fill a
+  bar exactly
+- ``hard``: hard28-like, capacity 1000, ~180-200 items with sizes spread
+  over [1, 800]
+
+``--startup`` times the desktop app's cold start instead, each in a fresh
+interpreter (best of ``--runs``):
+
+- ``solver_import``: importing ``stock_solver``
+- ``first_window``: until the app window is drawn (needs ``customtkinter``
+  and a display, skipped otherwise)
+- ``app_ready``: until the background imports are done and the plot is set up
+- ``first_result``: until the app's solve worker returns a small plan
+
+Usage::
+
+    python benchmark.py --output bench.json
+    python benchmark.py --baseline bench.json --tolerance 0.25 --repeats 5
+    python benchmark.py --startup --output startup.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+
+from solve_trace import Trace
+from stock_solver import SolveOptions, parse_lengths, parse_stock, solve
+
+try:
+    from plan_renderer import render_image
+except ImportError:  # matplotlib is only needed by the desktop app
+    render_image = None
+
+FAMILIES = ("uniform", "triplet", "hard")
+# Slowdowns below this many seconds are noise, whatever their ratio
+MIN_DELTA = 0.02
+
+
+def _ffd_bins(items, capacity):
+    """Number of bars a first-fit-decreasing packing needs."""
+    bins = []
+    for size in sorted(items, reverse=True):
+        for i, left in enumerate(bins):
+            if left >= size:
+                bins[i] -= size
+                break
+        else:
+            bins.append(capacity - size)
+    return len(bins)
+
+
+def generate(family, n, seed):
+    """Reproducible instance as ``(stock, pieces, min_qty)``."""
+    rng = np.random.default_rng(seed)
+    if family == "uniform":
+        capacity = 150
+        items = rng.integers(20, 101, n).tolist()
+    elif family == "triplet":
+        capacity = 1000
+        items = []
+        for _ in range(n // 3):
+            a = int(rng.integers(380, 491))
+            b = int(rng.integers(250, (capacity - a) // 2 + 1))
+            items += [a, b, capacity - a - b]
+    elif family == "hard":
+        capacity = 1000
+        items = rng.integers(1, 801, int(rng.integers(180, 201))).tolist()
+    else:
+        raise ValueError(f"Unknown instance family: {family}")
+
+    demand = Counter(items)
+    pieces = sorted(demand, reverse=True)
+    if family == "triplet":
+        bars = len(items) // 3
+    else:
+        bars = _ffd_bins(items, capacity)
+    return [(capacity, bars)], pieces, [demand[p] for p in pieces]
+
+
+def _format(values):
+    return ",".join(f"{v:g}" for v in values)
+
+
+def run_once(instance, engine, time_limit, backend="auto"):
+    """Phase times of one solve, and its plan (``None`` with the error message if it failed)."""
+    stock, pieces, min_qty = instance
+    phases = {}
+
+    text = (",".join(f"{l:g}x{c}" for l, c in stock), _format(pieces), _format(min_qty))
+    start = time.perf_counter()
+    parsed = (parse_stock(text[0]), parse_lengths(text[1]), parse_lengths(text[2]))
+    phases["parse"] = time.perf_counter() - start
+
+    trace = Trace()
+    try:
+        plan = solve(*parsed, SolveOptions(engine=engine, time_limit=time_limit, backend=backend, trace=trace))
+    except ValueError as e:
+        plan, error = None, str(e)
+    phases.update((name, t["wall"]) for name, t in trace.phases.items())
+    if plan is None:
+        return phases, None, error
+
+    start = time.perf_counter()
+    "\n".join(plan.lines())
+    if render_image is not None:
+        render_image(plan)
+    phases["render"] = time.perf_counter() - start
+    return phases, plan, None
+
+
+def run_case(name, instance, engine, time_limit, backend="auto", repeats=1):
+    """Median phase times of ``repeats`` solves of ``instance``, with the last plan's quality."""
+    runs = []
+    for _ in range(repeats):
+        phases, plan, error = run_once(instance, engine, time_limit, backend)
+        if plan is None:
+            return {"instance": name, "engine": engine, "phases": phases, "error": error}
+        runs.append(phases)
+    phases = {phase: float(np.median([r[phase] for r in runs if phase in r])) for phase in runs[0]}
+    # build and solve are timed inside engine
+    total = sum(seconds for phase, seconds in phases.items() if phase not in ("build", "solve"))
+    return {
+        "instance": name,
+        "engine": engine,
+        "phases": phases,
+        "total": total,
+        "waste": plan.total_waste,
+        "lower_bound": plan.lower_bound,
+        "gap": plan.gap,
+        "status": plan.status,
+        "repeats": repeats,
+    }
+
+
+# Child scripts for the startup benchmark; each prints a line per milestone
+STARTUP_SCRIPTS = {
+    "solver_import": "import stock_solver\nprint('solver_import', flush=True)",
+    "first_window": (
+        "import customtkinter as ctk\n"
+        "import stock_cutter_gui\n"
+        "root = ctk.CTk()\n"
+        "app = stock_cutter_gui.StockCutterGUI(root)\n"
+        "root.update()\n"
+        "print('first_window', flush=True)\n"
+        "app.ensure_ready()\n"
+        "root.update()\n"
+        "print('app_ready', flush=True)\n"
+        "app.on_close()"),
+    "first_result": (
+        "import time\n"
+        "from solve_worker import SolveWorker\n"
+        "worker = SolveWorker()\n"
+        "worker.start()\n"
+        "from stock_solver import SolveOptions\n"
+        "worker.submit([13, 10], [5, 2], [2, 0], SolveOptions())\n"
+        "while not any(kind == 'done' for kind, _ in worker.poll()):\n"
+        "    time.sleep(0.005)\n"
+        "print('first_result', flush=True)\n"
+        "worker.shutdown()"),
+}
+
+
+def time_startup(script):
+    """Seconds from launching a fresh interpreter to each milestone it prints."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    start = time.perf_counter()
+    child = subprocess.Popen([sys.executable, "-c", script], cwd=here, stdout=subprocess.PIPE,
+                             stderr=subprocess.DEVNULL, text=True)
+    milestones = {}
+    for line in child.stdout:
+        milestones[line.strip()] = time.perf_counter() - start
+    child.wait()
+    return milestones
+
+
+def run_startup(runs=3):
+    """Best cold start times of the app milestones over ``runs`` launches."""
+    phases = {"solver_import": None, "first_window": None, "app_ready": None, "first_result": None}
+    for script in STARTUP_SCRIPTS.values():
+        for _ in range(runs):
+            for name, seconds in time_startup(script).items():
+                if name in phases and (phases[name] is None or seconds < phases[name]):
+                    phases[name] = seconds
+    return {"instance": "startup", "engine": "app", "phases": phases,
+            "total": max((v for v in phases.values() if v is not None), default=0.0)}
+
+
+def compare(results, baseline, tolerance, min_delta=MIN_DELTA):
+    """Regressions of ``results`` against ``baseline`` as readable strings.
+
+    A phase regresses when it is slower by more than ``tolerance`` of its
+    baseline time and by more than ``min_delta`` seconds.
+    """
+    previous = {(r["instance"], r["engine"]): r for r in baseline["results"]}
+    problems = []
+    for r in results:
+        old = previous.get((r["instance"], r["engine"]))
+        if old is None or "error" in r or "error" in old:
+            continue
+        for phase, seconds in r["phases"].items():
+            before = old["phases"].get(phase)
+            if seconds is None or before is None:
+                continue
+            if seconds - before > max(before * tolerance, min_delta):
+                problems.append(f"{r['instance']} [{r['engine']}] {phase}: "
+                                f"{before * 1e3:.1f} ms -> {seconds * 1e3:.1f} ms")
+        if "waste" in r and r["waste"] > old["waste"] + 1e-6:
+            problems.append(f"{r['instance']} [{r['engine']}] waste: {old['waste']:g} -> {r['waste']:g}")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the stock cutting engines.")
+    parser.add_argument("--engines", default="milp,colgen,fast", help="comma separated engines")
+    parser.add_argument("--families", default=",".join(FAMILIES), help="comma separated instance families")
+    parser.add_argument("--sizes", default="60,120,249", help="comma separated item counts")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--time-limit", type=float, default=30)
+    parser.add_argument("--backend", default="auto", help="MILP backend for milp and colgen")
+    parser.add_argument("--output", default=None, help="write results as JSON")
+    parser.add_argument("--baseline", default=None, help="JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown")
+    parser.add_argument("--min-delta", type=float, default=MIN_DELTA,
+                        help="slowdowns below this many seconds are ignored")
+    parser.add_argument("--repeats", type=int, default=3, help="solves per case; phase medians are kept")
+    parser.add_argument("--startup", action="store_true", help="time the app's cold start instead")
+    parser.add_argument("--runs", type=int, default=3, help="launches per startup milestone")
+    args = parser.parse_args(argv)
+
+    engines = [] if args.startup else args.engines.split(",")
+    families = [] if args.startup else args.families.split(",")
+    results = []
+    if args.startup:
+        r = run_startup(args.runs)
+        results.append(r)
+        for name, seconds in r["phases"].items():
+            print(f"{name:<14} " + ("skipped" if seconds is None else f"{seconds * 1e3:9.1f} ms"))
+    if engines:
+        # The first solve and render of a process pay for lazy imports and font loading
+        run_once(generate("uniform", 6, args.seed), "fast", args.time_limit)
+    for family in families:
+        sizes = [None] if family == "hard" else [int(s) for s in args.sizes.split(",")]
+        for size in sizes:
+            name = f"{family}" if size is None else f"{family}_{size}"
+            instance = generate(family, size, args.seed)
+            for engine in engines:
+                r = run_case(f"{name}_s{args.seed}", instance, engine, args.time_limit, args.backend,
+                             args.repeats)
+                results.append(r)
+                if "error" in r:
+                    print(f"{r['instance']:<22} {engine:<7} error: {r['error']}")
+                else:
+                    print(f"{r['instance']:<22} {engine:<7} {r['total'] * 1e3:9.1f} ms  "
+                          f"waste {r['waste']:<8g} gap {r['gap']:.2%}  {r['status']}")
+
+    report = {
+        "meta": {"python": platform.python_version(), "platform": platform.platform(),
+                 "seed": args.seed, "time_limit": args.time_limit, "backend": args.backend,
+                 "repeats": args.repeats},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        problems = compare(results, baseline, args.tolerance, args.min_delta)
+        for p in problems:
+            print(f"REGRESSION {p}")
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
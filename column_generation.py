@@ -0,0 +1,253 @@
+"""Gilmore-Gomory column generation engine.
+
+Works on the pattern model from ``patterns``: instead of enumerating every
+pattern up front, the LP master is solved over a growing pool, new patterns
+are priced with an exact knapsack subproblem per stock type, and the final LP is
+turned into an integer plan by rounding with a knapsack repair and by an
+integer solve over the generated pool, whichever is better. When rounding
+cannot meet the demand (pools priced for the LP often lack the exact
+patterns an integer plan needs), the LP is dived instead: the rounded-down
+columns, or the largest one, are fixed and the residual is priced again
+until it is small enough to solve over all its patterns. The heuristics are
+the last resort, so a plan is only refused when they fail too.
+"""
+import math
+import time
+
+import numpy as np
+import pulp as plp
+
+from heuristics import solve_heuristic
+from patterns import (EPS, enumerate_patterns, exact_knapsack, fill_bar, knapsack, solve_master,
+                      usage_from_values, usage_produced, usage_waste)
+
+# Single-bar fixes a dive may undo before it gives up
+DIVE_BACKTRACKS = 20
+# Share of the time left after pricing that a dive may take
+DIVE_SHARE = 0.5
+# Patterns per stock type up to which a dive's residual is solved exactly
+RESIDUAL_PATTERNS = 2000
+
+
+def solve_colgen(lengths, counts, piezas, lim_inf, time_limit=None, msg=False, max_iterations=500,
+                 on_incumbent=None, backend="auto", trace=None, initial=None):
+    """Solve the cutting model by column generation.
+
+    ``on_incumbent(waste, bound, usage)`` is called with the rounded plan
+    before the integer master runs. ``backend`` is the MILP backend for the masters and
+    ``trace`` an optional ``solve_trace.Trace`` for their statistics.
+    ``initial`` is a plan found elsewhere (such as the heuristic's); it warm
+    starts the integer master and is kept if nothing better is found.
+
+    Returns ``(usage, status, bound)`` where ``usage`` is a list of
+    ``(type, pattern, multiplicity)`` triples and ``bound`` the LP lower bound
+    on the waste, or ``None`` if pricing did not finish.
+    """
+    deadline = None if time_limit is None else time.monotonic() + time_limit
+    n = len(piezas)
+
+    # Initial pool: homogeneous patterns plus an empty pattern per type
+    columns = []
+    seen = set()
+
+    def add(k, a):
+        key = (k, tuple(int(x) for x in a))
+        if key not in seen:
+            seen.add(key)
+            columns.append((k, np.asarray(a, dtype=int)))
+            return True
+        return False
+
+    for k, length in enumerate(lengths):
+        add(k, np.zeros(n, dtype=int))
+        for j in range(n):
+            if piezas[j] <= length + EPS:
+                a = np.zeros(n, dtype=int)
+                a[j] = int((length + EPS) // piezas[j])
+                add(k, a)
+    for k, a, _ in initial or ():
+        add(k, a)
+
+    pricing = dict(add=add, deadline=deadline, max_iterations=max_iterations, msg=msg, backend=backend,
+                   trace=trace)
+    lp_y, slack, lp_value, proven = _generate(lengths, counts, piezas, lim_inf, columns, **pricing)
+    lp_bound = None
+    if proven:
+        if slack > 1e-6:
+            raise ValueError("Demand cannot be met with the available stock")
+        lp_bound = lp_value
+
+    # Rounding: floor the LP and repair the leftover bars with knapsack fills
+    # (y may predate the columns added by the last pricing round)
+    y = np.floor(lp_y + 1e-9)
+    plan = usage_from_values(columns[:len(y)], y)
+    used = np.zeros(len(lengths), dtype=int)
+    for k, _, mult in plan:
+        used[k] += mult
+    produced = usage_produced(plan, n)
+    for k in range(len(lengths)):
+        for _ in range(counts[k] - used[k]):
+            remaining = np.maximum(np.asarray(lim_inf) - produced, 0).astype(int)
+            a = fill_bar(lengths[k], piezas, remaining)
+            produced += a
+            plan.append((k, a, 1))
+            add(k, a)
+
+    best = plan if np.all(produced >= lim_inf) else None
+    if best is None:
+        # Leave the integer master the rest of the time
+        if deadline is not None:
+            pricing["deadline"] = time.monotonic() + DIVE_SHARE * max(deadline - time.monotonic(), 0)
+        best = dive(lengths, counts, piezas, lim_inf, columns, lp_y, **pricing)
+    if initial is not None and (best is None or usage_waste(initial, lengths, piezas)
+                                < usage_waste(best, lengths, piezas) - EPS):
+        best = initial
+    if best is not None and on_incumbent is not None:
+        on_incumbent(usage_waste(best, lengths, piezas), lp_bound, best)
+
+    # Integer master over the pool, which now also contains the repair patterns
+    remaining = None if deadline is None else max(deadline - time.monotonic(), 1.0)
+    master, yi, _ = solve_master(lengths, counts, piezas, lim_inf, columns, integer=True,
+                                 time_limit=remaining, msg=msg, initial=best, backend=backend, trace=trace)
+    if master.status == 1:
+        candidate = usage_from_values(columns, yi)
+        if (np.all(usage_produced(candidate, n) >= lim_inf)
+                and (best is None or usage_waste(candidate, lengths, piezas) < usage_waste(best, lengths, piezas) - EPS)):
+            best = candidate
+
+    if best is None:
+        # Last resort; raises if the heuristics cannot meet the demand either
+        best = solve_heuristic(lengths, counts, piezas, lim_inf)[0]
+
+    waste = usage_waste(best, lengths, piezas)
+    if proven:
+        if np.all(np.mod(np.concatenate([lengths, piezas]), 1) == 0):
+            lp_bound = math.ceil(lp_bound - 1e-6)
+        status = "Optimal" if waste <= lp_bound + 1e-6 else "Feasible"
+    else:
+        status = "Feasible"
+    return best, status, lp_bound
+
+
+def _generate(lengths, counts, piezas, lim_inf, columns, add, deadline, max_iterations, msg, backend, trace):
+    """Price new patterns into ``columns`` until the LP over them is optimal.
+
+    Returns ``(y, slack, value, proven)``: the LP values of the first
+    ``len(y)`` columns, its phase-one slack and objective, and whether
+    pricing finished. If time runs out in a later round, the last LP solved
+    is returned.
+    """
+    n = len(piezas)
+    y = slack = value = None
+    for _ in range(max_iterations):
+        remaining = None if deadline is None else max(deadline - time.monotonic(), 0.1)
+        master, values, phase_one = solve_master(lengths, counts, piezas, lim_inf, columns,
+                                                 time_limit=remaining, msg=msg, backend=backend, trace=trace)
+        if master.status != 1:
+            if y is not None:
+                break
+            raise ValueError(f"Could not solve the pattern LP. Status: {plp.LpStatus[master.status]}")
+        y, slack, value = values, phase_one, plp.value(master.objective)
+
+        sigma = np.array([master.constraints[f"supply_{k}"].pi or 0.0 for k in range(len(lengths))])
+        pi = np.array([master.constraints[f"demand_{j}"].pi or 0.0 for j in range(n)])
+        pi = np.maximum(pi, 0.0)
+
+        # Price one pattern per stock type: reduced cost = waste - sigma - pi @ a
+        added, exact = False, True
+        for k, length in enumerate(lengths):
+            price, a, complete = exact_knapsack(length, piezas, piezas + pi)
+            exact &= complete
+            if length - price - sigma[k] < -1e-7:
+                added |= add(k, a)
+
+        if not added:
+            # Without exact pricing an improving column may have been missed
+            return y, slack, value, exact
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+    return y, slack, value, False
+
+
+def dive(lengths, counts, piezas, lim_inf, columns, y, add, deadline, max_iterations, msg, backend, trace):
+    """Integer plan by diving on the LP solution ``y`` over ``columns``.
+
+    Every round fixes the columns at their rounded-down values, or one bar
+    of the largest column when all round to zero (preferring columns that
+    cut no piece beyond the open demand), and prices the LP of the bars and
+    demand that are left. Once the pieces still open have few enough
+    patterns, the residual is solved exactly instead (see ``residual_plan``).
+    When the residual cannot meet its demand, the last single-bar fix is
+    undone and its column banned, up to ``DIVE_BACKTRACKS`` times. Returns
+    the usage, or ``None`` if the dive fails or time runs out.
+    """
+    left = np.array(counts, dtype=int)
+    need = np.asarray(lim_inf, dtype=float).copy()
+    plan = []
+    tried, banned = [], set()
+    while np.any(need > EPS):
+        feasible = left.any() and (deadline is None or time.monotonic() < deadline)
+        if feasible:
+            rest = residual_plan(lengths, left, piezas, need, deadline, msg, backend, trace)
+            if rest is not None:
+                if rest:
+                    return plan + rest
+                feasible = False
+        if feasible:
+            fix = np.floor(y + 1e-9)
+            if not fix.any():
+                order = [q for q in np.argsort(-y, kind="stable") if y[q] > 1e-9 and q not in banned]
+                exact = [q for q in order if np.all(columns[q][1] <= np.ceil(need - EPS))]
+                feasible = bool(order)
+                if feasible:
+                    q = (exact or order)[0]
+                    tried.append((q, list(plan), left.copy(), need.copy(), y))
+                    fix[q] = 1
+        if feasible:
+            for q in np.flatnonzero(fix):
+                k, a = columns[q]
+                mult = min(int(fix[q]), int(left[k]))
+                if mult > 0:
+                    plan.append((k, a, mult))
+                    left[k] -= mult
+                    need -= a * mult
+            if np.any(need > EPS) and left.any():
+                y, slack, _, _ = _generate(lengths, left, piezas, np.maximum(need, 0), columns, add, deadline,
+                                           max_iterations, msg, backend, trace)
+                feasible = slack <= 1e-6
+        if not feasible:
+            if not tried or len(banned) >= DIVE_BACKTRACKS or (deadline is not None and time.monotonic() >= deadline):
+                return None
+            q, plan, left, need, y = tried.pop()
+            banned.add(q)
+    for k in np.flatnonzero(left):
+        plan.append((k, knapsack(lengths[k], piezas, piezas)[1], int(left[k])))
+    return plan
+
+
+def residual_plan(lengths, counts, piezas, lim_inf, deadline=None, msg=False, backend="auto", trace=None):
+    """Solve a residual exactly over every pattern of the pieces still open.
+
+    Each bar is topped up with the best fill of what its pattern leaves.
+    Returns the usage, ``[]`` if the residual cannot meet its demand in the
+    time left, or ``None`` if the open pieces have more than
+    ``RESIDUAL_PATTERNS`` patterns on some stock type.
+    """
+    n = len(piezas)
+    open_pieces = np.flatnonzero(np.asarray(lim_inf) > EPS)
+    columns = []
+    for k in np.flatnonzero(counts):
+        found = enumerate_patterns(lengths[k], piezas[open_pieces], RESIDUAL_PATTERNS)
+        if found is None:
+            return None
+        for pattern in found:
+            a = np.zeros(n, dtype=int)
+            a[open_pieces] = pattern
+            columns.append((k, a + knapsack(lengths[k] - float(piezas @ a), piezas, piezas)[1]))
+    remaining = None if deadline is None else max(deadline - time.monotonic(), 1.0)
+    master, y, _ = solve_master(lengths, counts, piezas, lim_inf, columns, integer=True,
+                                time_limit=remaining, msg=msg, backend=backend, trace=trace)
+    if master.status != 1:
+        return []
+    usage = usage_from_values(columns, y)
+    return usage if np.all(usage_produced(usage, n) >= np.asarray(lim_inf) - EPS) else []
@@ -0,0 +1,140 @@
+"""Batch command line solver.
+
+Reads a JSONL stream of jobs and writes one JSON result per line as each job
+finishes (completion order, tagged with the job ``id``). Jobs are solved in
+parallel in a process pool; only a bounded number are read ahead, so memory
+stays flat however large the batch is.
+
+Job format::
+
+    {"id": "line-3", "stock": [13, 10], "requiredSizes": [5, 2], "minQuantities": [2, 0]}
+
+``stock`` entries may also be ``[length, count]`` pairs. Jobs may override
+``engine``, ``backend``, ``timeLimit`` and ``precision``. ``orderFile`` names a
+CSV or JSON order export (see ``order_import``) whose summed pieces, and stock
+if it lists any, fill in the fields the job leaves out. With ``"trace": true``
+(or ``--trace``) the result also holds the solve's phase timings and solver
+statistics under ``trace``. A single job can be
+given on the command line instead, as sketched originally::
+
+    python cut_stock.py stock=[13,10] requiredSizes=[5,2]
+
+Usage::
+
+    python cut_stock.py jobs.jsonl --workers 8 --time-limit 30 > results.jsonl
+    cat jobs.jsonl | python cut_stock.py - --engine colgen
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from decompose import solve_decomposed
+from order_import import read_order
+from portfolio import solve_portfolio
+from stock_solver import SolveOptions, solve
+
+# Engines that wrap ``solve`` rather than plug into it
+SOLVERS = {"portfolio": solve_portfolio, "decompose": solve_decomposed}
+
+
+def run_job(line_no, line, engine, time_limit, precision=None, backend="auto", trace=False):
+    """Solve one JSONL job and return its result line."""
+    job_id = line_no
+    try:
+        job = json.loads(line)
+        job_id = job.get("id", line_no)
+        if "orderFile" in job:
+            job = {**read_order(job["orderFile"]).as_job(), **job}
+        options = SolveOptions(time_limit=job.get("timeLimit", time_limit),
+                               engine=job.get("engine", engine),
+                               precision=job.get("precision", precision),
+                               backend=job.get("backend", backend))
+        pieces = job["requiredSizes"]
+        solver = SOLVERS.get(options.engine, solve)
+        plan = solver(job["stock"], pieces, job.get("minQuantities", [0] * len(pieces)), options)
+        result = {"id": job_id, **plan.to_dict()}
+        if options.engine == "portfolio":
+            result["strategy"] = plan.trace.info["strategy"]
+        if job.get("trace", trace):
+            result["trace"] = plan.trace.to_dict()
+    except Exception as e:
+        result = {"id": job_id, "error": str(e)}
+    return json.dumps(result)
+
+
+def read_jobs(stream):
+    """Yield ``(line_no, line)`` for the non-blank lines of a JSONL stream."""
+    for line_no, line in enumerate(stream, start=1):
+        if line.strip():
+            yield line_no, line
+
+
+def run_batch(jobs, out, workers=None, engine="milp", time_limit=30, precision=None, backend="auto",
+              trace=False):
+    """Solve ``(line_no, line)`` jobs in a process pool, streaming results to ``out``."""
+    workers = workers or os.cpu_count() or 1
+    max_pending = 2 * workers
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for line_no, line in jobs:
+            pending.add(pool.submit(run_job, line_no, line, engine, time_limit, precision, backend, trace))
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    out.write(future.result() + "\n")
+                out.flush()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                out.write(future.result() + "\n")
+            out.flush()
+
+
+def job_from_args(assignments):
+    """Build a JSONL job line from ``key=value`` arguments."""
+    job = {}
+    for item in assignments:
+        key, _, value = item.partition("=")
+        job[key] = json.loads(value)
+    return json.dumps(job)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve stock cutting jobs from a JSONL stream.")
+    parser.add_argument("inputs", nargs="*", default=["-"],
+                        help="JSONL file, '-' for stdin (default), or key=value pairs for one job")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("-t", "--time-limit", type=float, default=30, help="per-job time budget in seconds")
+    parser.add_argument("-e", "--engine", default="milp", help="milp, colgen, dp, fast, ffd, bfd, portfolio (races several across cores) "
+                        "or decompose (splits orders with many piece lengths)")
+    parser.add_argument("-b", "--backend", default="auto", help="MILP backend: auto, cbc, highs or scipy")
+    parser.add_argument("-p", "--precision", type=float, default=None,
+                        help="length unit to solve in, e.g. 0.1 (default: exact decimals)")
+    parser.add_argument("--trace", action="store_true", help="add phase timings and solver statistics")
+    parser.add_argument("-o", "--output", default="-", help="output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w")
+    try:
+        if all("=" in item for item in args.inputs):
+            line = job_from_args(args.inputs)
+            out.write(run_job(1, line, args.engine, args.time_limit, args.precision, args.backend,
+                              args.trace) + "\n")
+            return
+        for path in args.inputs:
+            stream = sys.stdin if path == "-" else open(path)
+            try:
+                run_batch(read_jobs(stream), out, args.workers, args.engine, args.time_limit, args.precision,
+                          args.backend, args.trace)
+            finally:
+                if stream is not sys.stdin:
+                    stream.close()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""Decomposition of very large orders.
+
+The pattern model aggregates identical bars, so it is the number of piece
+lengths, not of bars, that makes an order too big: maximal patterns grow
+combinatorially with it. An order is therefore split into piece classes of
+at most ``MAX_PART_PIECES`` lengths. Classes are dealt out by size (the
+longest length to the first class, the next to the second, ...), so every
+class spans long and short pieces and can still fill its bars well. Each
+class gets the bars its demand needs, grossed up by how well its pieces fill
+the stock and by ``MARGIN``, in the same proportion from every stock length.
+The parts are solved independently in worker processes. Orders whose
+patterns all fit the exact engine's limits are solved whole instead.
+
+A repair pass then merges them, pooling the capacity the parts left over:
+bars whose pieces are all surplus go back into a shared pool with the bars
+nobody was given and those of failed parts, most wasteful first. Demand
+still open is placed into what the bars still cut have left (best fit
+decreasing, so one class's offcuts take another's pieces), then cut from
+the pool; if that is not enough, the most wasteful bars still cut are
+released as well and the pool is solved again. Finally every bar is topped
+up with the best fill of what it has left, and unused pool bars get the
+best fill over all piece lengths. Work and memory grow with the number of
+parts, i.e. roughly linearly in the size of the order.
+"""
+import dataclasses
+import math
+import os
+from bisect import bisect_left, insort
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from patterns import EPS, enumerate_patterns, knapsack, lower_bound
+from solve_trace import Trace
+from stock_solver import MAX_PATTERNS, Plan, SolveOptions, integer_scale, solve, validate_inputs, verify_plan
+
+# Piece lengths per part
+MAX_PART_PIECES = 8
+# Bars given to a part beyond what its demand needs at its best fill
+MARGIN = 1.15
+
+
+def partition(lengths, counts, piezas, lim_inf, max_pieces=MAX_PART_PIECES):
+    """Split an order into parts.
+
+    Returns ``(parts, spare)``: ``parts`` is a list of ``(piece indices, bar
+    counts per stock type)`` and ``spare`` the bar counts left over for the
+    best fill.
+    """
+    order = np.argsort(-piezas, kind="stable")
+    size = math.ceil(len(piezas) / max_pieces)
+    classes = [order[c::size] for c in range(size)]
+    capacity = float(lengths @ counts)
+    need = np.zeros(len(classes))
+    for c, pieces in enumerate(classes):
+        demanded = float(piezas[pieces] @ lim_inf[pieces])
+        if demanded > 0:
+            fill = knapsack(lengths[0], piezas[pieces], piezas[pieces])[0]
+            need[c] = demanded * lengths[0] / max(fill, EPS) * MARGIN
+    share = need / max(capacity, need.sum())
+
+    # Round each stock type's quotas without handing out more bars than exist
+    quotas = np.outer(share, counts)
+    bars = np.rint(quotas).astype(int)
+    for k in range(len(lengths)):
+        while bars[:, k].sum() > counts[k]:
+            bars[np.argmax(bars[:, k] - quotas[:, k]), k] -= 1
+    parts = [(pieces, bars[c]) for c, pieces in enumerate(classes) if bars[c].any()]
+    return parts, counts - bars.sum(axis=0)
+
+
+def fits_exact(lengths, piezas):
+    """Whether the exact engine can enumerate every pattern of the order."""
+    return all(enumerate_patterns(length, piezas, MAX_PATTERNS) is not None for length in lengths)
+
+
+def fill_rows(lengths, counts, piezas):
+    """Bars cut with the best fill over all piece lengths, as ``(types, cuts)`` rows."""
+    patterns = np.array([knapsack(length, piezas, piezas)[1] for length in lengths]).reshape(len(lengths), -1)
+    types = np.repeat(np.arange(len(lengths)), counts)
+    return types, patterns[types]
+
+
+def top_up(lengths, piezas, types, cuts):
+    """``cuts`` with what each bar has left cut by the best fill over all piece lengths."""
+    left = lengths[types] - cuts @ piezas
+    fills = {}
+    extra = np.zeros_like(cuts)
+    for i, length in enumerate(left):
+        key = round(float(length), 9)
+        if key not in fills:
+            fills[key] = knapsack(length, piezas, piezas)[1]
+        extra[i] = fills[key]
+    return cuts + extra
+
+
+def fit_leftovers(left, piezas, deficit):
+    """Place ``deficit`` pieces into bars with ``left`` length, longest piece into the tightest bar.
+
+    Returns the pieces placed per bar.
+    """
+    free = sorted((float(length), i) for i, length in enumerate(left))
+    placed = np.zeros((len(left), len(piezas)), dtype=int)
+    for j in np.argsort(-piezas, kind="stable"):
+        for _ in range(int(deficit[j])):
+            pos = bisect_left(free, (piezas[j] - EPS, -1))
+            if pos == len(free):
+                break
+            length, i = free.pop(pos)
+            placed[i, j] += 1
+            insort(free, (length - piezas[j], i))
+    return placed
+
+
+def _solve_part(lengths, counts, piezas, lim_inf, options):
+    """Plan for one part, or ``None`` if the part cannot meet its demand."""
+    stock = [(float(l), int(c)) for l, c in zip(lengths, counts) if c > 0]
+    try:
+        return solve(stock, piezas, lim_inf, options)
+    except ValueError:
+        return None
+
+
+def _repair(pool, lengths, piezas, lim_inf, types, cuts, options):
+    """Cut the demand the parts left open from the pooled bars.
+
+    ``pool`` holds the bar counts per stock type nobody has cut yet. Rows
+    are ``(types, cuts)``, one per bar. The pool is solved with the piece
+    lengths still in deficit only, so the repair model stays as small as a
+    part. With ``options.optional_stock`` the pool bars left over stay
+    uncut. Returns the merged rows.
+    """
+    need = np.ceil(lim_inf - EPS)
+    pool = np.array(pool, dtype=int)
+    keep = np.ones(len(types), dtype=bool)
+    order = np.argsort(-(lengths[types] - cuts @ piezas), kind="stable")
+    surplus = cuts.sum(axis=0) - need
+    for i in order:
+        if np.all(cuts[i] <= surplus):
+            surplus -= cuts[i]
+            keep[i] = False
+            pool[types[i]] += 1
+    cuts = cuts.copy()
+    # Bars still cut, most wasteful first
+    candidates = [i for i in order if keep[i]]
+    while True:
+        deficit = np.maximum(need - cuts[keep].sum(axis=0), 0)
+        if deficit.any():
+            kept = np.flatnonzero(keep)
+            cuts[kept] += fit_leftovers(lengths[types[kept]] - cuts[kept] @ piezas, piezas, deficit)
+            deficit = np.maximum(need - cuts[keep].sum(axis=0), 0)
+        open_pieces = np.flatnonzero(deficit)
+        if not open_pieces.size:
+            if options.optional_stock:
+                pool[:] = 0
+            extra_types, extra_cuts = fill_rows(lengths, pool, piezas)
+            return (np.concatenate([types[keep], extra_types]),
+                    np.vstack([top_up(lengths, piezas, types[keep], cuts[keep]), extra_cuts]))
+        if pool.any():
+            plan = _solve_part(lengths, pool, piezas[open_pieces], deficit[open_pieces], options)
+            if plan is not None:
+                extra_types = np.repeat(np.arange(len(lengths)), pool)
+                extra_cuts = np.zeros((len(extra_types), len(piezas)), dtype=int)
+                extra_cuts[:, open_pieces] = plan.counts
+                types = np.concatenate([types[keep], extra_types])
+                return types, top_up(lengths, piezas, types, np.vstack([cuts[keep], extra_cuts]))
+        if not candidates:
+            raise ValueError("Could not rebalance the demand left open by the sub-problems")
+        # Release bars still cut until the pool has grown by the missing length
+        missing = float(piezas @ deficit)
+        released = 0.0
+        while candidates and released < max(missing, float(lengths @ pool)):
+            i = candidates.pop(0)
+            keep[i] = False
+            pool[types[i]] += 1
+            released += float(lengths[types[i]])
+
+
+def solve_decomposed(stock, pieces, min_qty, options=None, max_pieces=MAX_PART_PIECES, workers=None):
+    """Solve a large order part by part in ``workers`` processes and merge the plans.
+
+    Orders with at most ``max_pieces`` piece lengths, or whose patterns fit
+    the exact engine, are solved directly. Parts use ``options.engine``
+    (the MILP when it is ``"decompose"``). The merged plan's bound is the
+    quick lower bound of the whole order.
+    """
+    options = options or SolveOptions()
+    if options.engine == "decompose":
+        options = dataclasses.replace(options, engine="milp")
+    lengths, counts, piezas, lim_inf = validate_inputs(stock, pieces, min_qty)
+    if len(pieces) <= max_pieces or fits_exact(lengths, piezas):
+        return solve(stock, pieces, min_qty, options)
+    if options.precision is not None:
+        # Merge in the lengths the engines see: stock rounded down, pieces up
+        places = int(round(math.log10(integer_scale([options.precision]))))
+        lengths = np.round(np.floor(lengths / options.precision + 1e-9) * options.precision, places)
+        piezas = np.round(np.ceil(piezas / options.precision - 1e-9) * options.precision, places)
+    trace = Trace()
+    with trace.phase("partition"):
+        parts, spare = partition(lengths, counts, piezas, lim_inf, max_pieces)
+
+    # Callbacks and sessions belong to the caller's process; the repair
+    # releases the bars parts do not need
+    part_options = dataclasses.replace(options, on_incumbent=None, on_plan=None, cutoff=None, session=None,
+                                       trace=None, trace_path=None, optional_stock=False)
+    pool = np.array(spare, dtype=int)
+    rows = [(np.zeros(0, dtype=int), np.zeros((0, len(piezas)), dtype=int))]
+    with trace.phase("parts"):
+        with ProcessPoolExecutor(max_workers=max(1, min(len(parts), workers or os.cpu_count() or 1))) as executor:
+            futures = {executor.submit(_solve_part, lengths, part_counts, piezas[idx], lim_inf[idx], part_options):
+                       (idx, part_counts) for idx, part_counts in parts}
+            for future in as_completed(futures):
+                idx, part_counts = futures[future]
+                plan = future.result()
+                if plan is None:
+                    pool += part_counts
+                    continue
+                # Plan bars are longest first, i.e. in stock type order
+                cuts = np.zeros((len(plan.stock), len(piezas)), dtype=int)
+                cuts[:, idx] = plan.counts
+                rows.append((np.repeat(np.arange(len(lengths)), part_counts), cuts))
+
+    with trace.phase("repair"):
+        types = np.concatenate([t for t, _ in rows])
+        cut_rows = np.vstack([c for _, c in rows])
+        failed = int(pool.sum() - spare.sum())
+        types, cut_rows = _repair(pool, lengths, piezas, lim_inf, types, cut_rows,
+                                  dataclasses.replace(part_options, optional_stock=options.optional_stock))
+
+    with trace.phase("verify"):
+        order = np.argsort(types, kind="stable")
+        scale = integer_scale(np.concatenate([lengths, piezas]))
+        decimals = int(round(math.log10(scale)))
+        # The bound's fills are exact on whole-number lengths
+        bound = round(lower_bound(np.rint(lengths * scale), counts, np.rint(piezas * scale)) / scale, decimals)
+        if options.optional_stock:
+            # Bars may stay uncut, which the bound assumes away
+            bound = 0.0
+        plan = Plan.from_bars(lengths[types[order]], piezas, lim_inf, cut_rows[order], "Feasible",
+                              lower_bound=bound, decimals=decimals, trace=trace)
+        verify_plan(plan)
+        if plan.total_waste <= bound + 1e-9:
+            plan.status = "Optimal"
+    trace.info = {"engine": f"decompose/{options.engine}", "parts": len(parts), "failed_bars": failed,
+                  "stock_types": len(lengths), "bars": int(counts.sum()), "pieces": len(piezas),
+                  "status": plan.status, "waste": plan.total_waste, "lower_bound": plan.lower_bound}
+    if options.trace_path:
+        trace.write(options.trace_path)
+    return plan
@@ -0,0 +1,129 @@
+"""First-fit / best-fit decreasing heuristics.
+
+Quick, non-optimal plans for quotes and as a fallback when CBC does not
+return an optimal solution. Demanded pieces are placed longest first into
+the bar with the first (FFD) or tightest (BFD) remaining space that fits,
+then every bar's leftover is filled greedily with the pieces that still fit.
+First fit scans the bar capacities as one NumPy array; best fit keeps them
+sorted and bisects. The fill is one greedy pass plus ``FILL_RESTARTS``
+passes that start from another piece length, vectorized over the distinct
+leftovers, so a plan costs a few passes over the pieces and bars.
+"""
+from bisect import bisect_left, bisect_right, insort
+
+import numpy as np
+
+from patterns import EPS
+
+# Extra greedy fill passes, each starting with the next longest piece length
+FILL_RESTARTS = 3
+
+
+def _first_fit(remaining, size):
+    """Index of the first bar with room for a piece of ``size``, or -1."""
+    fits = remaining >= size - EPS
+    return int(fits.argmax()) if fits.any() else -1
+
+
+def pack(lengths, counts, piezas, lim_inf, best_fit=False):
+    """Pack the demand into the stock and fill the leftovers.
+
+    Returns the per-bar pattern matrix, bars ordered like
+    ``np.repeat(lengths, counts)``.
+    """
+    n = len(piezas)
+    remaining = np.repeat(np.asarray(lengths, dtype=float), counts)
+    cuts = np.zeros((len(remaining), n), dtype=int)
+    order = np.argsort(-piezas, kind="stable")
+    # Best fit: (remaining, bar) pairs kept sorted, the tightest fit is a bisect away
+    free = sorted(zip(remaining.tolist(), range(len(remaining)))) if best_fit else None
+
+    for j in order:
+        size = float(piezas[j])
+        for _ in range(int(np.ceil(lim_inf[j] - EPS))):
+            if best_fit:
+                pos = bisect_left(free, (size - EPS, -1))
+                i = -1 if pos == len(free) else free.pop(pos)[1]
+            else:
+                i = _first_fit(remaining, size)
+            if i < 0:
+                raise ValueError(f"Could not place all pieces of size {piezas[j]} in the available stock")
+            cuts[i, j] += 1
+            remaining[i] -= size
+            if best_fit:
+                insort(free, (float(remaining[i]), i))
+
+    return cuts + fill(remaining, piezas)
+
+
+def _greedy(left, sizes, first):
+    """Pieces cut from ``left``, as ``{position in sizes: count}``, and the
+    length left: as many of ``sizes[first]`` as fit, then repeatedly the
+    longest piece that fits. ``sizes`` is sorted ascending.
+    """
+    taken = {}
+    pos = first
+    while pos >= 0:
+        q = int((left + EPS) // sizes[pos])
+        taken[pos] = q
+        left -= q * sizes[pos]
+        pos = min(pos - 1, bisect_right(sizes, left + EPS) - 1)
+    return taken, left
+
+
+def fill(remaining, piezas):
+    """Greedy fill of every bar's leftover.
+
+    One pass takes the longest piece that fits until none does; up to
+    ``FILL_RESTARTS`` more start with the next longest lengths that fit.
+    Per bar the pass with least waste is kept. Bars with the same leftover
+    are filled once.
+    """
+    order = np.argsort(piezas, kind="stable")
+    sizes = piezas[order].tolist()
+    left_values, inverse = np.unique(remaining, return_inverse=True)
+    best = np.zeros((len(left_values), len(piezas)), dtype=int)
+    for r, left in enumerate(left_values.tolist()):
+        top = bisect_right(sizes, left + EPS) - 1
+        passes = [_greedy(left, sizes, first) for first in range(top, max(top - FILL_RESTARTS - 1, -1), -1)]
+        if passes:
+            taken, _ = min(passes, key=lambda p: p[1])
+            for pos, q in taken.items():
+                best[r, order[pos]] = q
+    return best[inverse.ravel()]
+
+
+def group_patterns(lengths, counts, cuts):
+    """Collapse a per-bar pattern matrix to ``(type, pattern, multiplicity)`` usage."""
+    usage = []
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    for k in range(len(lengths)):
+        rows = cuts[offsets[k]:offsets[k + 1]]
+        if len(rows) == 0:
+            continue
+        patterns, mult = np.unique(rows, axis=0, return_counts=True)
+        usage.extend((k, a, int(m)) for a, m in zip(patterns, mult))
+    return usage
+
+
+def solve_heuristic(lengths, counts, piezas, lim_inf, method="fast"):
+    """Solve with ``"ffd"``, ``"bfd"`` or ``"fast"`` (the better of both).
+
+    Returns ``(usage, status, bound)`` like the exact engines; heuristics
+    prove no bound.
+    """
+    methods = {"ffd": [False], "bfd": [True], "fast": [False, True]}[method]
+    best, best_waste, error = None, np.inf, None
+    total = float(np.asarray(lengths) @ np.asarray(counts))
+    for best_fit in methods:
+        try:
+            cuts = pack(lengths, counts, piezas, lim_inf, best_fit)
+        except ValueError as e:
+            error = e
+            continue
+        waste = total - float((cuts @ piezas).sum())
+        if waste < best_waste - EPS:
+            best, best_waste = cuts, waste
+    if best is None:
+        raise error
+    return group_patterns(lengths, counts, best), "Heuristic", None
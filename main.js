@@ -83,7 +83,33 @@ function showError(message) {
     results.innerHTML = `Error\n${'='.repeat(50)}\n\n${message}\n\nPlease check your inputs and try again.`;
 }
 
-function calculate() {
+// Solve on the Python service (solve_service.py) when the page is served by it;
+// opened as a file, or if the service cannot be reached, the local solver runs
+async function solveOnServer(stockSizes, requiredSizes, minQuantities) {
+    if (!location.protocol.startsWith('http')) {
+        return null;
+    }
+    let response;
+    try {
+        response = await fetch('/solve', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ stockSizes, requiredSizes, minQuantities })
+        });
+    } catch (error) {
+        return null;
+    }
+    if (response.status === 404 || response.status === 405) {
+        return null;
+    }
+    const solution = await response.json();
+    if (!response.ok && solution.status !== 'infeasible') {
+        throw new Error(solution.message || `Solver service error ${response.status}`);
+    }
+    return solution;
+}
+
+async function calculate() {
     try {
         // Get inputs
         const stockSizes = parseInput(document.getElementById('stock-sizes').value);
@@ -115,7 +141,8 @@ function calculate() {
         }
 
         // Solve the cutting stock problem
-        const solution = solveCuttingStock(stockSizes, requiredSizes, minQuantities);
+        const solution = await solveOnServer(stockSizes, requiredSizes, minQuantities)
+            || solveCuttingStock(stockSizes, requiredSizes, minQuantities);
 
         // Display results
         displayResults(solution);
@@ -133,7 +160,7 @@ function displayResults(solution) {
     const results = document.getElementById('results');
     results.innerHTML = 'Optimization Results\n' + '='.repeat(50) + '\n\n';
     
-    if (solution.status === 'optimal') {
+    if (solution.status === 'optimal' || solution.status === 'feasible') {
         results.innerHTML += `Total Stock Length: ${solution.totalStock}\n`;
         results.innerHTML += `Total Used Length: ${solution.totalUsed}\n`;
         results.innerHTML += `Total Waste: ${solution.waste}\n`;
@@ -143,7 +170,8 @@ function displayResults(solution) {
         
         solution.patterns.forEach((pattern, i) => {
             const waste = pattern.stock - pattern.cuts.reduce((a, b) => a + b, 0);
-            results.innerHTML += `• Log ${i + 1} (${pattern.stock}): ${pattern.cuts.join(', ')}`;
+            const count = pattern.count || 1;
+            results.innerHTML += `• Log ${i + 1} (${pattern.stock})${count > 1 ? ` x${count}` : ''}: ${pattern.cuts.join(', ')}`;
             if (waste > 0) {
                 results.innerHTML += ` [Waste: ${waste}]`;
             }
@@ -251,7 +279,7 @@ function updateVisualization(solution) {
             .attr('dominant-baseline', 'middle')
             .attr('fill', 'white')
             .attr('font-size', '10px')
-            .text(`Log ${i + 1} (${pattern.stock})`);
+            .text(`Log ${i + 1} (${pattern.stock})${(pattern.count || 1) > 1 ? ` x${pattern.count}` : ''}`);
 
         // Add waste information
         const waste = pattern.stock - pattern.cuts.reduce((a, b) => a + b, 0);
@@ -0,0 +1,298 @@
+"""Bulk order import from CSV and JSON files.
+
+Order exports list one line item per row, with many repeated lengths. The
+file is read one row at a time and line items are summed per distinct
+length as they arrive, so memory grows with the number of distinct lengths,
+not of rows, and the solver gets the compact length/quantity arrays it
+aggregates to anyway.
+
+CSV files have a header naming the columns (case-insensitive):
+
+* ``length`` (or ``size``, ``longitud``): the piece or bar length,
+* ``quantity`` (or ``qty``, ``count``, ``cantidad``): pieces needed or bars
+  in stock, 1 when the column is missing or the cell is empty,
+* ``type`` (or ``kind``, ``tipo``): ``piece`` (default) or ``stock``.
+
+Files without a header are read as ``length,quantity``. ``,``, ``;`` and tab
+are recognized as delimiters. JSON files are either a job as taken by
+``cut_stock`` (``stock``, ``requiredSizes``, ``minQuantities``), an array of
+line item objects with the keys above, or JSON Lines with one line item per
+line; arrays are decoded one item at a time.
+
+Every row is checked and all errors are reported together in one
+``OrderImportError``.
+"""
+import csv
+import io
+import json
+import math
+from dataclasses import dataclass
+from typing import List
+
+from stock_solver import StockType
+
+COLUMNS = {
+    "length": ("length", "size", "len", "longitud"),
+    "quantity": ("quantity", "qty", "count", "min_qty", "cantidad"),
+    "type": ("type", "kind", "tipo"),
+}
+PIECE_TYPES = ("piece", "pieces", "pieza", "required", "")
+STOCK_TYPES = ("stock", "bar", "bars", "material")
+# Errors listed in the exception message; all are kept in ``errors``
+MAX_REPORTED = 20
+CHUNK = 1 << 16
+
+
+class OrderImportError(ValueError):
+    """All problems found in an order file, as ``(row, message)`` pairs.
+
+    ``row`` is the line number, a field name like ``stock[2]`` for job files,
+    or ``None`` for problems with the whole file.
+    """
+
+    def __init__(self, errors):
+        self.errors = errors
+        lines = [message if row is None else f"{'Row ' if isinstance(row, int) else ''}{row}: {message}"
+                 for row, message in errors[:MAX_REPORTED]]
+        if len(errors) > MAX_REPORTED:
+            lines.append(f"... and {len(errors) - MAX_REPORTED} more")
+        super().__init__(f"Invalid order file ({len(errors)} errors):\n" + "\n".join(lines))
+
+
+@dataclass
+class Order:
+    """An imported order with duplicate lengths summed.
+
+    ``pieces`` and ``min_qty`` are sorted longest first; ``stock`` is empty
+    when the file lists only pieces. ``rows`` is the number of line items read.
+    """
+    stock: List[StockType]
+    pieces: List[float]
+    min_qty: List[float]
+    rows: int
+
+    def as_job(self):
+        """The order as a ``cut_stock`` job dict."""
+        job = {"requiredSizes": self.pieces, "minQuantities": self.min_qty}
+        if self.stock:
+            job["stock"] = [[s.length, s.count] for s in self.stock]
+        return job
+
+    def as_text(self):
+        """Stock, piece and quantity fields in the app's comma separated entry format."""
+        stock = ",".join(_number(s.length) if s.count == 1 else f"{_number(s.length)}x{s.count}" for s in self.stock)
+        return stock, ",".join(map(_number, self.pieces)), ",".join(map(_number, self.min_qty))
+
+
+def _number(x):
+    return str(int(x)) if float(x).is_integer() else repr(float(x))
+
+
+class _Totals:
+    """Quantities summed per length while the rows stream in, with the row errors."""
+
+    def __init__(self):
+        self.pieces = {}
+        self.stock = {}
+        self.errors = []
+        self.rows = 0
+
+    def add(self, row, length, quantity=None, kind=None):
+        self.rows += 1
+        kind = str(kind or "").strip().lower()
+        if kind in STOCK_TYPES:
+            totals = self.stock
+        elif kind in PIECE_TYPES:
+            totals = self.pieces
+        else:
+            self.errors.append((row, f"unknown type {kind!r} (use piece or stock)"))
+            return
+        try:
+            length = float(length)
+        except (TypeError, ValueError):
+            self.errors.append((row, f"length {length!r} is not a number"))
+            return
+        if not math.isfinite(length) or length <= 0:
+            self.errors.append((row, f"length {length:g} must be positive"))
+            return
+        if quantity is None or (isinstance(quantity, str) and not quantity.strip()):
+            quantity = 1
+        try:
+            quantity = float(quantity)
+        except (TypeError, ValueError):
+            self.errors.append((row, f"quantity {quantity!r} is not a number"))
+            return
+        if not math.isfinite(quantity) or quantity < 0:
+            self.errors.append((row, f"quantity {quantity:g} must not be negative"))
+            return
+        if totals is self.stock and not quantity.is_integer():
+            self.errors.append((row, f"stock count {quantity:g} must be a whole number"))
+            return
+        totals[length] = totals.get(length, 0) + quantity
+
+    def order(self):
+        if not self.pieces and not self.errors:
+            self.errors.append((None, "no pieces in order file"))
+        if self.errors:
+            raise OrderImportError(self.errors)
+        pieces = sorted(self.pieces, reverse=True)
+        stock = [StockType(length, int(self.stock[length])) for length in sorted(self.stock, reverse=True)]
+        return Order(stock, pieces, [self.pieces[length] for length in pieces], self.rows)
+
+
+def _column(header, name):
+    for alias in COLUMNS[name]:
+        if alias in header:
+            return header.index(alias)
+    return None
+
+
+def read_csv(stream):
+    """Stream an order from a CSV text stream."""
+    sample = stream.read(CHUNK)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.reader(io.StringIO(sample) if len(sample) < CHUNK else _chain(sample, stream), dialect)
+    totals = _Totals()
+    first = next(reader, None)
+    if first is None:
+        return totals.order()
+    header = [cell.strip().lower() for cell in first]
+    length_col = _column(header, "length")
+    if length_col is None:
+        # No header: length,quantity
+        length_col, qty_col, type_col = 0, 1, None
+        reader = _prepend(first, reader)
+        start = 1
+    else:
+        qty_col, type_col = _column(header, "quantity"), _column(header, "type")
+        start = 2
+    for row, cells in enumerate(reader, start=start):
+        if not any(cell.strip() for cell in cells):
+            continue
+        cell = lambda col: cells[col] if col is not None and col < len(cells) else None
+        totals.add(row, cell(length_col), cell(qty_col), cell(type_col))
+    return totals.order()
+
+
+def _chain(sample, stream):
+    """Lines of ``sample`` followed by the rest of ``stream``."""
+    rest = stream.readline()
+    yield from io.StringIO(sample + rest)
+    yield from stream
+
+
+def _prepend(first, reader):
+    yield first
+    yield from reader
+
+
+def iter_json_array(stream):
+    """Decode the items of a top-level JSON array one at a time."""
+    decoder = json.JSONDecoder()
+    buffer, pos = "", 0
+
+    def fill():
+        nonlocal buffer, pos
+        chunk = stream.read(CHUNK)
+        buffer, pos = buffer[pos:] + chunk, 0
+        return bool(chunk)
+
+    def skip(chars):
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in chars:
+                pos += 1
+            if pos < len(buffer) or not fill():
+                return
+
+    skip(" \t\r\n")
+    while pos < len(buffer):
+        if buffer[pos] == "]":
+            return
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+                break
+            except json.JSONDecodeError:
+                if not fill():
+                    raise
+        pos = end
+        yield item
+        skip(" \t\r\n,")
+
+
+def read_json(stream):
+    """Stream an order from a JSON or JSON Lines text stream."""
+    head = stream.read(1)
+    while head and head.isspace():
+        head = stream.read(1)
+    totals = _Totals()
+    if head == "{":
+        first = head + stream.readline()
+        try:
+            item = json.loads(first)
+        except json.JSONDecodeError:
+            item = None
+        if item is None:
+            # An object spanning several lines, such as a pretty-printed job
+            try:
+                item = json.loads(first + stream.read())
+            except json.JSONDecodeError as e:
+                raise OrderImportError([(None, f"not valid JSON ({e})")])
+            if "requiredSizes" in item:
+                return _read_job(item, totals)
+            items = [item]
+        elif "requiredSizes" in item:
+            return _read_job(item, totals)
+        else:
+            # JSON Lines: one line item object per line
+            items = _json_lines(first, stream)
+    elif head == "[":
+        items = iter_json_array(stream)
+    else:
+        raise OrderImportError([(None, "JSON order must be a job object, an array or JSON Lines")])
+    for row, item in enumerate(items, start=1):
+        if isinstance(item, str):
+            totals.errors.append((row, "not valid JSON"))
+            continue
+        if not isinstance(item, dict):
+            totals.errors.append((row, "line item must be an object"))
+            continue
+        keys = {key.lower(): value for key, value in item.items()}
+        field = lambda name: next((keys[a] for a in COLUMNS[name] if a in keys), None)
+        totals.add(row, field("length"), field("quantity"), field("type"))
+    return totals.order()
+
+
+def _json_lines(first, stream):
+    """Line items of a JSON Lines stream; lines that do not decode are passed on as text."""
+    for line in _prepend(first, stream):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                yield line
+
+
+def _read_job(job, totals):
+    pieces = job["requiredSizes"]
+    min_qty = job.get("minQuantities", [0] * len(pieces))
+    if len(pieces) != len(min_qty):
+        totals.errors.append((None, "Number of required sizes must match number of minimum quantities"))
+    for i, (length, quantity) in enumerate(zip(pieces, min_qty)):
+        totals.add(f"requiredSizes[{i}]", length, quantity)
+    for i, item in enumerate(job.get("stock", [])):
+        length, count = (item, 1) if not isinstance(item, (list, tuple)) else item
+        totals.add(f"stock[{i}]", length, count, "stock")
+    return totals.order()
+
+
+def read_order(path):
+    """Import an order file; ``.json``/``.jsonl`` are read as JSON, anything else as CSV."""
+    with open(path, newline="", encoding="utf-8-sig") as stream:
+        if str(path).lower().endswith((".json", ".jsonl", ".ndjson")):
+            return read_json(stream)
+        return read_csv(stream)
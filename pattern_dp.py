@@ -0,0 +1,131 @@
+"""Exact dynamic programming engine for small instances.
+
+Solves the pattern model without CBC. The state is the demand covered so
+far, capped at the minimum quantities, as one mixed-radix index; each bar
+moves every state at once by one maximal pattern (vectorized over all
+states), keeping the least waste per state and a back pointer for the
+reconstruction. Stock types are processed one after the other, so mixed
+stock lengths are exact too.
+
+Only bars that cover demand need to be searched: at most one per demanded
+piece, the others take their type's least-waste pattern. The work is
+``states * patterns * searched bars``, which is tiny for the common orders
+with one stock length and a few piece sizes, and those are routed here
+automatically (see ``MAX_WORK``).
+"""
+import math
+
+import numpy as np
+
+from patterns import enumerate_patterns
+
+# Limits for automatic routing: covered-demand states, and states times
+# pattern transitions over all searched bars. A transition costs 10-30 ns
+# and a small model solved by CBC 7-15 ms, so routed instances take at most
+# about as long as CBC would (e.g. [41, 29, 19, 13] x 6 on 100 x 40 is 1.3M
+# transitions, 17-26 ms in the DP against 10-14 ms in CBC, and goes to CBC)
+MAX_STATES = 200_000
+MAX_WORK = 400_000
+INF = np.iinfo(np.int64).max // 4
+
+
+def _prepare(lengths, counts, piezas, lim_inf, max_work):
+    """State space and per-type transitions, or ``None`` above ``max_work``."""
+    demand = np.ceil(np.asarray(lim_inf, dtype=float) - 1e-9).astype(np.int64)
+    dims = np.flatnonzero(demand > 0)
+    radix = demand[dims] + 1
+    # Python ints, since the product overflows int64 with many piece lengths
+    states = math.prod(int(r) for r in radix)
+    if states > MAX_STATES:
+        return None
+    searched = int(demand.sum())
+    covered = np.array(np.unravel_index(np.arange(states), radix)).T if len(dims) else np.zeros((1, 0), int)
+
+    types = []
+    work = 0
+    for k, length in enumerate(lengths):
+        found = enumerate_patterns(length, piezas, max_work // states)
+        if found is None:
+            return None
+        # Patterns that cover the same capped demand only differ in waste
+        best = {}
+        for a in found:
+            key = tuple(np.minimum(a[dims], demand[dims]))
+            waste = int(length - piezas @ a)
+            if key not in best or waste < best[key][0]:
+                best[key] = (waste, a)
+        patterns = [a for _, a in best.values()]
+        wastes = np.array([w for w, _ in best.values()], dtype=np.int64)
+        bars = min(int(counts[k]), searched)
+        work += states * len(patterns) * bars
+        if work > max_work:
+            return None
+        if len(dims):
+            targets = np.stack([np.ravel_multi_index(
+                tuple(np.minimum(covered + a[dims], radix - 1).T), radix) for a in patterns])
+        else:
+            targets = np.zeros((len(patterns), 1), dtype=np.int64)
+        types.append((patterns, wastes, targets, bars))
+    return states, types
+
+
+def solve_dp(lengths, counts, piezas, lim_inf, max_work=MAX_WORK):
+    """Solve an integer-length instance exactly.
+
+    Returns ``(usage, status, bound)`` like the other engines, or ``None`` if
+    the instance is above ``max_work``.
+    """
+    prepared = _prepare(lengths, counts, piezas, lim_inf, max_work)
+    if prepared is None:
+        return None
+    states, types = prepared
+    index = np.arange(states)
+
+    cost = np.full(states, INF, dtype=np.int64)
+    cost[0] = 0
+    history = []
+    for k, (patterns, wastes, targets, bars) in enumerate(types):
+        spare = int(wastes.min())
+        layer = cost
+        best = cost + int(counts[k]) * spare
+        used = np.zeros(states, dtype=np.int64)
+        steps = []
+        for m in range(1, bars + 1):
+            nxt = np.full(states, INF, dtype=np.int64)
+            for p, w in enumerate(wastes):
+                np.minimum.at(nxt, targets[p], layer + w)
+            # Back pointers: any (state, pattern) pair reaching the minimum
+            parent = np.full(states, -1, dtype=np.int64)
+            choice = np.full(states, -1, dtype=np.int64)
+            for p, w in enumerate(wastes):
+                hit = (layer < INF) & (layer + w == nxt[targets[p]])
+                parent[targets[p][hit]] = index[hit]
+                choice[targets[p][hit]] = p
+            steps.append((parent, choice))
+            layer = nxt
+            total = layer + (int(counts[k]) - m) * spare
+            better = total < best
+            best[better] = total[better]
+            used[better] = m
+        history.append((steps, used))
+        cost = best
+
+    if cost[-1] >= INF:
+        raise ValueError("Could not find a feasible cutting plan")
+
+    usage = []
+    state = states - 1
+    for k in range(len(types) - 1, -1, -1):
+        patterns, wastes, _, _ = types[k]
+        steps, used = history[k]
+        m = int(used[state])
+        chosen = {}
+        for parent, choice in reversed(steps[:m]):
+            p = int(choice[state])
+            chosen[p] = chosen.get(p, 0) + 1
+            state = int(parent[state])
+        spare = int(np.argmin(wastes))
+        if counts[k] - m > 0:
+            chosen[spare] = chosen.get(spare, 0) + int(counts[k]) - m
+        usage.extend((k, patterns[p], mult) for p, mult in chosen.items())
+    return usage, "Optimal", float(cost[-1])
@@ -0,0 +1,382 @@
+"""Cutting patterns and the aggregated pattern model.
+
+Stock is described by types: ``lengths[k]`` with ``counts[k]`` bars each. A
+pattern ``a`` is an integer vector with ``a[j]`` pieces of length
+``piezas[j]``; ``y[q]`` is the number of bars of the type of column ``q`` cut
+with that pattern. Identical bars share one integer usage count, so the model
+size depends on the number of distinct lengths and patterns, not on the
+number of bars.
+"""
+import math
+import os
+import tempfile
+
+import numpy as np
+import pulp as plp
+
+from backends import choose_backend
+from presolve import reachable
+from solve_trace import phase
+
+EPS = 1e-9
+# Penalty per missing piece in the phase-one slack of the demand rows
+ARTIFICIAL_COST = 1e6
+# Exact fills come from a reachability table over the stock length; longer
+# (very fine units) or fractional lengths use the branch and bound
+MAX_FILL_LENGTH = 1_000_000
+
+
+def knapsack(capacity, weights, values, limits=None, node_limit=200000):
+    """Maximize ``values @ a`` subject to ``weights @ a <= capacity``.
+
+    ``a`` is a non-negative integer vector, optionally bounded by ``limits``.
+    Depth-first branch and bound on the fractional bound, so it works
+    directly on float lengths. Returns ``(best_value, a)``; past
+    ``node_limit`` nodes it is the best found so far (see ``search``).
+    """
+    value, a, _ = search(capacity, weights, values, limits, node_limit)
+    return value, a
+
+
+def search(capacity, weights, values, limits=None, node_limit=200000):
+    """``knapsack`` that also returns whether the search completed, i.e.
+    whether the value is proven maximal: ``(best_value, a, complete)``.
+    """
+    n = len(weights)
+    a_best = np.zeros(n, dtype=int)
+    items = [j for j in range(n)
+             if values[j] > EPS and weights[j] <= capacity + EPS
+             and (limits is None or limits[j] > 0)]
+    if not items:
+        return 0.0, a_best, True
+
+    items.sort(key=lambda j: values[j] / weights[j], reverse=True)
+    w = [float(weights[j]) for j in items]
+    v = [float(values[j]) for j in items]
+    ub = [math.inf if limits is None else int(limits[j]) for j in items]
+    ratio = [v[k] / w[k] for k in range(len(items))]
+    cur = [0] * len(items)
+    best = {"value": -1.0, "a": None, "nodes": 0}
+
+    def dfs(k, cap, val):
+        best["nodes"] += 1
+        if k == len(items):
+            if val > best["value"] + EPS:
+                best["value"] = val
+                best["a"] = list(cur)
+            return
+        if val + cap * ratio[k] <= best["value"] + EPS or best["nodes"] > node_limit:
+            return
+        qmax = min(int((cap + EPS) // w[k]), ub[k])
+        for q in range(qmax, -1, -1):
+            cur[k] = q
+            dfs(k + 1, cap - q * w[k], val + q * v[k])
+        cur[k] = 0
+
+    dfs(0, float(capacity), 0.0)
+    if best["a"] is None:
+        return 0.0, a_best, False
+    for k, j in enumerate(items):
+        a_best[j] = best["a"][k]
+    return best["value"], a_best, best["nodes"] <= node_limit
+
+
+def exact_knapsack(capacity, weights, values):
+    """Unbounded ``knapsack`` with a proven maximum when it can be had.
+
+    Whole-number weights and capacities up to ``MAX_FILL_LENGTH`` are solved
+    by dynamic programming over the capacity: per item, the best value of
+    every total is a running maximum along its residue class. Otherwise the
+    branch and bound is used. Returns ``(best_value, a, complete)`` like
+    ``search``.
+    """
+    weights = np.asarray(weights, dtype=float)
+    values = np.asarray(values, dtype=float)
+    if not (float(capacity).is_integer() and np.all(weights == np.rint(weights))
+            and capacity <= MAX_FILL_LENGTH):
+        return search(capacity, weights, values)
+    capacity = int(capacity)
+    a = np.zeros(len(weights), dtype=int)
+    items = [j for j in range(len(weights)) if values[j] > EPS and weights[j] <= capacity]
+    # best[c]: highest value of pieces totalling exactly c
+    best = np.full(capacity + 1, -np.inf)
+    best[0] = 0.0
+    for j in items:
+        w, v = int(weights[j]), float(values[j])
+        rows = -(-(capacity + 1) // w)
+        padded = np.full(rows * w, -np.inf)
+        padded[:capacity + 1] = best
+        # i copies of w on top of total r + m*w: best[r + m*w] + (i - m) * v
+        steps = (np.arange(rows) * v)[:, None]
+        table = np.maximum.accumulate(padded.reshape(rows, w) - steps, axis=0) + steps
+        best = table.ravel()[:capacity + 1]
+    total = int(np.argmax(best))
+    value = float(best[total])
+    # Walk back along the recurrence best[c] = best[c - w] + v
+    while total > 0:
+        for j in items:
+            w = int(weights[j])
+            if w <= total and abs(best[total - w] + values[j] - best[total]) <= 1e-9 * max(1.0, abs(best[total])):
+                a[j] += 1
+                total -= w
+                break
+        else:
+            return search(capacity, weights, values)
+    return value, a, True
+
+
+def fill_bar(length, piezas, remaining):
+    """Pattern for one bar: cover as much remaining demand as possible, then fill."""
+    _, a = knapsack(length, piezas, piezas, limits=remaining)
+    left = length - float(piezas @ a)
+    _, extra = knapsack(left, piezas, piezas)
+    return a + extra
+
+
+def enumerate_patterns(length, piezas, limit):
+    """All maximal patterns for one stock length.
+
+    A pattern is maximal when no further piece fits in its leftover. Since
+    every bar is cut, non-maximal patterns are dominated and never needed.
+    Returns ``None`` if there are more than ``limit`` of them.
+    """
+    n = len(piezas)
+    order = [j for j in np.argsort(-piezas) if piezas[j] <= length + EPS]
+    if not order:
+        return [np.zeros(n, dtype=int)]
+    smallest = float(piezas[order[-1]])
+    found = []
+    cur = np.zeros(n, dtype=int)
+
+    def dfs(idx, cap):
+        if len(found) > limit:
+            return
+        if idx == len(order):
+            if cap < smallest - EPS:
+                found.append(cur.copy())
+            return
+        j = order[idx]
+        for q in range(int((cap + EPS) // piezas[j]), -1, -1):
+            cur[j] = q
+            dfs(idx + 1, cap - q * piezas[j])
+        cur[j] = 0
+
+    dfs(0, float(length))
+    return None if len(found) > limit else found
+
+
+def build_master(lengths, counts, piezas, lim_inf, columns, integer=False):
+    """Build the pattern model over ``columns``, a list of ``(k, a)`` pairs.
+
+    Returns the problem and the array of usage variables. The LP version gets
+    phase-one slack on the demand rows so it stays feasible while the pool is
+    still too small.
+    """
+    master = plp.LpProblem("iponch_p", plp.LpMinimize)
+    cat = 'Integer' if integer else 'Continuous'
+    # No pattern is used on more bars than its stock type has
+    y = np.array([plp.LpVariable(f"y_{q}", lowBound=0, upBound=int(counts[k]), cat=cat)
+                  for q, (k, _) in enumerate(columns)], dtype=object)
+
+    waste = [float(lengths[k] - piezas @ a) for k, a in columns]
+    objective = plp.LpAffineExpression(zip(y, waste))
+
+    supply_terms = [[] for _ in lengths]
+    demand_terms = [[] for _ in piezas]
+    for q, (k, a) in enumerate(columns):
+        supply_terms[k].append((y[q], 1))
+        for j in np.flatnonzero(a):
+            demand_terms[j].append((y[q], int(a[j])))
+
+    if not integer:
+        s = [plp.LpVariable(f"s_{j}", lowBound=0) for j in range(len(piezas))]
+        objective += plp.lpSum(s) * ARTIFICIAL_COST
+        for j in range(len(piezas)):
+            demand_terms[j].append((s[j], 1))
+    master += objective
+
+    for k in range(len(lengths)):
+        master += plp.LpAffineExpression(supply_terms[k]) == int(counts[k]), f"supply_{k}"
+    for j in range(len(piezas)):
+        master += plp.LpAffineExpression(demand_terms[j]) >= float(lim_inf[j]), f"demand_{j}"
+
+    return master, y
+
+
+def read_values(y):
+    """Read variable values back as one array."""
+    return np.fromiter((v.varValue or 0.0 for v in y), dtype=float, count=len(y))
+
+
+def warm_start(y, columns, usage):
+    """Set ``usage`` as the initial values of ``y``.
+
+    Returns ``False`` if a pattern of ``usage`` is not among ``columns``.
+    """
+    index = {(k, tuple(int(x) for x in a)): q for q, (k, a) in enumerate(columns)}
+    values = np.zeros(len(columns))
+    for k, a, mult in usage:
+        q = index.get((k, tuple(int(x) for x in a)))
+        if q is None:
+            return False
+        values[q] += mult
+    for var, value in zip(y, values):
+        var.setInitialValue(value)
+    return True
+
+
+def run_master(master, y, columns, time_limit=None, msg=False, initial=None, backend="auto", trace=None,
+               seed=None, cutoff=None):
+    """Solve a built pattern model, warm started from ``initial`` if given.
+
+    ``seed`` and ``cutoff`` go to the backend (see ``backends.Backend``).
+    The model size and the backend's statistics are recorded in ``trace``.
+    Returns the values of ``y`` and the total phase-one slack.
+    """
+    warm = initial is not None and warm_start(y, columns, initial)
+    chosen = choose_backend(backend, len(columns))
+    log_path = None
+    if trace is not None and chosen.writes_log:
+        fd, log_path = tempfile.mkstemp(prefix="iponch_", suffix=".log")
+        os.close(fd)
+    try:
+        solver = chosen.make(msg, time_limit, warm, log_path, seed=seed, cutoff=cutoff)
+        with phase(trace, "solve"):
+            master.solve(solver)
+        if trace is not None:
+            trace.record_model(master)
+            trace.record_solver(chosen.name, chosen.stats(solver, master, log_path))
+    finally:
+        if log_path is not None:
+            os.remove(log_path)
+    slack = sum((v.varValue or 0.0) for v in master.variables() if v.name.startswith("s_"))
+    return read_values(y), slack
+
+
+def solve_master(lengths, counts, piezas, lim_inf, columns, integer=False, time_limit=None, msg=False,
+                 initial=None, backend="auto", trace=None):
+    """Build and solve the pattern model.
+
+    ``initial`` is an optional incumbent usage to warm start CBC from.
+    ``backend`` names the MILP backend (see ``backends``), ``trace`` is an
+    optional ``solve_trace.Trace``.
+    Returns the problem (its ``supply_k``/``demand_j`` constraints carry the
+    duals), the values of ``y`` and the total phase-one slack.
+    """
+    with phase(trace, "build"):
+        master, y = build_master(lengths, counts, piezas, lim_inf, columns, integer)
+    values, slack = run_master(master, y, columns, time_limit, msg, initial, backend, trace)
+    return master, values, slack
+
+
+class PatternModel:
+    """Integer pattern model that can be re-solved with new quantities.
+
+    The columns only depend on the stock and piece lengths, so when just the
+    bar counts or the minimum quantities change, ``update`` rewrites the
+    right-hand sides and usage bounds in place instead of rebuilding.
+    """
+
+    def __init__(self, lengths, counts, piezas, lim_inf, columns):
+        self.lengths = np.array(lengths)
+        self.piezas = np.array(piezas)
+        self.columns = columns
+        self.master, self.y = build_master(lengths, counts, piezas, lim_inf, columns, integer=True)
+
+    def matches(self, lengths, piezas):
+        """Whether the model was built for these lengths."""
+        return np.array_equal(self.lengths, lengths) and np.array_equal(self.piezas, piezas)
+
+    def update(self, counts, lim_inf):
+        for k, count in enumerate(counts):
+            self.master.constraints[f"supply_{k}"].constant = -int(count)
+        for j, qty in enumerate(lim_inf):
+            self.master.constraints[f"demand_{j}"].constant = -float(qty)
+        for var, (k, _) in zip(self.y, self.columns):
+            var.upBound = int(counts[k])
+
+    def solve(self, time_limit=None, msg=False, initial=None, backend="auto", trace=None, seed=None, cutoff=None):
+        """Solve and return the values of the usage variables."""
+        values, _ = run_master(self.master, self.y, self.columns, time_limit, msg, initial, backend, trace,
+                               seed, cutoff)
+        return values
+
+
+def usage_from_values(columns, values):
+    """Turn usage values into ``(k, a, multiplicity)`` triples."""
+    counts = np.rint(values).astype(int)
+    return [(k, a, int(counts[q])) for q, (k, a) in enumerate(columns) if counts[q] > 0]
+
+
+def adjust_usage(usage, lengths, counts, piezas, lim_inf):
+    """Fit a plan to new bar counts and quantities.
+
+    Surplus bars are dropped, most wasteful patterns first, and missing bars
+    are cut with fills of the remaining demand. Returns ``None`` if the
+    result does not meet ``lim_inf``.
+    """
+    used = np.zeros(len(counts), dtype=int)
+    fitted = []
+    for k, a, mult in sorted(usage, key=lambda u: float(lengths[u[0]] - piezas @ u[1])):
+        keep = min(mult, int(counts[k]) - used[k])
+        if keep > 0:
+            fitted.append((k, a, keep))
+            used[k] += keep
+    produced = usage_produced(fitted, len(piezas))
+    for k in range(len(counts)):
+        missing = int(counts[k]) - used[k]
+        while missing > 0:
+            remaining = np.maximum(np.ceil(np.asarray(lim_inf) - produced - 1e-9), 0).astype(int)
+            a = fill_bar(lengths[k], piezas, remaining)
+            # Once the demand is met every further bar gets the same fill
+            mult = missing if not remaining.any() else 1
+            fitted.append((k, a, mult))
+            produced += a * mult
+            missing -= mult
+    if np.any(produced < np.asarray(lim_inf) - 1e-9):
+        return None
+    return fitted
+
+
+def best_fills(lengths, piezas):
+    """Longest total of pieces that fits in each stock length, exactly.
+
+    Whole-number lengths up to ``MAX_FILL_LENGTH`` are read off a
+    reachability table; otherwise the branch and bound is used, and a length
+    whose search hits its node limit counts as filled completely (the
+    relaxation), so the result never exceeds the true fills.
+    """
+    lengths = np.asarray(lengths, dtype=float)
+    piezas = np.asarray(piezas, dtype=float)
+    values = np.concatenate([lengths, piezas])
+    if (len(lengths) and np.all(values == np.rint(values)) and lengths.max() <= MAX_FILL_LENGTH):
+        reach = reachable(int(lengths.max()), piezas)
+        # Totals reached up to each position: the fill of a length is the last one
+        last = np.maximum.accumulate(np.where(reach, np.arange(len(reach)), 0))
+        return last[lengths.astype(int)].astype(float)
+    fills = np.empty(len(lengths))
+    for k, length in enumerate(lengths):
+        fill, _, complete = search(length, piezas, piezas)
+        fills[k] = fill if complete else length
+    return fills
+
+
+def lower_bound(lengths, counts, piezas):
+    """Quick lower bound on the total waste.
+
+    Every bar is cut, so each one wastes at least what is left after the best
+    possible fill of its length, ignoring the demand.
+    """
+    fills = best_fills(lengths, piezas)
+    return float(sum(int(count) * (float(length) - fill) for length, count, fill in zip(lengths, counts, fills)))
+
+
+def usage_waste(usage, lengths, piezas):
+    return sum(mult * float(lengths[k] - piezas @ a) for k, a, mult in usage)
+
+
+def usage_produced(usage, n):
+    produced = np.zeros(n, dtype=int)
+    for _, a, mult in usage:
+        produced += a * mult
+    return produced
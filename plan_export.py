@@ -0,0 +1,127 @@
+"""Streaming export and reload of cutting plans.
+
+Plans are written in the ``stockPatters`` shape of ``cut_stock`` results,
+one entry per distinct pattern with its ``count`` (the rows of
+``Plan.table``) or, with ``grouped=False``, one entry per bar. Entries are
+written one at a time from the pattern table, so a plan with thousands of
+bars never exists as per-bar lists in memory, in the file writer or in the
+app's text box, and loading a plan rebuilds the table without expanding it.
+
+JSON files put the totals, the piece lengths and minimum quantities on the
+first line and each entry on a line of its own, so they are read back one
+entry at a time; other JSON files in the same shape (such as ``cut_stock``
+results) are read whole. CSV files have a ``# {...}`` comment line with the
+same header fields, then ``size,count,waste,cuts`` rows with the cuts
+separated by spaces.
+"""
+import csv
+import json
+
+import numpy as np
+
+from order_import import iter_json_array
+from stock_solver import PatternTable, Plan
+
+CSV_FIELDS = ["size", "count", "waste", "cuts"]
+
+
+def _header(plan):
+    return {"waste": plan.total_waste, "status": plan.status, "lowerBound": plan.lower_bound,
+            "decimals": plan.decimals, "pieces": [float(p) for p in plan.pieces],
+            "minQuantities": [float(q) for q in plan.min_qty]}
+
+
+def iter_entries(plan, grouped=True):
+    """``stockPatters`` entries of ``plan``, one per pattern (with ``count``) or per bar."""
+    return plan.entries(grouped)
+
+
+def write_json(plan, stream, grouped=True):
+    """Write ``plan`` to a text stream as JSON, one ``stockPatters`` entry per line."""
+    header = json.dumps(_header(plan))
+    stream.write(header[:-1] + ', "stockPatters": [\n')
+    for k, entry in enumerate(iter_entries(plan, grouped)):
+        stream.write(("" if k == 0 else ",\n") + json.dumps(entry))
+    stream.write("\n]}\n")
+
+
+def write_csv(plan, stream, grouped=True):
+    """Write ``plan`` to a text stream as CSV rows of ``size,count,waste,cuts``."""
+    stream.write("# " + json.dumps(_header(plan)) + "\n")
+    writer = csv.writer(stream, lineterminator="\n")
+    writer.writerow(CSV_FIELDS)
+    for entry in iter_entries(plan, grouped):
+        writer.writerow([entry["size"], entry.get("count", 1), entry["waste"],
+                         " ".join(f"{c:g}" for c in entry["cuts"])])
+
+
+class _PatternCounter:
+    """Entries summed into distinct ``(size, cuts)`` patterns as they are read."""
+
+    def __init__(self, pieces=()):
+        self.index = {float(p): j for j, p in enumerate(pieces)}
+        self.patterns = {}
+
+    def add(self, size, cuts, count=1):
+        row = {}
+        for cut in cuts:
+            j = self.index.setdefault(float(cut), len(self.index))
+            row[j] = row.get(j, 0) + 1
+        key = (float(size), tuple(sorted(row.items())))
+        self.patterns[key] = self.patterns.get(key, 0) + int(count)
+
+    def plan(self, header):
+        pieces = np.array(sorted(self.index, key=self.index.get), dtype=float)
+        counts = np.zeros((len(self.patterns), len(pieces)), dtype=int)
+        for r, (_, row) in enumerate(self.patterns):
+            for j, c in row:
+                counts[r, j] = c
+        table = PatternTable(np.array([size for size, _ in self.patterns], dtype=float), counts,
+                             np.array(list(self.patterns.values()), dtype=int))
+        min_qty = header.get("minQuantities") or [0.0] * len(pieces)
+        min_qty = list(min_qty) + [0.0] * (len(pieces) - len(min_qty))
+        return Plan.from_patterns(table, pieces, min_qty, header.get("status", "Loaded"),
+                                  lower_bound=header.get("lowerBound"), decimals=header.get("decimals"))
+
+
+def read_json(stream):
+    """Load a plan written by ``write_json`` or any JSON object with ``stockPatters``."""
+    first = stream.readline()
+    if first.rstrip().endswith('"stockPatters": ['):
+        header = json.loads(first.rstrip() + "]}")
+        entries = iter_json_array(stream)
+    else:
+        header = json.loads(first + stream.read())
+        entries = header.pop("stockPatters")
+    counter = _PatternCounter(header.get("pieces", ()))
+    for entry in entries:
+        counter.add(entry["size"], entry["cuts"], entry.get("count", 1))
+    return counter.plan(header)
+
+
+def read_csv(stream):
+    """Load a plan written by ``write_csv``."""
+    first = stream.readline()
+    header = json.loads(first[1:]) if first.startswith("#") else {}
+    reader = csv.DictReader(stream if header else [first, *stream])
+    counter = _PatternCounter(header.get("pieces", ()))
+    for row in reader:
+        counter.add(row["size"], row["cuts"].split(), row.get("count") or 1)
+    return counter.plan(header)
+
+
+def export_plan(plan, path, grouped=True):
+    """Write ``plan`` to ``path``, as CSV for ``.csv`` files and JSON otherwise."""
+    with open(path, "w", newline="") as stream:
+        if str(path).lower().endswith(".csv"):
+            write_csv(plan, stream, grouped)
+        else:
+            write_json(plan, stream, grouped)
+
+
+def load_plan(path):
+    """Read a plan exported by ``export_plan``."""
+    with open(path, newline="") as stream:
+        if str(path).lower().endswith(".csv"):
+            return read_csv(stream)
+        return read_json(stream)
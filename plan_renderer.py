@@ -0,0 +1,125 @@
+"""Cutting plan drawing for the desktop app.
+
+Bars with the same stock length and cuts are drawn once, as one row
+labelled with their multiplicity. All piece and waste segments share two
+``PolyCollection`` artists on a single axes, and only the rows inside the
+visible window are turned into vertices and labels, so scrolling through a
+plan with thousands of bars costs about as much as drawing one screenful.
+"""
+import numpy as np
+from matplotlib.collections import PolyCollection
+
+COLORS = ['#3498db', '#2ecc71', '#e74c3c', '#f1c40f', '#9b59b6']
+WASTE_COLOR = '#555555'
+ROW_HEIGHT = 0.6
+# Height of one row on screen, for working out how many rows fit
+ROW_PIXELS = 48
+
+
+def pattern_rows(plan):
+    """Distinct bars of a plan as ``(stock length, counts row, multiplicity)``.
+
+    Rows are in the order of ``plan.table``, longest stock first.
+    """
+    table = plan.table
+    return [(float(length), counts, int(mult)) for length, counts, mult in zip(*table)]
+
+
+class PlanRenderer:
+    """Draws the rows of a plan that fall in a scroll window onto ``ax``."""
+
+    def __init__(self, ax, visible_rows=12):
+        self.ax = ax
+        self.visible_rows = visible_rows
+        self.first = 0
+        self.rows = []
+        self.pieces = None
+        self.labels = []
+        self.segments = PolyCollection([], edgecolors='#1a1a1a', linewidths=1.0)
+        self.waste = PolyCollection([], facecolors=WASTE_COLOR, edgecolors='#1a1a1a', linewidths=1.0,
+                                    alpha=0.6, hatch='//')
+        ax.add_collection(self.segments)
+        ax.add_collection(self.waste)
+        ax.set_facecolor('#2b2b2b')
+        ax.grid(True, axis='x', linestyle='--', alpha=0.3, color='white')
+        ax.set_xlabel('Length', color='white', fontsize=12)
+        ax.set_title('Cutting Patterns Visualization', color='white', fontsize=14)
+        for spine in ax.spines.values():
+            spine.set_color('white')
+            spine.set_linewidth(0.5)
+
+    def set_plan(self, plan):
+        self.rows = pattern_rows(plan)
+        self.pieces = np.asarray(plan.pieces, dtype=float)
+        # A plan that cuts no new bars (all pieces from remnants) leaves the axes empty
+        longest = float(np.max(plan.table.stock)) if len(plan.table.stock) else 1.0
+        self.ax.set_xlim(0, longest * 1.05)
+        self.scroll_to(0)
+
+    def set_visible_rows(self, count):
+        self.visible_rows = max(1, int(count))
+        self.scroll_to(self.first)
+
+    @property
+    def view(self):
+        """Visible part of the rows as ``(top, bottom)`` fractions, for a scrollbar."""
+        if not self.rows:
+            return 0.0, 1.0
+        total = len(self.rows)
+        return self.first / total, min(self.first + self.visible_rows, total) / total
+
+    def scroll(self, delta):
+        self.scroll_to(self.first + delta)
+
+    def scroll_to(self, first):
+        """Redraw the collections for rows ``first`` to ``first + visible_rows``."""
+        self.first = int(max(0, min(first, len(self.rows) - self.visible_rows)))
+        window = self.rows[self.first:self.first + self.visible_rows]
+        for label in self.labels:
+            label.remove()
+        self.labels = []
+
+        verts, colors, waste_verts = [], [], []
+        min_label = self.ax.get_xlim()[1] * 0.04
+        half = ROW_HEIGHT / 2
+        for r, (length, counts, _) in enumerate(window):
+            y = -r
+            kinds = np.repeat(np.arange(len(counts)), counts)
+            sizes = self.pieces[kinds]
+            ends = np.cumsum(sizes)
+            starts = ends - sizes
+            if len(sizes):
+                quads = np.empty((len(sizes), 4, 2))
+                quads[:, :, 0] = np.column_stack([starts, starts, ends, ends])
+                quads[:, :, 1] = [y - half, y + half, y + half, y - half]
+                verts.extend(quads)
+                colors.extend(COLORS[j % len(COLORS)] for j in kinds)
+            used = float(ends[-1]) if len(sizes) else 0.0
+            if used < length:
+                waste_verts.append([(used, y - half), (used, y + half), (length, y + half), (length, y - half)])
+            # Piece labels only where they fit
+            for start, size in zip(starts, sizes):
+                if size >= min_label:
+                    self.labels.append(self.ax.text(start + size / 2, y, f'{size:g}', ha='center', va='center',
+                                                    color='white', fontsize=9, fontweight='bold'))
+
+        self.segments.set_verts(verts)
+        self.segments.set_facecolors(colors)
+        self.waste.set_verts(waste_verts)
+        ys = -np.arange(len(window))
+        self.ax.set_yticks(ys)
+        self.ax.set_yticklabels([f'{length:g} ×{mult}' for length, _, mult in window], color='white')
+        self.ax.set_ylim(-self.visible_rows + half, half + 0.2)
+
+
+def render_image(plan, width=8, height=6, dpi=100):
+    """Draw the first screenful of a plan off-screen, as the app would. Returns the figure."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(width, height), dpi=dpi, facecolor='#2b2b2b')
+    FigureCanvasAgg(fig)
+    renderer = PlanRenderer(fig.add_subplot(1, 1, 1), visible_rows=max(1, int(height * dpi / ROW_PIXELS)))
+    renderer.set_plan(plan)
+    fig.canvas.draw()
+    return fig
@@ -0,0 +1,139 @@
+"""Parallel portfolio solving.
+
+Several strategies (CBC with different seeds, HiGHS when installed, column
+generation and the heuristics) solve the same order at once, one process
+each. They share the least waste found so far through shared memory: every
+MILP strategy uses it as its cutoff, so it only searches for better plans,
+and a MILP that finds none has proven the shared waste optimal. The race
+ends as soon as a plan is proven optimal (by its own strategy or by another
+one's bound), every strategy has finished or died, or the time budget runs
+out, and the remaining processes are killed together with their CBC
+subprocesses. Strategies that die without a result (killed, out of memory)
+are reported with their exit code.
+
+Each strategy pays a process start (about half a second for the imports),
+so the portfolio is meant for orders that take seconds, not milliseconds.
+"""
+import dataclasses
+import math
+import multiprocessing as mp
+import os
+import queue
+import time
+
+from backends import available_backends
+from solve_worker import kill_process_tree
+from stock_solver import SolveOptions, solve, validate_inputs
+
+# Strategies as (name, SolveOptions overrides), in the order they are kept
+# when there are fewer cores; the heuristic first so there is always a plan
+STRATEGIES = [
+    ("fast", {"engine": "fast"}),
+    ("cbc-1", {"engine": "milp", "backend": "cbc", "seed": 1}),
+    ("colgen", {"engine": "colgen"}),
+    ("cbc-2", {"engine": "milp", "backend": "cbc", "seed": 2}),
+]
+# Time over the limit allowed for building models and returning plans
+GRACE = 2.0
+# Seconds between checks that the strategy processes are still running
+POLL = 0.2
+
+
+def default_strategies(workers=None):
+    """``STRATEGIES`` plus HiGHS if installed, at most one per core."""
+    strategies = list(STRATEGIES)
+    if "highs" in available_backends():
+        strategies.insert(3, ("highs", {"engine": "milp", "backend": "highs", "seed": 1}))
+    return strategies[:max(2, workers or os.cpu_count() or 1)]
+
+
+def _run_strategy(name, stock, pieces, min_qty, options, best, results):
+    if hasattr(os, "setsid"):
+        # Own process group so the race can take CBC down with us
+        os.setsid()
+
+    def share(waste, bound=None):
+        with best.get_lock():
+            best.value = min(best.value, waste)
+
+    def cutoff():
+        return None if math.isinf(best.value) else best.value
+
+    start = time.monotonic()
+    try:
+        plan = solve(stock, pieces, min_qty, dataclasses.replace(options, on_incumbent=share, cutoff=cutoff))
+        share(plan.total_waste)
+        results.put((name, "done", plan, time.monotonic() - start))
+    except Exception as e:
+        results.put((name, "error", str(e), time.monotonic() - start))
+
+
+def solve_portfolio(stock, pieces, min_qty, options=None, strategies=None):
+    """Race ``strategies`` (default: ``default_strategies()``) and return the best plan.
+
+    ``options.time_limit`` is each strategy's budget. The winning strategy
+    and every strategy's outcome are recorded in ``plan.trace.info`` under
+    ``"strategy"`` and ``"portfolio"``.
+    """
+    options = options or SolveOptions()
+    validate_inputs(stock, pieces, min_qty)
+    strategies = strategies or default_strategies()
+    ctx = mp.get_context("spawn")
+    best = ctx.Value("d", math.inf)
+    results = ctx.Queue()
+    processes = {}
+    for name, overrides in strategies:
+        process = ctx.Process(target=_run_strategy, daemon=True, args=(
+            name, stock, pieces, min_qty, dataclasses.replace(options, **overrides), best, results))
+        process.start()
+        processes[name] = process
+
+    deadline = None if options.time_limit is None else time.monotonic() + options.time_limit + GRACE
+    outcomes = {}
+    winner, winner_name, bound, error = None, None, 0.0, None
+    try:
+        while len(outcomes) < len(processes):
+            timeout = POLL if deadline is None else min(POLL, deadline - time.monotonic())
+            if timeout <= 0:
+                break
+            # Strategies already gone before this wait have had their results delivered
+            exited = [name for name, process in processes.items() if not process.is_alive()]
+            try:
+                name, kind, payload, elapsed = results.get(timeout=timeout)
+            except queue.Empty:
+                for name in exited:
+                    if name not in outcomes:
+                        # Killed or crashed (out of memory, a solver abort) without reporting
+                        message = f"{name} exited with code {processes[name].exitcode}"
+                        outcomes[name] = {"status": "Error", "error": message}
+                        error = error or message
+                continue
+            if kind == "error":
+                outcomes[name] = {"status": "Error", "error": payload, "time": elapsed}
+                error = error or payload
+                continue
+            plan = payload
+            outcomes[name] = {"status": plan.status, "waste": plan.total_waste, "lower_bound": plan.lower_bound,
+                              "time": elapsed}
+            if winner is None or plan.total_waste < winner.total_waste - 1e-9:
+                winner, winner_name = plan, name
+            if plan.lower_bound is not None:
+                bound = max(bound, plan.lower_bound)
+            if plan.status == "Optimal" or winner.total_waste <= bound + 1e-9:
+                break
+    finally:
+        for name, process in processes.items():
+            if process.is_alive():
+                kill_process_tree(process.pid)
+                outcomes.setdefault(name, {"status": "Stopped"})
+            process.join(timeout=1)
+
+    if winner is None:
+        raise ValueError(error or "No strategy found a plan within the time limit")
+    winner.lower_bound = max(winner.lower_bound or 0.0, bound)
+    if winner.total_waste <= winner.lower_bound + 1e-9:
+        winner.status = "Optimal"
+    if winner.trace is not None:
+        winner.trace.info["strategy"] = winner_name
+        winner.trace.info["portfolio"] = outcomes
+    return winner
@@ -0,0 +1,188 @@
+"""Presolve for the aggregated pattern model.
+
+Runs on the integer instance before any engine builds a model:
+
+- bounds: ``upper[k, j]`` is the most pieces ``j`` the bars of type ``k`` can
+  hold (the vectorized form of ``lim_sup`` in ``bryan_v1.py``); usage counts
+  are bounded by the bar counts
+- infeasibility: demand that no combination of bars can cover is reported
+  with the piece or length class responsible, before CBC is started
+- dominated pieces: a zero-demand piece whose length is exactly a sum of
+  other pieces never lowers the waste (the sum can be cut in its place), so
+  it is dropped
+- fixing: stock types that can hold only one kind of piece, or none, have a
+  single maximal pattern; their bars are fixed to it and leave the model
+
+Sizes are counted on the per-bar formulation of the original model: one
+variable per (stock type, piece) pair, one supply row per stock type and
+one demand row per piece.
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+
+# Domination is checked with a reachability table over the piece length;
+# longer pieces (very fine units) are kept as they are
+MAX_DP_LENGTH = 1_000_000
+
+
+@dataclass
+class Presolve:
+    """Reduced instance and what was taken out of it.
+
+    ``lengths``/``counts``/``piezas``/``lim_inf`` are the reduced instance;
+    ``types`` and ``kept`` map its stock types and pieces back to the
+    original ones. ``fixed`` is the usage of the fixed bars in original
+    indices and ``upper`` the per-(type, piece) bounds of the full instance.
+    """
+    lengths: np.ndarray
+    counts: np.ndarray
+    piezas: np.ndarray
+    lim_inf: np.ndarray
+    types: np.ndarray
+    kept: np.ndarray
+    n: int
+    fixed: list = field(default_factory=list)
+    fixed_waste: float = 0.0
+    upper: np.ndarray = None
+    removed_variables: int = 0
+    removed_constraints: int = 0
+    dropped: list = field(default_factory=list)
+
+    @property
+    def empty(self) -> bool:
+        """True when every bar was fixed and nothing is left to solve."""
+        return len(self.lengths) == 0
+
+    def postsolve(self, usage: list) -> list:
+        """Map reduced usage back to the full instance and add the fixed bars."""
+        full = []
+        for k, a, mult in usage:
+            pattern = np.zeros(self.n, dtype=int)
+            pattern[self.kept] = a
+            full.append((int(self.types[k]), pattern, mult))
+        return full + self.fixed
+
+    def summary(self) -> str:
+        fixed_bars = sum(mult for _, _, mult in self.fixed)
+        return (f"removed {self.removed_variables} variables, {self.removed_constraints} constraints "
+                f"({len(self.dropped)} dominated pieces, {fixed_bars} fixed bars)")
+
+
+def capacity_bounds(lengths, counts, piezas):
+    """``upper[k, j]``: most pieces ``j`` the ``counts[k]`` bars of type ``k`` can hold."""
+    return counts[:, None] * (lengths[:, None] // piezas[None, :])
+
+
+def reachable(capacity, sizes):
+    """Boolean table of the totals ``0..capacity`` that sums of ``sizes`` hit exactly."""
+    reach = np.zeros(capacity + 1, dtype=bool)
+    reach[0] = True
+    for w in sizes:
+        w = int(w)
+        if w > capacity:
+            continue
+        # Unbounded copies of w: cumulative OR along each residue class mod w
+        rows = -(-(capacity + 1) // w)
+        padded = np.zeros(rows * w, dtype=bool)
+        padded[:capacity + 1] = reach
+        reach = np.logical_or.accumulate(padded.reshape(rows, w), axis=0).ravel()[:capacity + 1]
+    return reach
+
+
+def check_feasibility(lengths, counts, piezas, lim_inf, upper, unit=1.0):
+    """Raise ``ValueError`` naming the reason if the demand cannot be met.
+
+    ``unit`` converts the integer lengths back for the message.
+    """
+    def real(x):
+        return f"{float(x) * unit:.10g}"
+
+    short = np.flatnonzero(upper.sum(axis=0) < lim_inf)
+    if len(short):
+        j = short[0]
+        raise ValueError(f"Infeasible: {int(np.ceil(lim_inf[j]))} pieces of size {real(piezas[j])} are "
+                         f"required but the stock can hold at most {int(upper[:, j].sum())}")
+
+    # Pieces longer than the next shorter stock length only fit the longer bars
+    for k in range(len(lengths) - 1):
+        only_long = piezas > lengths[k + 1]
+        need = float(piezas[only_long] @ lim_inf[only_long])
+        have = float(lengths[:k + 1] @ counts[:k + 1])
+        if need > have:
+            raise ValueError(f"Infeasible: pieces longer than {real(lengths[k + 1])} need a total length of "
+                             f"{real(need)} but the bars they fit in only have {real(have)}")
+
+    # No bar holds two pieces longer than half of the longest stock
+    big = piezas * 2 > lengths[0]
+    for k in range(len(lengths)):
+        group = big if k + 1 == len(lengths) else big & (piezas > lengths[k + 1])
+        need = int(np.ceil(lim_inf[group] - 1e-9).sum())
+        bars = int(counts[:k + 1].sum())
+        if need > bars:
+            raise ValueError(f"Infeasible: {need} pieces longer than {real(lengths[0] / 2)} are required "
+                             f"but only {bars} bars can hold one")
+
+
+def dominated_pieces(piezas, lim_inf):
+    """Zero-demand pieces whose length is a sum of other kept pieces."""
+    kept = list(range(len(piezas)))
+    dropped = []
+    # Longest first, so shorter pieces are still around to build it from
+    for j in sorted(range(len(piezas)), key=lambda j: -piezas[j]):
+        if lim_inf[j] > 0 or piezas[j] > MAX_DP_LENGTH:
+            continue
+        others = [piezas[i] for i in kept if i != j]
+        if others and reachable(int(piezas[j]), others)[-1]:
+            kept.remove(j)
+            dropped.append(j)
+    return np.array(sorted(kept), dtype=int), dropped
+
+
+def presolve(lengths, counts, piezas, lim_inf, unit=1.0):
+    """Reduce an integer instance. Raises ``ValueError`` if it is infeasible."""
+    n = len(piezas)
+    upper = capacity_bounds(lengths, counts, piezas)
+    check_feasibility(lengths, counts, piezas, lim_inf, upper, unit)
+
+    kept, dropped = dominated_pieces(piezas, lim_inf)
+    sub_piezas = piezas[kept]
+    remaining = lim_inf.astype(float).copy()
+
+    fixed = []
+    fixed_waste = 0.0
+    types = []
+    for k, length in enumerate(lengths):
+        fits = np.flatnonzero(sub_piezas <= length)
+        if len(fits) > 1:
+            types.append(k)
+            continue
+        # Only one maximal pattern: as many copies of the one fitting piece as possible
+        a = np.zeros(n, dtype=int)
+        if len(fits) == 1:
+            j = kept[fits[0]]
+            a[j] = int(length // piezas[j])
+        fixed.append((k, a, int(counts[k])))
+        fixed_waste += int(counts[k]) * float(length - piezas @ a)
+        remaining -= a * int(counts[k])
+    types = np.array(types, dtype=int)
+    remaining = np.maximum(remaining, 0)
+
+    sub_upper = upper[np.ix_(types, kept)]
+    short = np.flatnonzero(sub_upper.sum(axis=0) < remaining[kept])
+    if len(short):
+        j = kept[short[0]]
+        raise ValueError(f"Infeasible: {int(np.ceil(lim_inf[j]))} pieces of size {float(piezas[j]) * unit:.10g} "
+                         f"are required but the stock can hold at most "
+                         f"{int(lim_inf[j] - remaining[j] + sub_upper[:, short[0]].sum())}")
+
+    # Variables: (type, piece) pairs left out, either fixed, dropped or unable to fit
+    model_variables = int(np.count_nonzero(sub_upper))
+    model_constraints = len(types) + int(np.count_nonzero(remaining[kept] > 0))
+    return Presolve(
+        lengths=lengths[types], counts=counts[types], piezas=sub_piezas, lim_inf=remaining[kept],
+        types=types, kept=kept, n=n, fixed=fixed, fixed_waste=fixed_waste, upper=upper,
+        removed_variables=len(lengths) * n - model_variables,
+        removed_constraints=len(lengths) + n - model_constraints,
+        dropped=dropped,
+    )
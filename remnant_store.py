@@ -0,0 +1,166 @@
+"""Remnant (offcut) inventory carried across orders.
+
+Leftovers at least ``min_length`` long go back on the rack instead of into
+the scrap bin. The rack is a SQLite table indexed by length. An order is
+first cut from remnants: only remnants that fit the shortest demanded piece
+are read (one index range scan, already sorted by length), and the demand is
+placed longest piece first into the tightest remnant that takes it, found by
+bisection over the sorted remaining lengths. The demand that is left is
+solved on new stock with ``SolveOptions.optional_stock``, so the new bars
+the remnants replace stay uncut, and the MILP never sees the remnants and
+stays the same size.
+
+``RemnantStore.solve`` does the three steps at once; the app calls
+``reserve``, ``merge_plan`` and ``commit`` separately because the new-stock
+solve runs in its worker process.
+"""
+import math
+import sqlite3
+import time
+from bisect import bisect_left, insort
+from dataclasses import dataclass, replace
+from typing import List
+
+import numpy as np
+
+from patterns import EPS
+from stock_solver import PatternTable, Plan, SolveOptions, integer_scale, solve, verify_plan
+
+
+@dataclass
+class Allocation:
+    """Demand placed on remnants before the new-stock solve.
+
+    ``ids`` and ``lengths`` are the remnants used and ``cuts`` their
+    ``(len(ids), len(pieces))`` pattern matrix; ``residual`` is the minimum
+    quantity still to be cut from new stock.
+    """
+    ids: List[int]
+    lengths: np.ndarray
+    cuts: np.ndarray
+    residual: np.ndarray
+
+    @property
+    def covered(self) -> np.ndarray:
+        return self.cuts.sum(axis=0)
+
+
+class RemnantStore:
+    """Rack of reusable offcuts.
+
+    ``path`` is a SQLite file; ``None`` keeps the rack in memory only.
+    Leftovers shorter than ``min_length`` are scrap and are not stored.
+    """
+
+    def __init__(self, path=None, min_length=0.0):
+        self.min_length = float(min_length)
+        self._db = sqlite3.connect(":memory:" if path is None else path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS remnants (id INTEGER PRIMARY KEY, length REAL NOT NULL, "
+            "added REAL NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS remnants_length ON remnants (length)")
+        self._db.commit()
+        self.taken = []
+        self.stored = []
+
+    def add(self, lengths):
+        """Put offcuts on the rack; those below ``min_length`` are dropped. Returns the stored lengths."""
+        keep = [float(l) for l in lengths if l >= self.min_length - EPS and l > EPS]
+        now = time.time()
+        self._db.executemany("INSERT INTO remnants (length, added) VALUES (?, ?)", [(l, now) for l in keep])
+        self._db.commit()
+        return keep
+
+    def lengths(self):
+        """Lengths on the rack, shortest first."""
+        return [row[0] for row in self._db.execute("SELECT length FROM remnants ORDER BY length")]
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM remnants").fetchone()[0]
+
+    def reserve(self, pieces, min_qty) -> Allocation:
+        """Best-fit decreasing placement of the demand on the rack.
+
+        Nothing is taken off the rack until ``commit``. Remnants are only cut
+        for demanded pieces; their leftovers stay reusable.
+        """
+        piezas = np.asarray(pieces, dtype=float)
+        lim_inf = np.asarray(min_qty, dtype=float)
+        need = np.ceil(lim_inf - EPS).clip(min=0).astype(int)
+        rows = []
+        if need.any():
+            shortest = float(piezas[need > 0].min())
+            rows = self._db.execute("SELECT id, length FROM remnants WHERE length >= ? ORDER BY length",
+                                    (shortest - EPS,)).fetchall()
+
+        # Remaining length of every candidate remnant, kept sorted
+        free = [(length, r) for r, (_, length) in enumerate(rows)]
+        cuts = np.zeros((len(rows), len(piezas)), dtype=int)
+        for j in np.argsort(-piezas, kind="stable"):
+            for _ in range(need[j]):
+                pos = bisect_left(free, (piezas[j] - EPS, -1))
+                if pos == len(free):
+                    break
+                left, r = free.pop(pos)
+                cuts[r, j] += 1
+                insort(free, (left - piezas[j], r))
+
+        used = np.flatnonzero(cuts.any(axis=1))
+        residual = np.maximum(lim_inf - cuts.sum(axis=0), 0)
+        return Allocation([rows[r][0] for r in used], np.array([rows[r][1] for r in used], dtype=float),
+                          cuts[used], residual)
+
+    def commit(self, allocation, plan):
+        """Take the used remnants off the rack and store the plan's usable leftovers."""
+        if allocation.ids:
+            self._db.executemany("DELETE FROM remnants WHERE id = ?", [(i,) for i in allocation.ids])
+        self.taken = [float(l) for l in allocation.lengths]
+        leftovers = plan.stock - plan.used_per_stock
+        if plan.decimals is not None:
+            leftovers = np.round(leftovers, plan.decimals)
+        self.stored = self.add(leftovers)
+
+    def solve(self, stock, pieces, min_qty, options=None) -> Plan:
+        """Cut the order from remnants first and new stock for the rest, then update the rack.
+
+        New bars the rest does not need stay uncut and are not in the plan.
+        """
+        if len(pieces) != len(min_qty):
+            raise ValueError("Number of required sizes must match number of minimum quantities")
+        allocation = self.reserve(pieces, min_qty)
+        options = replace(options or SolveOptions(), optional_stock=True)
+        plan = merge_plan(allocation, solve(stock, pieces, allocation.residual, options), min_qty)
+        self.commit(allocation, plan)
+        return plan
+
+    def stats(self):
+        lengths = self.lengths()
+        return {"remnants": len(lengths), "total_length": float(sum(lengths)),
+                "taken": len(self.taken), "stored": len(self.stored)}
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+def merge_plan(allocation, plan, min_qty) -> Plan:
+    """Add the remnant bars of ``allocation`` to a new-stock ``plan`` solved for its residual.
+
+    Bars stay longest first; the lower bound still holds because the
+    remnant cuts are fixed before the new-stock solve.
+    """
+    if not allocation.ids:
+        return replace(plan, min_qty=np.asarray(min_qty, dtype=float))
+    table = PatternTable(np.concatenate([plan.table.stock, allocation.lengths]),
+                         np.vstack([plan.table.counts, allocation.cuts]),
+                         np.concatenate([plan.table.multiplicity, np.ones(len(allocation.ids), dtype=int)]))
+    decimals = plan.decimals
+    if decimals is not None:
+        decimals = max(decimals, int(round(math.log10(integer_scale(allocation.lengths)))))
+    waste = float((allocation.lengths - allocation.cuts @ plan.pieces).sum())
+    bound = None if plan.lower_bound is None else plan.lower_bound + waste
+    merged = Plan.from_patterns(table, plan.pieces, min_qty, plan.status, lower_bound=bound, decimals=decimals,
+                                presolve=plan.presolve, trace=plan.trace)
+    verify_plan(merged)
+    return merged
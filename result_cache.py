@@ -0,0 +1,183 @@
+"""Result cache in front of the solver.
+
+Plans are keyed on a canonical form of the instance so repeated and
+reordered orders hit the same entry: stock merged into sorted
+``(length, count)`` types, pieces sorted with their quantities, lengths
+scaled to integers (so ``13,10 / 5,2`` and ``1.3,1.0 / 0.5,0.2`` share a
+plan) and quantities rounded up to whole pieces. Zero-quantity pieces stay in
+the key because every bar is cut and they can still lower the waste. The
+engine, backend, precision, optional stock, presolve and seed are part of
+the key too, since they change the plan. Keys are always built from the
+instance as the caller gave it; the entry holds the plan's own stock and
+pieces (rounded to the precision, or only the bars it cuts). Plans that are
+not proven optimal remember their time limit and only answer solves with the
+same or a shorter one, so raising the limit solves again.
+
+Entries live in an in-memory LRU backed by an optional SQLite file with
+size-bounded, least-recently-used eviction.
+"""
+import hashlib
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from stock_solver import SolveOptions, aggregate_stock, integer_scale, make_plan, solve, validate_inputs
+
+
+def canonical_instance(lengths, counts, piezas, lim_inf, options=None):
+    """Canonical key of an instance solved with ``options`` (a ``SolveOptions``).
+
+    Returns ``(key, scale, order)`` where ``order`` maps canonical piece
+    positions to the caller's piece indices.
+    """
+    options = options or SolveOptions()
+    scale = integer_scale(np.concatenate([lengths, piezas]))
+    qty = np.ceil(np.asarray(lim_inf) - 1e-9).astype(int)
+    order = np.lexsort((qty, -piezas))
+    data = {
+        "engine": options.engine,
+        "backend": options.backend,
+        "precision": options.precision,
+        "optional_stock": options.optional_stock,
+        "presolve": options.presolve,
+        "seed": options.seed,
+        "stock": [[int(round(l * scale)), int(c)] for l, c in zip(lengths, counts)],
+        "pieces": [[int(round(piezas[j] * scale)), int(qty[j])] for j in order],
+    }
+    key = hashlib.sha256(json.dumps(data, separators=(",", ":")).encode()).hexdigest()
+    return key, scale, order
+
+
+def _answers(entry, time_limit):
+    """Whether a cached entry may answer a solve with ``time_limit``."""
+    if "stock" not in entry:
+        # Written before entries held the plan's own stock
+        return False
+    limit = entry.get("time_limit")
+    return limit is None or (time_limit is not None and time_limit <= limit)
+
+
+class PlanCache:
+    """LRU plan cache with optional on-disk persistence.
+
+    ``path`` is a SQLite file; ``None`` keeps the cache in memory only.
+    """
+
+    def __init__(self, path=None, max_entries=256, max_disk_entries=10000):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(path)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS plans (key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "last_used REAL NOT NULL)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS plans_last_used ON plans (last_used)")
+            self._db.commit()
+
+    def _load(self, key):
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return self._memory[key]
+        if self._db is None:
+            return None
+        row = self._db.execute("SELECT value FROM plans WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self._db.execute("UPDATE plans SET last_used = ? WHERE key = ?", (time.time(), key))
+        self._db.commit()
+        entry = json.loads(row[0])
+        self._remember(key, entry)
+        return entry
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, stock, pieces, min_qty, options=None):
+        """Cached ``Plan`` for the instance solved with ``options``, or ``None``."""
+        options = options or SolveOptions()
+        lengths, counts, piezas, lim_inf = validate_inputs(stock, pieces, min_qty)
+        key, _, order = canonical_instance(lengths, counts, piezas, lim_inf, options)
+        entry = self._load(key)
+        if entry is not None and not _answers(entry, options.time_limit):
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        # The plan's own lengths: rounded to the precision, or only the bars it cuts
+        plan_pieces = np.empty(len(piezas))
+        plan_pieces[order] = entry["pieces"]
+        usage = []
+        for k, pattern, mult in entry["usage"]:
+            a = np.zeros(len(piezas), dtype=int)
+            a[order] = pattern
+            usage.append((k, a, mult))
+        stock_lengths = np.array([length for length, _ in entry["stock"]], dtype=float)
+        stock_counts = np.array([count for _, count in entry["stock"]], dtype=int)
+        return make_plan(stock_lengths, stock_counts, plan_pieces, lim_inf, usage, entry["status"], entry["bound"],
+                         entry["decimals"])
+
+    def put(self, stock, pieces, min_qty, plan, options=None):
+        """Store ``plan``, solved from ``stock, pieces, min_qty`` with ``options``.
+
+        The key is built from the instance as given, like ``get`` builds it,
+        since the plan's stock and pieces may differ from it (rounded to the
+        precision, or without the bars optional stock leaves uncut).
+        """
+        options = options or SolveOptions()
+        key, _, order = canonical_instance(*validate_inputs(stock, pieces, min_qty), options)
+        table = plan.table
+        lengths, counts = aggregate_stock(list(zip(table.stock, table.multiplicity)))
+        types = {float(length): k for k, length in enumerate(lengths)}
+        usage = [(types[float(length)], a, mult) for length, a, mult in zip(*table)]
+        entry = {
+            "stock": [[float(length), int(count)] for length, count in zip(lengths, counts)],
+            "pieces": [float(p) for p in np.asarray(plan.pieces)[order]],
+            "usage": [[int(k), [int(x) for x in a[order]], int(mult)] for k, a, mult in usage],
+            "status": plan.status,
+            "bound": plan.lower_bound,
+            "decimals": plan.decimals,
+            # Longer solves may still improve a plan that is not optimal
+            "time_limit": None if plan.status == "Optimal" else options.time_limit,
+        }
+        self._remember(key, entry)
+        if self._db is not None:
+            self._db.execute("INSERT OR REPLACE INTO plans (key, value, last_used) VALUES (?, ?, ?)",
+                             (key, json.dumps(entry), time.time()))
+            # Drop the least recently used rows beyond the size bound
+            self._db.execute(
+                "DELETE FROM plans WHERE key IN (SELECT key FROM plans ORDER BY last_used DESC "
+                "LIMIT -1 OFFSET ?)", (self.max_disk_entries,))
+            self._db.commit()
+
+    def solve(self, stock, pieces, min_qty, options=None):
+        """``stock_solver.solve`` through the cache."""
+        plan = self.get(stock, pieces, min_qty, options)
+        if plan is None:
+            plan = solve(stock, pieces, min_qty, options)
+            self.put(stock, pieces, min_qty, plan, options)
+        return plan
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._memory),
+        }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
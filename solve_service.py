@@ -0,0 +1,357 @@
+"""Local HTTP solve service for the web front end.
+
+Serves ``index.html`` and its scripts and answers ``POST /solve`` with the
+Python engine, so several shop-floor browsers can share one solver host::
+
+    python solve_service.py --port 8000 --workers 4
+
+A request carries what ``main.js`` reads from its form::
+
+    {"stockSizes": [13, 10], "requiredSizes": [5, 2], "minQuantities": [2, 0]}
+
+(``cut_stock`` job keys ``stock``/``requiredSizes``/``minQuantities``, with
+``[length, count]`` stock pairs, ``engine`` and ``timeLimit`` also work) and
+gets back the solution shape of ``solver.js``: ``status``, ``patterns`` (one
+``{stock, cuts, count}`` per distinct bar), ``totalStock``, ``totalUsed``, ``waste``,
+``efficiency`` and ``remainingPieces``, plus ``solverStatus`` and
+``lowerBound`` from the plan. ``GET /status`` reports the queue.
+
+Requests pass through, in order:
+
+* the plan cache (``result_cache``), so repeated orders are answered at once,
+* deduplication: a request equal to one already queued or solving (same
+  canonical instance and engine) waits for that solve instead of starting
+  its own,
+* a bounded queue: when ``max_queue`` solves are waiting the request is
+  refused with ``503`` and ``Retry-After`` instead of piling up,
+* micro-batching: a worker that comes free takes the next request, and
+  while every other worker is busy also any arriving within
+  ``BATCH_WINDOW``, up to ``BATCH_MAX``, which saves the process round trip
+  per order for the small orders that dominate without leaving idle
+  workers waiting behind a batch. Requests
+  only leave the queue when a worker is free, so the queue (and with it the
+  ``503``) measures the real backlog,
+* a per-request timeout (``504``); the solve's own time limit is capped to
+  ``TIME_SHARE`` of the time left, and jobs whose callers have given up are
+  skipped, so a worker never stays busy much longer than its caller waits.
+  A plan that arrives late still goes into the cache for the retry.
+"""
+import argparse
+import asyncio
+import dataclasses
+import json
+import math
+import mimetypes
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from result_cache import PlanCache, canonical_instance
+from stock_solver import SolveOptions, solve, validate_inputs
+
+STATIC_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_FILES = {"/": "index.html", "/index.html": "index.html", "/main.js": "main.js",
+                "/solver.js": "solver.js", "/styles.css": "styles.css"}
+# Requests one worker takes at once, and how long the first one waits for company
+BATCH_MAX = 4
+BATCH_WINDOW = 0.01
+MAX_BODY = 10 * 1024 * 1024
+# Share of the time left before the request timeout given to the solve; the
+# rest covers the model build and handing the plan back
+TIME_SHARE = 0.5
+STATUS_TEXT = {200: "OK", 204: "No Content", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               413: "Payload Too Large", 422: "Unprocessable Entity", 500: "Internal Server Error",
+               503: "Service Unavailable", 504: "Gateway Timeout"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+def _solve_batch(jobs):
+    """Worker side: solve ``(stock, pieces, min_qty, options, deadline)`` jobs one after another.
+
+    ``deadline`` is a ``time.time()`` stamp; jobs whose caller has given up by
+    then are skipped and the others get at most the time that is left.
+    """
+    results = []
+    for stock, pieces, min_qty, options, deadline in jobs:
+        left = deadline - time.time()
+        if left <= 0:
+            results.append(("expired", "No plan within the request timeout"))
+            continue
+        try:
+            options = dataclasses.replace(options, time_limit=max(0.1, min(options.time_limit, left * TIME_SHARE)))
+            # The options go back with the plan, so it is cached with the time it actually had
+            results.append(("done", (solve(stock, pieces, min_qty, options), options)))
+        except ValueError as e:
+            results.append(("invalid", str(e)))
+        except Exception as e:
+            results.append(("error", str(e)))
+    return results
+
+
+def solution(plan):
+    """A plan in the ``solver.js`` result shape."""
+    remaining = [max(0.0, math.ceil(q - 1e-9) - float(p)) for q, p in zip(plan.min_qty, plan.produced)]
+    return {
+        "status": "optimal" if plan.status == "Optimal" else "feasible",
+        "solverStatus": plan.status,
+        "patterns": [{"stock": entry["size"], "cuts": entry["cuts"], "count": entry["count"]}
+                     for entry in plan.entries()],
+        "totalStock": plan.total_stock,
+        "totalUsed": plan.total_used,
+        "waste": plan.total_waste,
+        "lowerBound": plan.lower_bound,
+        "efficiency": f"{100 * plan.total_used / plan.total_stock:.2f}" if plan.total_stock else "0.00",
+        "remainingPieces": remaining,
+    }
+
+
+def parse_request(body, default_engine, timeout):
+    """``(stock, pieces, min_qty, options)`` from a request body."""
+    try:
+        data = json.loads(body or b"{}")
+        stock = data["stockSizes"] if "stockSizes" in data else data["stock"]
+        pieces = data["requiredSizes"]
+        min_qty = data.get("minQuantities", [0] * len(pieces))
+        time_limit = float(data.get("timeLimit", timeout))
+        engine = data.get("engine", default_engine)
+    except KeyError as e:
+        raise HTTPError(400, f"Invalid request: missing {e.args[0]}")
+    except (ValueError, TypeError, AttributeError) as e:
+        raise HTTPError(400, f"Invalid request: {e}")
+    options = SolveOptions(engine=engine, time_limit=max(0.1, min(time_limit, timeout * TIME_SHARE)))
+    return stock, pieces, min_qty, options
+
+
+class SolveService:
+    """Queue, deduplication, batching and worker pool behind the HTTP handler."""
+
+    def __init__(self, workers=None, max_queue=64, timeout=30.0, engine="milp", cache=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.engine = engine
+        self.cache = cache if cache is not None else PlanCache()
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=mp.get_context("spawn"))
+        self.queue = None
+        self.inflight = {}
+        self.stats = {"requests": 0, "from_cache": 0, "deduplicated": 0, "rejected": 0, "timeouts": 0,
+                      "solved": 0, "expired": 0, "batches": 0}
+        self._dispatcher = None
+        self._slots = None
+
+    def start(self):
+        self.queue = asyncio.Queue(maxsize=self.max_queue)
+        self._slots = asyncio.Semaphore(self.workers)
+        self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def close(self):
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def status(self):
+        return {**self.stats, "queued": self.queue.qsize(), "inflight": len(self.inflight),
+                "workers": self.workers, "max_queue": self.max_queue, **{f"cache_{k}": v for k, v in
+                                                                        self.cache.stats().items()}}
+
+    async def solve(self, body):
+        """Answer one request body with a ``solver.js`` shaped dict."""
+        self.stats["requests"] += 1
+        stock, pieces, min_qty, options = parse_request(body, self.engine, self.timeout)
+        try:
+            lengths, counts, piezas, lim_inf = validate_inputs(stock, pieces, min_qty)
+            plan = self.cache.get(stock, pieces, min_qty, options)
+        except ValueError as e:
+            raise HTTPError(422, str(e))
+        if plan is not None:
+            self.stats["from_cache"] += 1
+            return solution(plan)
+
+        # Same canonical instance in the same units; ``order`` maps it to this request's pieces
+        digest, scale, order = canonical_instance(lengths, counts, piezas, lim_inf, options)
+        key = (digest, scale, options.time_limit)
+        future = self.inflight.get(key)
+        if future is not None:
+            self.stats["deduplicated"] += 1
+        else:
+            if self.queue.full():
+                self.stats["rejected"] += 1
+                raise HTTPError(503, "Solver busy, try again shortly", {"Retry-After": "2"})
+            future = asyncio.get_running_loop().create_future()
+            self.inflight[key] = future
+            future.add_done_callback(lambda f: self._forget(key, f))
+            self.queue.put_nowait(((stock, pieces, min_qty, options, time.time() + self.timeout), (future, order)))
+        try:
+            plan, leader_order = await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            raise HTTPError(504, f"No plan within {self.timeout:g} s")
+        if not np.array_equal(order, leader_order):
+            # Followers may list the pieces in another order
+            cuts = np.zeros_like(plan.table.counts)
+            cuts[:, order] = plan.table.counts[:, leader_order]
+            plan = dataclasses.replace(plan, pieces=piezas, min_qty=lim_inf, table=plan.table._replace(counts=cuts))
+        return solution(plan)
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # One batch per free worker; everything else waits in the bounded queue
+            await self._slots.acquire()
+            batch = [await self.queue.get()]
+            deadline = loop.time() + BATCH_WINDOW
+            # Only coalesce jobs that would otherwise wait: not while another worker is idle
+            while len(batch) < BATCH_MAX and self._slots.locked():
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    break
+            self.stats["batches"] += 1
+            task = loop.run_in_executor(self.pool, _solve_batch, [job for job, _ in batch])
+            task.add_done_callback(lambda t, batch=batch: self._deliver(batch, t))
+
+    def _forget(self, key, future):
+        self.inflight.pop(key, None)
+        # Mark errors as seen; every caller may have timed out already
+        if not future.cancelled():
+            future.exception()
+
+    def _deliver(self, batch, task):
+        self._slots.release()
+        if task.cancelled():
+            results = [("error", "Solver shut down")] * len(batch)
+        elif task.exception() is not None:
+            results = [("error", str(task.exception()))] * len(batch)
+        else:
+            results = task.result()
+        for (job, (future, order)), (kind, payload) in zip(batch, results):
+            if kind == "done":
+                payload, options = payload
+                self.stats["solved"] += 1
+                stock, pieces, min_qty = job[:3]
+                self.cache.put(stock, pieces, min_qty, payload, options)
+            elif kind == "expired":
+                self.stats["expired"] += 1
+            if future.done():
+                continue
+            if kind == "done":
+                future.set_result((payload, order))
+            else:
+                future.set_exception(HTTPError({"invalid": 422, "expired": 504}.get(kind, 500), payload))
+
+
+async def _read_request(reader):
+    line = (await reader.readline()).decode("latin-1").strip()
+    if not line:
+        return None
+    try:
+        method, target, _ = line.split(" ", 2)
+    except ValueError:
+        raise HTTPError(400, "Malformed request line")
+    headers = {}
+    while True:
+        header = (await reader.readline()).decode("latin-1").strip()
+        if not header:
+            break
+        name, _, value = header.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length") or 0)
+    if length > MAX_BODY:
+        raise HTTPError(413, "Request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method, urlsplit(target).path, body
+
+
+def _response(status, body, content_type="application/json", headers=None):
+    head = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}", f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}", "Connection: close", "Access-Control-Allow-Origin: *",
+            "Access-Control-Allow-Methods: GET, POST, OPTIONS", "Access-Control-Allow-Headers: Content-Type"]
+    head += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    return ("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body
+
+
+def _json(status, data, headers=None):
+    return _response(status, json.dumps(data).encode(), headers=headers)
+
+
+async def handle(service, reader, writer):
+    """Serve one HTTP request on a connection."""
+    start = time.monotonic()
+    try:
+        request = await _read_request(reader)
+        if request is None:
+            return
+        method, path, body = request
+        if method == "OPTIONS":
+            response = _response(204, b"")
+        elif path == "/solve":
+            if method != "POST":
+                raise HTTPError(405, "Use POST")
+            result = await service.solve(body)
+            result["elapsed"] = time.monotonic() - start
+            response = _json(200, result)
+        elif path == "/status" and method == "GET":
+            response = _json(200, service.status())
+        elif path in STATIC_FILES and method == "GET":
+            name = STATIC_FILES[path]
+            with open(os.path.join(STATIC_DIR, name), "rb") as f:
+                content = f.read()
+            response = _response(200, content, mimetypes.guess_type(name)[0] or "application/octet-stream")
+        else:
+            raise HTTPError(404, "Not found")
+    except HTTPError as e:
+        status = "infeasible" if e.status == 422 else "error"
+        response = _json(e.status, {"status": status, "message": str(e), "patterns": []}, e.headers)
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return
+    except Exception as e:
+        response = _json(500, {"status": "error", "message": str(e), "patterns": []})
+    try:
+        writer.write(response)
+        await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host="127.0.0.1", port=8000, **kwargs):
+    service = SolveService(**kwargs)
+    service.start()
+    server = await asyncio.start_server(lambda r, w: handle(service, r, w), host, port)
+    print(f"Serving on http://{host}:{port}/ with {service.workers} workers")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the stock cutting solver over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (0.0.0.0 for the whole network)")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("-w", "--workers", type=int, default=None, help="solver processes (default: all cores)")
+    parser.add_argument("-q", "--max-queue", type=int, default=64, help="queued solves before requests get 503")
+    parser.add_argument("-t", "--timeout", type=float, default=30, help="per-request timeout in seconds")
+    parser.add_argument("-e", "--engine", default="milp", help="default engine for requests")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, workers=args.workers, max_queue=args.max_queue,
+                          timeout=args.timeout, engine=args.engine))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Per-solve instrumentation.
+
+A ``Trace`` collects wall and CPU time per phase (validate, presolve,
+engine with the model build and backend solve inside it, verify, plus parse
+and render when the app adds them), the
+size of the MILP model and the statistics the backend reported (for CBC
+read from its log: nodes, best bound, gap). It is attached to every plan
+as ``plan.trace``, summarized in the app's results panel and can be
+appended as one JSON line per solve to a trace file for monitoring.
+"""
+import json
+import time
+from contextlib import contextmanager, nullcontext
+
+# Backend statistics that add up over the sub-solves of one solve
+SUMMED = ("nodes", "iterations", "cpu")
+
+
+class Trace:
+    """Timings and statistics of one solve."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.phases = {}
+        self.model = {}
+        self.solver = {}
+        self.solves = []
+        self.info = {}
+        self.units = (1.0, 0.0, None)
+
+    @contextmanager
+    def phase(self, name):
+        """Time the enclosed block as phase ``name`` (repeated phases add up)."""
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - wall, time.process_time() - cpu)
+
+    def add(self, name, wall, cpu):
+        totals = self.phases.setdefault(name, {"wall": 0.0, "cpu": 0.0})
+        totals["wall"] += wall
+        totals["cpu"] += cpu
+
+    def record_model(self, master):
+        """Size of a PuLP model about to be solved."""
+        self.model = {"variables": len(master.variables()), "constraints": len(master.constraints)}
+
+    def set_units(self, unit=1.0, offset=0.0, decimals=None):
+        """Units of the instance the engine solves: its length ``unit``, the
+        waste ``offset`` presolve fixed, and the ``decimals`` of the caller's
+        lengths. Solver objectives and bounds are recorded in the caller's
+        units, like the plan's waste and lower bound.
+        """
+        self.units = (unit, offset, decimals)
+
+    def record_solver(self, backend, stats):
+        """Statistics of one backend call. Engines such as column generation
+        make many; each is kept in ``solves``, and ``solver`` holds their
+        count, the summed ``SUMMED`` counters and the last call's other
+        statistics under ``"last"``. A sub-solve's objective and bound are
+        not the plan's (see ``info``).
+        """
+        stats = dict(stats)
+        unit, offset, decimals = self.units
+        for key in ("objective", "best_bound"):
+            if stats.get(key) is not None:
+                value = (stats[key] + offset) * unit
+                stats[key] = value if decimals is None else round(value, decimals)
+        if stats.get("objective") and stats.get("best_bound") is not None:
+            # The offset changes the relative gap too
+            stats["gap"] = max(stats["objective"] - stats["best_bound"], 0.0) / stats["objective"]
+        self.solves.append({"backend": backend, **stats})
+        self.solver["backend"] = backend
+        self.solver["solves"] = self.solver.get("solves", 0) + 1
+        for key in SUMMED:
+            if stats.get(key) is not None:
+                self.solver[key] = self.solver.get(key, 0) + stats[key]
+        self.solver["last"] = {key: value for key, value in stats.items() if key not in SUMMED}
+
+    def to_dict(self):
+        return {
+            "started": self.started,
+            "info": self.info,
+            "phases": self.phases,
+            "model": self.model,
+            "solver": self.solver,
+            "solves": self.solves,
+        }
+
+    def summary(self):
+        """Readable lines for the results panel."""
+        lines = [f"{name:<9} {t['wall'] * 1e3:9.1f} ms wall {t['cpu'] * 1e3:9.1f} ms cpu"
+                 for name, t in self.phases.items()]
+        if self.model:
+            lines.append(f"Model: {self.model['variables']} variables, {self.model['constraints']} constraints")
+        if self.solver:
+            stats = [f"{key} {self.solver[key]:g}" for key in ("nodes", "iterations") if key in self.solver]
+            lines.append(f"Solver: {self.solver['backend']} ({self.solver['solves']} solves) " + ", ".join(stats))
+        waste, bound = self.info.get("waste"), self.info.get("lower_bound")
+        if waste is not None and bound is not None:
+            # The plan's bound, not the last sub-solve's
+            gap = max(waste - bound, 0.0) / waste if waste else 0.0
+            lines.append(f"Plan: {self.info.get('status')}, waste {waste:g}, bound {bound:g}, gap {gap:.2%}")
+        return lines
+
+    def write(self, path):
+        """Append the trace to ``path`` as one JSON line."""
+        with open(path, "a") as f:
+            f.write(json.dumps(self.to_dict()) + "\n")
+
+
+def phase(trace, name):
+    """``trace.phase(name)``, or a no-op when there is no trace."""
+    return nullcontext() if trace is None else trace.phase(name)
@@ -0,0 +1,139 @@
+"""Background solve worker for the desktop app.
+
+Solves run in a separate process so the Tk main loop never blocks. The
+worker process is kept alive between solves (no import cost per click, and
+the model of the last order is reused when only quantities change) and is
+started in its own process group, so cancelling kills it together with
+the CBC subprocess it spawned. Progress, every improving plan and the
+result come back through a queue the GUI polls with ``after()``.
+"""
+import dataclasses
+import multiprocessing as mp
+import os
+import queue
+import signal
+import subprocess
+import time
+
+
+def _worker_main(tasks, results):
+    if hasattr(os, "setsid"):
+        # Own process group so cancel() can take CBC down with us
+        os.setsid()
+    # Imported here, not by the app: the worker loads the solver stack while
+    # the window is already up
+    from stock_solver import SolveSession, solve
+    # Re-solves with changed quantities reuse the last model
+    session = SolveSession()
+    while True:
+        job = tasks.get()
+        if job is None:
+            break
+        job_id, stock, pieces, min_qty, options = job
+
+        def on_incumbent(waste, bound, job_id=job_id):
+            results.put((job_id, "incumbent", (waste, bound)))
+
+        def on_plan(plan, job_id=job_id):
+            results.put((job_id, "plan", plan))
+
+        try:
+            options = dataclasses.replace(options, on_incumbent=on_incumbent, on_plan=on_plan, session=session)
+            plan = solve(stock, pieces, min_qty, options)
+            results.put((job_id, "done", plan))
+        except Exception as e:
+            results.put((job_id, "error", str(e)))
+
+
+def kill_process_tree(pid):
+    """Kill a worker process and everything it spawned."""
+    try:
+        if os.name == "nt":
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(pid)], capture_output=True)
+        else:
+            os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+class SolveWorker:
+    """Runs one solve at a time in a persistent worker process."""
+
+    def __init__(self):
+        self._ctx = mp.get_context("spawn")
+        self._process = None
+        self._tasks = None
+        self._results = None
+        self._job_id = 0
+        self.started = None
+
+    def start(self):
+        """Start the worker process ahead of the first solve, so its imports are done by then."""
+        self._ensure_process()
+
+    def _ensure_process(self):
+        if self._process is not None and self._process.is_alive():
+            return
+        self._tasks = self._ctx.Queue()
+        self._results = self._ctx.Queue()
+        self._process = self._ctx.Process(target=_worker_main, args=(self._tasks, self._results),
+                                          daemon=True)
+        self._process.start()
+
+    @property
+    def busy(self):
+        return self.started is not None
+
+    @property
+    def elapsed(self):
+        return 0.0 if self.started is None else time.monotonic() - self.started
+
+    def submit(self, stock, pieces, min_qty, options):
+        """Queue a solve; any previous result still pending is ignored."""
+        self._ensure_process()
+        self._job_id += 1
+        self.started = time.monotonic()
+        self._tasks.put((self._job_id, stock, pieces, min_qty, options))
+
+    def poll(self):
+        """Messages for the current job as ``(kind, payload)`` pairs.
+
+        ``kind`` is ``"incumbent"`` with ``(waste, bound)``, ``"plan"`` with
+        an improving ``Plan`` that can be accepted before the solve ends,
+        ``"done"`` with the final ``Plan`` or ``"error"`` with the message.
+        """
+        messages = []
+        if self._results is None:
+            return messages
+        while True:
+            try:
+                job_id, kind, payload = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if job_id != self._job_id:
+                continue
+            messages.append((kind, payload))
+            if kind in ("done", "error"):
+                self.started = None
+        if self.started is not None and not self._process.is_alive():
+            self.started = None
+            messages.append(("error", "Solver process exited unexpectedly"))
+        return messages
+
+    def cancel(self):
+        """Kill the running solve, CBC included. The worker restarts on the next submit."""
+        if self._process is not None and self._process.is_alive():
+            kill_process_tree(self._process.pid)
+            self._process.join(timeout=1)
+        self._process = None
+        self._results = None
+        self.started = None
+
+    def shutdown(self):
+        if self._process is not None and self._process.is_alive():
+            if self.busy:
+                self.cancel()
+                return
+            self._tasks.put(None)
+            self._process.join(timeout=1)
+        self._process = None
@@ -1,10 +1,27 @@
 import customtkinter as ctk
-import numpy as np
-import pulp as plp
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
 import tkinter.messagebox as messagebox  # Use standard messagebox instead of CTkMessageBox
+import tkinter.filedialog as filedialog
+import importlib
+import itertools
+import os
+import threading
+import time
+
+from solve_worker import SolveWorker
+
+# Cutting patterns listed in the results text; exports hold all of them
+MAX_TEXT_PATTERNS = 200
+# Solver and plotting stacks, imported in the background once the window is
+# up (the solve itself runs in the worker process, which imports its own)
+HEAVY_MODULES = ("numpy", "pulp", "stock_solver", "backends", "result_cache", "remnant_store",
+                 "order_import", "plan_export", "matplotlib.figure", "matplotlib.backends.backend_tkagg",
+                 "plan_renderer")
+
+
+def prewarm():
+    for name in HEAVY_MODULES:
+        importlib.import_module(name)
+
 
 class StockCutterGUI:
     def __init__(self, root):
@@ -17,12 +34,27 @@ class StockCutterGUI:
             "English": {
                 "title": "Stock Cutting Optimizer",
                 "stock_label": "Available Stock Lengths",
-                "stock_tooltip": "Enter lengths separated by commas (e.g., 13,10)",
+                "stock_tooltip": "Enter lengths separated by commas (e.g., 13,10). Use length x count for many bars of one length (e.g., 6000x200)",
                 "required_label": "Required Piece Lengths",
                 "required_tooltip": "Enter required lengths separated by commas (e.g., 5,2)",
                 "quantity_label": "Minimum Quantities Needed",
                 "quantity_tooltip": "Enter minimum quantities for each required length (e.g., 2,0)",
                 "calculate": "Calculate",
+                "import": "Import order...",
+                "export": "Export plan...",
+                "imported": "Imported {rows} line items as {pieces} piece lengths",
+                "mode_label": "Mode",
+                "mode_exact": "Exact",
+                "mode_fast": "Fast",
+                "backend_label": "Solver",
+                "time_limit_label": "Time limit (s)",
+                "remnant_label": "Reuse offcuts ≥",
+                "remnants": "Offcuts",
+                "cancel": "Cancel",
+                "accept": "Accept plan",
+                "solving": "Solving...",
+                "incumbent": "best waste",
+                "cancelled": "Solve cancelled",
                 "results": "Results",
                 "visualization": "Visualization",
                 "error": "Error",
@@ -39,12 +71,27 @@ class StockCutterGUI:
             "Español": {
                 "title": "Optimizador de Corte de Material",
                 "stock_label": "Longitudes de Material Disponible",
-                "stock_tooltip": "Ingrese longitudes separadas por comas (ej., 13,10)",
+                "stock_tooltip": "Ingrese longitudes separadas por comas (ej., 13,10). Use longitud x cantidad para muchas barras de una longitud (ej., 6000x200)",
                 "required_label": "Longitudes de Piezas Requeridas",
                 "required_tooltip": "Ingrese longitudes requeridas separadas por comas (ej., 5,2)",
                 "quantity_label": "Cantidades Mínimas Necesarias",
                 "quantity_tooltip": "Ingrese cantidades mínimas para cada longitud requerida (ej., 2,0)",
                 "calculate": "Calcular",
+                "import": "Importar pedido...",
+                "export": "Exportar plan...",
+                "imported": "Importadas {rows} líneas como {pieces} longitudes de pieza",
+                "mode_label": "Modo",
+                "mode_exact": "Exacto",
+                "mode_fast": "Rápido",
+                "backend_label": "Solver",
+                "time_limit_label": "Tiempo límite (s)",
+                "remnant_label": "Reusar retazos ≥",
+                "remnants": "Retazos",
+                "cancel": "Cancelar",
+                "accept": "Aceptar plan",
+                "solving": "Resolviendo...",
+                "incumbent": "mejor desperdicio",
+                "cancelled": "Cálculo cancelado",
                 "results": "Resultados",
                 "visualization": "Visualización",
                 "error": "Error",
@@ -165,6 +212,19 @@ class StockCutterGUI:
         self.min_quantities_entry.pack(side="left", padx=5, fill="x", expand=True)
         self.min_quantities_entry.insert(0, "2,0")
         
+        # Order exports (CSV/JSON) fill the fields with their summed lengths
+        import_frame = ctk.CTkFrame(input_frame, fg_color="transparent")
+        import_frame.pack(fill="x", pady=5)
+        
+        self.import_btn = ctk.CTkButton(import_frame,
+                                      text=self.languages[self.current_language]["import"],
+                                      command=self.import_order,
+                                      width=140)
+        self.import_btn.pack(side="left", padx=5)
+        
+        self.import_label = ctk.CTkLabel(import_frame, text="", font=ctk.CTkFont(size=12))
+        self.import_label.pack(side="left", padx=5)
+        
         # Add help buttons for each step
         for frame, field_type in [(step1_frame, "stock"), 
                                 (step2_frame, "required"), 
@@ -184,13 +244,111 @@ class StockCutterGUI:
         # Tooltip window
         self.tooltip = None
         
+        # Solve mode: exact optimization or fast heuristic quote
+        mode_frame = ctk.CTkFrame(left_panel, fg_color="transparent")
+        mode_frame.pack(fill="x", pady=(10, 0), padx=10)
+        
+        self.mode_label = ctk.CTkLabel(mode_frame,
+                                     text=self.languages[self.current_language]["mode_label"],
+                                     font=ctk.CTkFont(size=14, weight="bold"))
+        self.mode_label.pack(side="left", padx=5)
+        
+        self.mode_selector = ctk.CTkSegmentedButton(mode_frame,
+                                                  values=[self.languages[self.current_language]["mode_exact"],
+                                                          self.languages[self.current_language]["mode_fast"]])
+        self.mode_selector.set(self.languages[self.current_language]["mode_exact"])
+        self.mode_selector.pack(side="left", padx=5)
+        
+        # MILP backend and time limit per solve
+        solver_frame = ctk.CTkFrame(left_panel, fg_color="transparent")
+        solver_frame.pack(fill="x", pady=(10, 0), padx=10)
+        
+        self.backend_label = ctk.CTkLabel(solver_frame,
+                                        text=self.languages[self.current_language]["backend_label"],
+                                        font=ctk.CTkFont(size=14, weight="bold"))
+        self.backend_label.pack(side="left", padx=5)
+        
+        # The installed backends are filled in once the solver stack is loaded
+        self.backend_menu = ctk.CTkOptionMenu(solver_frame, values=["auto"], width=90)
+        self.backend_menu.set("auto")
+        self.backend_menu.pack(side="left", padx=5)
+        
+        self.time_limit_label = ctk.CTkLabel(solver_frame,
+                                           text=self.languages[self.current_language]["time_limit_label"],
+                                           font=ctk.CTkFont(size=12))
+        self.time_limit_label.pack(side="left", padx=5)
+        
+        self.time_limit_entry = ctk.CTkEntry(solver_frame, width=50)
+        self.time_limit_entry.insert(0, "10")
+        self.time_limit_entry.pack(side="left", padx=5)
+        
+        # Offcut rack: leftovers at least this long are kept and cut first
+        remnant_frame = ctk.CTkFrame(left_panel, fg_color="transparent")
+        remnant_frame.pack(fill="x", pady=(10, 0), padx=10)
+        
+        self.remnant_label = ctk.CTkLabel(remnant_frame,
+                                        text=self.languages[self.current_language]["remnant_label"],
+                                        font=ctk.CTkFont(size=14, weight="bold"))
+        self.remnant_label.pack(side="left", padx=5)
+        
+        self.remnant_entry = ctk.CTkEntry(remnant_frame, width=70, placeholder_text="off")
+        self.remnant_entry.pack(side="left", padx=5)
+        
+        self.remnant_count_label = ctk.CTkLabel(remnant_frame, text="", font=ctk.CTkFont(size=12))
+        self.remnant_count_label.pack(side="left", padx=5)
+        
         # Calculate button
         self.calculate_btn = ctk.CTkButton(left_panel,
                                          text=self.languages[self.current_language]["calculate"],
                                          command=self.calculate,
                                          font=ctk.CTkFont(size=14, weight="bold"),
                                          height=40)
-        self.calculate_btn.pack(pady=20)
+        self.calculate_btn.pack(pady=(20, 5))
+        
+        # Cancel button and live progress of a running solve
+        progress_frame = ctk.CTkFrame(left_panel, fg_color="transparent")
+        progress_frame.pack(pady=(0, 10))
+        
+        self.cancel_btn = ctk.CTkButton(progress_frame,
+                                      text=self.languages[self.current_language]["cancel"],
+                                      command=self.cancel_solve,
+                                      state="disabled",
+                                      width=100)
+        self.cancel_btn.pack(side="left", padx=5)
+        
+        # Stops the solve and keeps the best plan streamed so far
+        self.accept_btn = ctk.CTkButton(progress_frame,
+                                      text=self.languages[self.current_language]["accept"],
+                                      command=self.accept_plan,
+                                      state="disabled",
+                                      width=100)
+        self.accept_btn.pack(side="left", padx=5)
+        
+        # Writes the shown plan to JSON or CSV, one entry per distinct pattern
+        self.export_btn = ctk.CTkButton(progress_frame,
+                                      text=self.languages[self.current_language]["export"],
+                                      command=self.export_plan,
+                                      state="disabled",
+                                      width=100)
+        self.export_btn.pack(side="left", padx=5)
+        self.shown_plan = None
+        
+        self.progress_label = ctk.CTkLabel(progress_frame, text="", font=ctk.CTkFont(size=12))
+        self.progress_label.pack(side="left", padx=5)
+        
+        # Started now so the worker has imported the solver by the first click
+        self.worker = SolveWorker()
+        self.worker.start()
+        self.incumbent = None
+        self.current_plan = None
+        self.solve_options = None
+        self.solve_job = None
+        self.cache = None
+        self.remnants = None
+        self.allocation = None
+        self.order_min_qty = None
+        self.remnant_note = None
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         
         # Results text area
         results_frame = ctk.CTkFrame(left_panel)
@@ -210,13 +368,16 @@ class StockCutterGUI:
         right_panel = ctk.CTkFrame(self.main_frame)
         right_panel.pack(side="right", fill="both", expand=True)
         
-        # Create scrollable frame for visualization
-        self.scrollable_frame = ctk.CTkScrollableFrame(right_panel)
+        # Visualization frame; the scrollbar moves the renderer's row window
+        self.scrollable_frame = ctk.CTkFrame(right_panel)
         self.scrollable_frame.pack(fill="both", expand=True, padx=10, pady=10)
         
+        self.plot_scrollbar = ctk.CTkScrollbar(self.scrollable_frame, command=self.on_plot_scroll)
+        self.plot_scrollbar.pack(side="right", fill="y")
+        
         # Frame to hold the canvas
         self.canvas_frame = ctk.CTkFrame(self.scrollable_frame)
-        self.canvas_frame.pack(fill="both", expand=True)
+        self.canvas_frame.pack(side="left", fill="both", expand=True)
         
         # Visualization title
         self.vis_label = ctk.CTkLabel(self.canvas_frame,
@@ -224,14 +385,48 @@ class StockCutterGUI:
                                     font=ctk.CTkFont(size=16, weight="bold"))
         self.vis_label.pack(pady=10)
         
-        # Create matplotlib figure with dark theme
-        plt.style.use('dark_background')
+        # The figure, cache and offcut rack are set up once the background
+        # imports are done, so the window is interactive right away
         self.fig = None
         self.canvas = None
+        self.renderer = None
+        self.ready = False
+        self.prewarm_thread = threading.Thread(target=prewarm, daemon=True)
+        self.prewarm_thread.start()
+        self.root.after(50, self.poll_startup)
+    
+    def poll_startup(self):
+        if self.ready:
+            return
+        if self.prewarm_thread.is_alive():
+            self.root.after(50, self.poll_startup)
+        else:
+            self.ensure_ready()
+    
+    def ensure_ready(self):
+        """Finish startup on the Tk thread, waiting for the background imports if they are still running."""
+        if self.ready:
+            return
+        self.prewarm_thread.join()
+        import matplotlib.style
+        from backends import available_backends
+        from remnant_store import RemnantStore
+        from result_cache import PlanCache
+        
+        # Create matplotlib figure with dark theme
+        matplotlib.style.use('dark_background')
+        self.backend_menu.configure(values=available_backends())
+        self.cache = PlanCache(os.path.join(os.path.expanduser("~"), ".stock_cutter_cache.sqlite"))
+        self.remnants = RemnantStore(os.path.join(os.path.expanduser("~"), ".stock_cutter_remnants.sqlite"))
+        self.ready = True
+        self.update_remnant_count()
         self.create_new_figure()
     
     def create_new_figure(self):
         """Create a new figure and canvas"""
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
+        
         if self.canvas is not None:
             # Remove old canvas
             self.canvas.get_tk_widget().destroy()
@@ -240,6 +435,39 @@ class StockCutterGUI:
         self.fig = Figure(facecolor='#2b2b2b')
         self.canvas = FigureCanvasTkAgg(self.fig, master=self.canvas_frame)
         self.canvas.get_tk_widget().pack(fill="both", expand=True, padx=10, pady=10)
+        self.canvas.mpl_connect("scroll_event", self.on_plot_wheel)
+        self.canvas.mpl_connect("resize_event", self.on_plot_resize)
+        self.renderer = None
+        self.plot_scrollbar.set(0, 1)
+    
+    def visible_rows(self):
+        from plan_renderer import ROW_PIXELS
+        return max(1, self.canvas.get_tk_widget().winfo_height() // ROW_PIXELS)
+    
+    def redraw_plot(self):
+        self.canvas.draw_idle()
+        self.plot_scrollbar.set(*self.renderer.view)
+    
+    def on_plot_scroll(self, action, *args):
+        """Scrollbar command: ``("moveto", fraction)`` or ``("scroll", n, "units"|"pages")``."""
+        if self.renderer is None:
+            return
+        if action == "moveto":
+            self.renderer.scroll_to(round(float(args[0]) * len(self.renderer.rows)))
+        else:
+            step = int(args[0]) * (self.renderer.visible_rows if args[1] == "pages" else 1)
+            self.renderer.scroll(step)
+        self.redraw_plot()
+    
+    def on_plot_wheel(self, event):
+        if self.renderer is not None:
+            self.renderer.scroll(-int(event.step))
+            self.redraw_plot()
+    
+    def on_plot_resize(self, event):
+        if self.renderer is not None:
+            self.renderer.set_visible_rows(self.visible_rows())
+            self.redraw_plot()
     
     def show_tooltip(self, event, field_type):
         if self.tooltip:
@@ -265,13 +493,26 @@ class StockCutterGUI:
             self.tooltip = None
     
     def change_language(self, language):
+        fast = self.is_fast_mode()
         self.current_language = language
+        self.mode_label.configure(text=self.languages[language]["mode_label"])
+        self.cancel_btn.configure(text=self.languages[language]["cancel"])
+        self.accept_btn.configure(text=self.languages[language]["accept"])
+        self.backend_label.configure(text=self.languages[language]["backend_label"])
+        self.time_limit_label.configure(text=self.languages[language]["time_limit_label"])
+        self.remnant_label.configure(text=self.languages[language]["remnant_label"])
+        self.update_remnant_count()
+        self.mode_selector.configure(values=[self.languages[language]["mode_exact"],
+                                             self.languages[language]["mode_fast"]])
+        self.mode_selector.set(self.languages[language]["mode_fast" if fast else "mode_exact"])
         # Update all text elements
         self.header_label.configure(text=self.languages[language]["title"])
         self.stock_label.configure(text=self.languages[language]["stock_label"])
         self.required_label.configure(text=self.languages[language]["required_label"])
         self.min_label.configure(text=self.languages[language]["quantity_label"])
         self.calculate_btn.configure(text=self.languages[language]["calculate"])
+        self.import_btn.configure(text=self.languages[language]["import"])
+        self.export_btn.configure(text=self.languages[language]["export"])
         self.results_label.configure(text=self.languages[language]["results"])
         self.vis_label.configure(text=self.languages[language]["visualization"])
         
@@ -280,236 +521,273 @@ class StockCutterGUI:
         self.required_entry.configure(placeholder_text="e.g., 5,2")
         self.min_quantities_entry.configure(placeholder_text="e.g., 2,0")
     
+    def is_fast_mode(self):
+        return self.mode_selector.get() == self.languages[self.current_language]["mode_fast"]
+    
+    def get_time_limit(self):
+        text = self.time_limit_entry.get().strip()
+        if not text:
+            return None
+        try:
+            time_limit = float(text)
+        except ValueError:
+            time_limit = 0
+        if time_limit <= 0:
+            raise ValueError("Time limit must be a positive number of seconds")
+        return time_limit
+    
+    def get_min_remnant(self):
+        """Minimum usable offcut length, or ``None`` when the rack is not used."""
+        text = self.remnant_entry.get().strip()
+        if not text:
+            return None
+        try:
+            min_length = float(text)
+        except ValueError:
+            min_length = -1
+        if min_length < 0:
+            raise ValueError("Minimum offcut length must be a non-negative number")
+        return min_length
+    
+    def update_remnant_count(self):
+        if self.remnants is None:
+            return
+        stats = self.remnants.stats()
+        self.remnant_count_label.configure(
+            text=f"{self.languages[self.current_language]['remnants']}: {stats['remnants']} "
+                 f"({stats['total_length']:g})")
+    
+    def preview_remnants(self, plan):
+        """A streamed plan with the reserved offcuts added, leaving the rack as it is."""
+        self.remnant_note = None
+        if self.allocation is None:
+            return plan
+        from remnant_store import merge_plan
+        return merge_plan(self.allocation, plan, self.order_min_qty)
+    
+    def use_remnants(self, plan):
+        """Add the reserved offcuts to a new-stock plan and update the rack."""
+        self.remnant_note = None
+        if self.allocation is None:
+            return plan
+        from remnant_store import merge_plan
+        plan = merge_plan(self.allocation, plan, self.order_min_qty)
+        self.remnants.commit(self.allocation, plan)
+        self.allocation = None
+        self.remnant_note = f"Offcuts used: {len(self.remnants.taken)}, kept: {len(self.remnants.stored)}"
+        self.update_remnant_count()
+        return plan
+    
+    def import_order(self):
+        path = filedialog.askopenfilename(filetypes=[("Orders", "*.csv *.json *.jsonl *.txt"), ("All files", "*")])
+        if not path:
+            return
+        from order_import import read_order
+        try:
+            order = read_order(path)
+        except (OSError, ValueError) as e:
+            self.show_error(str(e))
+            return
+        stock, pieces, quantities = order.as_text()
+        fields = [(self.required_entry, pieces), (self.min_quantities_entry, quantities)]
+        if stock:
+            fields.append((self.stock_entry, stock))
+        for entry, text in fields:
+            entry.delete(0, "end")
+            entry.insert(0, text)
+        self.import_label.configure(text=self.languages[self.current_language]["imported"].format(
+            rows=order.rows, pieces=len(order.pieces)))
+    
+    def export_plan(self):
+        if self.shown_plan is None:
+            return
+        path = filedialog.asksaveasfilename(defaultextension=".json",
+                                            filetypes=[("JSON", "*.json"), ("CSV", "*.csv")])
+        if not path:
+            return
+        from plan_export import export_plan
+        try:
+            export_plan(self.shown_plan, path)
+        except OSError as e:
+            self.show_error(str(e))
+    
     def calculate(self):
+        self.ensure_ready()
+        from stock_solver import SolveOptions, parse_lengths, parse_stock, validate_inputs
+        
+        parse_start = time.perf_counter(), time.process_time()
         try:
             # Get and validate inputs
-            try:
-                stock_sizes = [float(x.strip()) for x in self.stock_entry.get().split(',')]
-                required_sizes = [float(x.strip()) for x in self.required_entry.get().split(',')]
-                min_quantities = [float(x.strip()) for x in self.min_quantities_entry.get().split(',')]
-            except ValueError:
-                raise ValueError("Please enter valid numbers separated by commas")
-            
-            if len(required_sizes) != len(min_quantities):
-                raise ValueError("Number of required sizes must match number of minimum quantities")
-            
-            if not stock_sizes or not required_sizes or not min_quantities:
-                raise ValueError("Please fill in all fields")
-            
-            # Check if any required size is larger than the largest stock
-            max_stock = max(stock_sizes)
-            for size in required_sizes:
-                if size > max_stock:
-                    raise ValueError(f"Required size {size} is larger than the largest stock size {max_stock}")
-            
-            # Convert to numpy arrays
-            troncos = np.array(stock_sizes)
-            piezas = np.array(required_sizes)
-            lim_inf = np.array(min_quantities)
-            
-            # Calculate total required length
-            total_required_length = sum(piezas[i] * lim_inf[i] for i in range(len(piezas)))
-            total_stock = sum(troncos)
-            
-            if total_required_length > total_stock:
-                raise ValueError(
-                    f"Insufficient stock. Required length ({total_required_length}) exceeds available stock ({total_stock})")
-            
-            # Define problem
-            iponch = plp.LpProblem("iponch_p", plp.LpMinimize)
-            
-            # Variables - one for each possible cutting pattern for each stock piece
-            sol = {}
-            for i in range(len(troncos)):
-                for j in range(len(piezas)):
-                    sol['{},{}'.format(i,j)] = plp.LpVariable(
-                        'Tronco:{},pieza:{}'.format(troncos[i], piezas[j]),
-                        lowBound=0,
-                        cat='Integer'
-                    )
-            
-            # Objective function - minimize waste
-            waste = plp.lpSum(troncos[i] - plp.lpSum(sol['{},{}'.format(i,j)] * piezas[j] 
-                                                    for j in range(len(piezas))) 
-                            for i in range(len(troncos)))
-            iponch += waste
-            
-            # Constraints
-            # 1. Length constraint for each stock piece
-            for i in range(len(troncos)):
-                iponch += plp.lpSum(sol['{},{}'.format(i,j)] * piezas[j] 
-                                  for j in range(len(piezas))) <= troncos[i]
-            
-            # 2. Minimum quantity constraints
-            for j in range(len(piezas)):
-                iponch += plp.lpSum(sol['{},{}'.format(i,j)] 
-                                  for i in range(len(troncos))) >= lim_inf[j]
-            
-            # Solve with CBC solver
-            solver = plp.PULP_CBC_CMD(msg=False, timeLimit=10)
-            status = iponch.solve(solver)
-            
-            if status != 1:
-                raise ValueError(
-                    f"Could not find optimal solution. Status: {plp.LpStatus[iponch.status]}\n"
-                    f"Try different input values or check if the problem is feasible."
-                )
-            
-            # Verify solution
-            solution_valid = True
-            error_message = ""
-            
-            # Check if minimum quantities are met
-            for j in range(len(piezas)):
-                total_pieces = sum(sol['{},{}'.format(i,j)].varValue for i in range(len(troncos)))
-                if total_pieces < lim_inf[j]:
-                    solution_valid = False
-                    error_message = f"Could not meet minimum quantity for piece size {piezas[j]}"
-                    break
-            
-            # Check if stock lengths are not exceeded
-            for i in range(len(troncos)):
-                used_length = sum(sol['{},{}'.format(i,j)].varValue * piezas[j] 
-                                for j in range(len(piezas)))
-                if used_length > troncos[i]:
-                    solution_valid = False
-                    error_message = f"Solution exceeds stock length for piece {i+1}"
-                    break
-            
-            if not solution_valid:
-                raise ValueError(error_message)
-
+            stock_sizes = parse_stock(self.stock_entry.get())
+            required_sizes = parse_lengths(self.required_entry.get())
+            min_quantities = parse_lengths(self.min_quantities_entry.get())
+            validate_inputs(stock_sizes, required_sizes, min_quantities)
+            time_limit = self.get_time_limit()
+            min_remnant = self.get_min_remnant()
+        except ValueError as e:
+            self.show_error(str(e))
+            return
+        
+        # Demand that fits on the offcut rack is cut there; new stock covers the rest
+        self.allocation = None
+        self.order_min_qty = min_quantities
+        if min_remnant is not None:
+            self.remnants.min_length = min_remnant
+            self.allocation = self.remnants.reserve(required_sizes, min_quantities)
+            min_quantities = [float(q) for q in self.allocation.residual]
+        self.parse_time = (time.perf_counter() - parse_start[0], time.process_time() - parse_start[1])
+        
+        # Repeated or reordered orders are answered from the cache
+        options = SolveOptions(engine="fast" if self.is_fast_mode() else "milp",
+                               backend=self.backend_menu.get(), time_limit=time_limit,
+                               optional_stock=self.allocation is not None)
+        plan = self.cache.get(stock_sizes, required_sizes, min_quantities, options)
+        if plan is not None:
+            self.show_plan(self.use_remnants(plan))
+            return
+        
+        # Solve in the background worker so the window stays responsive
+        self.solve_options = options
+        self.solve_job = (stock_sizes, required_sizes, min_quantities)
+        self.worker.submit(stock_sizes, required_sizes, min_quantities, options)
+        self.incumbent = None
+        self.current_plan = None
+        self.calculate_btn.configure(state="disabled")
+        self.cancel_btn.configure(state="normal")
+        self.poll_solve()
+    
+    def poll_solve(self):
+        for kind, payload in self.worker.poll():
+            if kind == "incumbent":
+                self.incumbent = payload
+            elif kind == "plan":
+                # Show each better plan while the solve goes on
+                self.current_plan = payload
+                self.accept_btn.configure(state="normal")
+                self.show_plan(self.preview_remnants(payload))
+            elif kind == "done":
+                self.finish_solve()
+                payload.trace.add("parse", *self.parse_time)
+                self.cache.put(*self.solve_job, payload, self.solve_options)
+                self.show_plan(self.use_remnants(payload))
+                return
+            elif kind == "error":
+                self.finish_solve()
+                self.show_error(payload)
+                return
+        
+        progress = f"{self.languages[self.current_language]['solving']} {self.worker.elapsed:.1f} s"
+        if self.incumbent is not None:
+            waste, bound = self.incumbent
+            progress += f" | {self.languages[self.current_language]['incumbent']}: {waste:g}"
+            if bound is not None:
+                progress += f" (≥ {bound:g})"
+        self.progress_label.configure(text=progress)
+        self.root.after(100, self.poll_solve)
+    
+    def accept_plan(self):
+        """Stop the solve and keep the best plan found so far."""
+        if self.current_plan is None:
+            return
+        plan = self.current_plan
+        self.worker.cancel()
+        self.finish_solve()
+        self.show_plan(self.use_remnants(plan))
+    
+    def cancel_solve(self):
+        self.worker.cancel()
+        self.finish_solve()
+        self.progress_label.configure(text=self.languages[self.current_language]["cancelled"])
+    
+    def finish_solve(self):
+        self.calculate_btn.configure(state="normal")
+        self.cancel_btn.configure(state="disabled")
+        self.accept_btn.configure(state="disabled")
+        self.current_plan = None
+        self.progress_label.configure(text="")
+    
+    def on_close(self):
+        self.worker.shutdown()
+        if self.ready:
+            self.cache.close()
+            self.remnants.close()
+        self.root.destroy()
+    
+    def show_plan(self, plan):
+        from plan_export import iter_entries
+        from plan_renderer import PlanRenderer
+        
+        try:
             # Display results with better formatting
             self.results_text.delete("1.0", "end")
             self.results_text.insert("1.0", "Optimization Results\n")
             self.results_text.insert("end", "="*50 + "\n\n")
             
             # Calculate and display waste
-            total_waste = sum(troncos) - sum(sol['{},{}'.format(i,j)].varValue * piezas[j] 
-                                            for i in range(len(troncos)) for j in range(len(piezas)))
-            self.results_text.insert("end", f"Total Stock Length: {sum(troncos)}\n")
-            self.results_text.insert("end", f"Total Used Length: {sum(sol['{},{}'.format(i,j)].varValue * piezas[j] 
-                                                                 for i in range(len(troncos)) for j in range(len(piezas)))}\n")
-            self.results_text.insert("end", f"Total Waste: {total_waste}\n")
-            self.results_text.insert("end", f"Status: {plp.LpStatus[iponch.status]}\n\n")
+            self.results_text.insert("end", f"Total Stock Length: {plan.total_stock}\n")
+            self.results_text.insert("end", f"Total Used Length: {plan.total_used}\n")
+            self.results_text.insert("end", f"Total Waste: {plan.total_waste}\n")
+            self.results_text.insert("end", f"Status: {plan.status}\n")
+            self.results_text.insert("end", f"Waste Lower Bound: {plan.lower_bound}\n")
+            self.results_text.insert("end", f"Optimality Gap: {plan.gap:.2%}\n")
+            if plan.presolve is not None:
+                self.results_text.insert("end", f"Presolve: {plan.presolve.summary()}\n")
+            if self.remnant_note is not None:
+                self.results_text.insert("end", f"{self.remnant_note}\n")
+            stats = self.cache.stats()
+            self.results_text.insert("end", f"Cache: {stats['hits']} hits / {stats['misses']} misses\n\n")
             
             self.results_text.insert("end", "Cutting Patterns:\n")
             self.results_text.insert("end", "-"*50 + "\n")
             
-            # Clear previous visualization
+            # Identical bars are drawn once; only the rows in view are rendered
+            render_start = time.perf_counter(), time.process_time()
             self.create_new_figure()
-            
-            # Calculate number of logs and set figure size
-            num_logs = len(troncos)
-            fig_height = max(4 * num_logs, 8)  # Minimum height of 8 inches
-            self.fig.set_size_inches(8, fig_height)
-            
-            # Create a subplot for each log
-            axes = []
-            for i in range(num_logs):
-                if i == 0:
-                    ax = self.fig.add_subplot(num_logs, 1, i+1)
-                else:
-                    ax = self.fig.add_subplot(num_logs, 1, i+1, sharex=axes[0])
-                axes.append(ax)
-            
-            # Plot each log in its own subplot
-            log_height = 0.6
-            label_offset = 0.05
-            
-            # Define colors
-            colors = ['#3498db', '#2ecc71', '#e74c3c', '#f1c40f', '#9b59b6']
-            
-            for i, (ax, tronco) in enumerate(zip(axes, troncos)):
-                # Draw the log
-                ax.barh(0, tronco, height=log_height, 
-                       color=colors[i % len(colors)], alpha=0.7)
-                
-                # Add log label
-                ax.text(tronco/2, 0, f'Log {i+1} ({tronco})', 
-                       ha='center', va='center', color='white', 
-                       fontweight='bold', fontsize=10)
-                
-                # Draw cuts and add piece labels
-                cut_pos = 0
-                for j, pieza in enumerate(piezas):
-                    count = int(sol['{},{}'.format(i,j)].varValue)
-                    for _ in range(count):
-                        # Draw cut line - extend beyond log edges
-                        ax.axvline(x=cut_pos, ymin=0.3, ymax=0.7,
-                                 color='red', linestyle='-', 
-                                 linewidth=1.5, alpha=0.8)
-                        
-                        # Add piece label above the log
-                        ax.text(cut_pos + pieza/2, 0.4, 
-                               f'{pieza}', 
-                               ha='center', va='bottom', color='white', 
-                               fontsize=10, fontweight='bold',
-                               bbox=dict(facecolor='#1a1a1a', 
-                                       alpha=0.9, 
-                                       edgecolor='white',
-                                       linewidth=0.5,
-                                       boxstyle='round,pad=0.2'))
-                        
-                        cut_pos += pieza
-                
-                # Draw final cut line at the end of used length
-                if cut_pos < tronco:
-                    ax.axvline(x=cut_pos, ymin=0.3, ymax=0.7,
-                             color='red', linestyle='-', 
-                             linewidth=1.5, alpha=0.8)
-                
-                # Set subplot properties
-                ax.set_ylim(-0.5, 0.5)
-                ax.set_xlim(0, max(troncos) * 1.1)
-                ax.grid(True, linestyle='--', alpha=0.3, color='white')
-                
-                # Remove y-axis ticks and labels
-                ax.set_yticks([])
-                
-                # Only show x-axis labels for the bottom subplot
-                if i < num_logs - 1:
-                    ax.set_xticklabels([])
-                
-                # Set background color
-                ax.set_facecolor('#2b2b2b')
-                
-                # Customize spines
-                for spine in ax.spines.values():
-                    spine.set_color('white')
-                    spine.set_linewidth(0.5)
-            
-            # Add common x-label to bottom subplot
-            axes[-1].set_xlabel('Length', color='white', fontsize=12)
-            
-            # Add title to top subplot
-            axes[0].set_title('Cutting Patterns Visualization', 
-                            color='white', fontsize=14, pad=20)
-            
-            # Adjust layout
+            self.renderer = PlanRenderer(self.fig.add_subplot(1, 1, 1), self.visible_rows())
+            self.renderer.set_plan(plan)
             self.fig.tight_layout()
-            
-            # Redraw canvas
             self.canvas.draw()
-            
-            # Add cutting patterns to text area
-            for variable in iponch.variables():
-                if variable.varValue > 0:
-                    self.results_text.insert("end", f"• {variable.name} = {variable.varValue}\n")
+            self.plot_scrollbar.set(*self.renderer.view)
+            
+            # Distinct patterns only, and only the first screens of them; the rest is in the export
+            entries = iter_entries(plan)
+            for entry in itertools.islice(entries, MAX_TEXT_PATTERNS):
+                cuts = ", ".join(f"{c:g}" for c in entry["cuts"])
+                self.results_text.insert("end", f"• {entry['count']} × {entry['size']:g}: {cuts} "
+                                                f"(waste {entry['waste']:g})\n")
+            hidden = sum(1 for _ in entries)
+            if hidden:
+                self.results_text.insert("end", f"... {hidden} more patterns (Export plan to see all)\n")
+            self.shown_plan = plan
+            self.export_btn.configure(state="normal")
+            
+            # Timings and solver statistics (plans from the cache have none)
+            if plan.trace is not None:
+                plan.trace.add("render", time.perf_counter() - render_start[0],
+                               time.process_time() - render_start[1])
+                self.results_text.insert("end", "\nSolve Trace:\n")
+                self.results_text.insert("end", "-"*50 + "\n")
+                for line in plan.trace.summary():
+                    self.results_text.insert("end", f"{line}\n")
+                if os.environ.get("STOCK_CUTTER_TRACE"):
+                    plan.trace.write(os.environ["STOCK_CUTTER_TRACE"])
             
         except Exception as e:
-            error_message = str(e)
-            # Clear previous results
-            self.results_text.delete("1.0", "end")
-            self.results_text.insert("1.0", "Error\n")
-            self.results_text.insert("end", "="*50 + "\n\n")
-            self.results_text.insert("end", f"Error: {error_message}\n\n")
-            self.results_text.insert("end", "Please check your inputs and try again.")
-            
-            # Show error message box using standard messagebox
-            messagebox.showerror("Error", error_message)
-            
-            # Clear visualization
+            self.show_error(str(e))
+    
+    def show_error(self, error_message):
+        # Clear previous results
+        self.results_text.delete("1.0", "end")
+        self.results_text.insert("1.0", "Error\n")
+        self.results_text.insert("end", "="*50 + "\n\n")
+        self.results_text.insert("end", f"Error: {error_message}\n\n")
+        self.results_text.insert("end", "Please check your inputs and try again.")
+        
+        # Show error message box using standard messagebox
+        messagebox.showerror("Error", error_message)
+        
+        # Clear visualization (there is none before startup has finished)
+        if self.canvas is not None:
             self.create_new_figure()
             self.canvas.draw()
 
@@ -0,0 +1,768 @@
+"""Headless stock cutting solver.
+
+Builds and solves the iponch cutting model without any UI so the same engine
+can be used from the desktop app, batch jobs and services.
+
+Model: every stock bar is cut, the total cut length of a bar may not exceed
+its length, at least ``min_qty[j]`` pieces of each length are produced and
+the total waste (stock length not turned into pieces) is minimized. Bars of
+the same length are aggregated into stock types and solved with integer
+pattern usage counts (see ``patterns``), so identical bars add no symmetry.
+"""
+import dataclasses
+import math
+import time
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Callable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pulp as plp
+
+from backends import choose_backend
+from column_generation import solve_colgen
+from heuristics import solve_heuristic
+from pattern_dp import solve_dp
+from patterns import (PatternModel, adjust_usage, enumerate_patterns, lower_bound, usage_from_values,
+                      usage_produced, usage_waste)
+from presolve import Presolve, presolve
+from solve_trace import Trace, phase
+
+# Above this many maximal patterns per stock length the exact model is left
+# to column generation
+MAX_PATTERNS = 20000
+# Work limit of the DP engine when it is picked explicitly
+DP_MAX_WORK = 200_000_000
+# Shares of the time limit after which the MILP stops to stream its plan;
+# each slice doubles the time spent so far
+ANYTIME_CHECKPOINTS = (0.125, 0.25, 0.5)
+
+
+@dataclass
+class SolveOptions:
+    """Knobs for a single solve.
+
+    ``engine`` is ``"milp"`` for the exact integer pattern model,
+    ``"colgen"`` for the column generation engine used for large orders,
+    ``"dp"`` for the exact dynamic programming engine (small instances are
+    routed to it from ``"milp"`` automatically), or ``"fast"``/``"ffd"``/
+    ``"bfd"`` for the greedy heuristics. When CBC does not return an optimal
+    solution the heuristics are used as a fallback.
+
+    ``backend`` is the MILP solver the exact engines hand their models to:
+    ``"cbc"``, ``"highs"``, ``"scipy"`` or ``"auto"`` to pick by model size
+    (see ``backends``). ``time_limit`` is in seconds per solve.
+
+    ``on_incumbent(waste, bound)`` is called whenever the exact engines have
+    a feasible plan in hand, for progress reporting. ``on_plan(plan)`` is
+    called with each improving plan as a verified ``Plan`` (status
+    ``"Incumbent"``), starting with the heuristic one, so it can be shown and
+    accepted before the solve ends. With ``on_plan`` the MILP stops at each of
+    ``ANYTIME_CHECKPOINTS`` (shares of the time limit) to hand back its
+    incumbent and then continues warm started from it. Inside the engines
+    ``on_incumbent`` also receives the usage as a third argument.
+
+    ``precision`` is the length unit the engines work in (e.g. ``0.1``);
+    stock is rounded down and pieces up to it. ``None`` keeps the lengths
+    exact to their decimal places.
+
+    ``presolve`` reduces the instance before an engine sees it (see
+    ``presolve``).
+
+    ``session`` is an optional ``SolveSession`` that keeps the exact model
+    and plan between solves of the same order.
+
+    ``optional_stock`` lets bars the demand does not need stay uncut (the
+    offcut rack uses it so remnants replace new bars): bars cut only for
+    surplus pieces are dropped, longest first, and the bars left are solved
+    again. By default every bar is cut.
+
+    ``seed`` varies the MILP backend's random choices. ``cutoff()`` returns
+    the least waste already found elsewhere (e.g. by the other strategies of
+    a ``portfolio``) or ``None``; the MILP then only looks for better plans,
+    and if there are none, that waste becomes its proven bound.
+
+    ``trace`` collects phase timings and solver statistics (a new
+    ``solve_trace.Trace`` per solve if not given; it ends up on
+    ``plan.trace``). With ``trace_path`` each solve's trace is appended
+    there as a JSON line.
+    """
+    time_limit: Optional[float] = 10
+    msg: bool = False
+    engine: str = "milp"
+    on_incumbent: Optional[Callable[[float, float], None]] = None
+    on_plan: Optional[Callable[["Plan"], None]] = None
+    precision: Optional[float] = None
+    presolve: bool = True
+    backend: str = "auto"
+    session: Optional["SolveSession"] = None
+    seed: Optional[int] = None
+    cutoff: Optional[Callable[[], Optional[float]]] = None
+    trace: Optional[Trace] = None
+    trace_path: Optional[str] = None
+    optional_stock: bool = False
+
+
+class SolveSession:
+    """Model and plan kept from the previous exact solve.
+
+    Operators usually change one quantity and solve again. While the stock
+    and piece lengths stay the same, the pattern model is updated in place
+    (see ``patterns.PatternModel``) and warm started from the previous plan,
+    fitted to the new counts; only a change of lengths rebuilds it.
+    """
+
+    def __init__(self):
+        self.model: Optional[PatternModel] = None
+        self.lengths = None
+        self.piezas = None
+        self.usage = None
+        self.rebuilds = 0
+        self.updates = 0
+
+    def previous_plan(self, lengths, counts, piezas, lim_inf) -> Optional[list]:
+        """The last plan fitted to this instance, if it had the same lengths."""
+        if self.usage is None or not (np.array_equal(self.lengths, lengths)
+                                      and np.array_equal(self.piezas, piezas)):
+            return None
+        return adjust_usage(self.usage, lengths, counts, piezas, lim_inf)
+
+    def remember(self, lengths, piezas, usage) -> None:
+        self.lengths = np.array(lengths)
+        self.piezas = np.array(piezas)
+        self.usage = usage
+
+
+class StockType(NamedTuple):
+    """``count`` bars of the same ``length``."""
+    length: float
+    count: int
+
+
+class PatternTable(NamedTuple):
+    """Distinct bars of a plan: ``multiplicity[r]`` bars of length ``stock[r]`` cut by ``counts[r]``.
+
+    A plan with thousands of bars usually has a few dozen rows here.
+    """
+    stock: np.ndarray
+    counts: np.ndarray
+    multiplicity: np.ndarray
+
+    def expand(self) -> Tuple[np.ndarray, np.ndarray]:
+        """One ``(stock, counts)`` row per bar."""
+        return np.repeat(self.stock, self.multiplicity), np.repeat(self.counts, self.multiplicity, axis=0)
+
+
+@dataclass
+class Plan:
+    """A solved cutting plan.
+
+    ``table`` is the plan: ``table.multiplicity[r]`` bars of length
+    ``table.stock[r]``, each cut into ``table.counts[r]`` pieces of each
+    length, one row per distinct bar and longest stock first. Totals and
+    exports work on the rows, so thousands of identical bars cost what one
+    does. ``stock`` and ``counts`` are the per-bar view, an ``(n bars,
+    len(pieces))`` matrix built on first use. ``lower_bound`` is a proven
+    lower bound on the waste, so a time-limited plan still comes with a
+    known quality. Totals are rounded to ``decimals`` places, the precision
+    the plan was solved at, so they come out exact instead of as
+    ``0.9999999``. ``presolve`` holds the presolve report, if one ran, and
+    ``trace`` the timings and solver statistics of the solve.
+    """
+    table: PatternTable
+    pieces: np.ndarray
+    min_qty: np.ndarray
+    status: str
+    lower_bound: Optional[float] = None
+    decimals: Optional[int] = None
+    presolve: Optional[Presolve] = None
+    trace: Optional[Trace] = None
+
+    @classmethod
+    def from_patterns(cls, table: PatternTable, pieces, min_qty, status: str, **fields) -> "Plan":
+        """Plan with the rows of ``table``, identical bars merged and longest first."""
+        pieces = np.asarray(pieces, dtype=float)
+        stock = np.asarray(table.stock, dtype=float)
+        counts = np.asarray(table.counts, dtype=int).reshape(len(stock), len(pieces))
+        mult = np.asarray(table.multiplicity, dtype=int)
+        keys = np.column_stack([stock, counts])
+        _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+        merged = np.zeros(len(first), dtype=int)
+        np.add.at(merged, inverse.reshape(-1), mult)
+        order = np.lexsort((first, -stock[first]))
+        order = order[merged[order] > 0]
+        rows = first[order]
+        return cls(PatternTable(stock[rows], counts[rows], merged[order]), pieces,
+                   np.asarray(min_qty, dtype=float), status, **fields)
+
+    @classmethod
+    def from_bars(cls, stock, pieces, min_qty, counts, status: str, **fields) -> "Plan":
+        """Plan from one ``stock`` length and ``counts`` row per bar."""
+        stock = np.asarray(stock, dtype=float)
+        return cls.from_patterns(PatternTable(stock, counts, np.ones(len(stock), dtype=int)), pieces, min_qty,
+                                 status, **fields)
+
+    @cached_property
+    def stock(self) -> np.ndarray:
+        return np.repeat(self.table.stock, self.table.multiplicity)
+
+    @cached_property
+    def counts(self) -> np.ndarray:
+        return np.repeat(self.table.counts, self.table.multiplicity, axis=0)
+
+    @property
+    def used_per_pattern(self) -> np.ndarray:
+        return self.table.counts @ self.pieces
+
+    @property
+    def used_per_stock(self) -> np.ndarray:
+        return np.repeat(self.used_per_pattern, self.table.multiplicity)
+
+    @property
+    def produced(self) -> np.ndarray:
+        return self.table.multiplicity @ self.table.counts
+
+    def snap(self, value) -> float:
+        """``value`` rounded to the plan's precision."""
+        return float(value) if self.decimals is None else round(float(value), self.decimals)
+
+    @property
+    def total_stock(self) -> float:
+        return self.snap(self.table.stock @ self.table.multiplicity)
+
+    @property
+    def total_used(self) -> float:
+        return self.snap(self.used_per_pattern @ self.table.multiplicity)
+
+    @property
+    def total_waste(self) -> float:
+        return self.snap(self.total_stock - self.total_used)
+
+    @property
+    def gap(self) -> Optional[float]:
+        """Relative gap between the plan's waste and the lower bound."""
+        if self.lower_bound is None:
+            return None
+        waste = self.total_waste
+        if waste <= self.lower_bound + 1e-9:
+            return 0.0
+        return (waste - self.lower_bound) / waste
+
+    def patterns(self) -> PatternTable:
+        """Distinct bars with their multiplicity, longest stock first."""
+        return self.table
+
+    def cuts(self, i: int) -> List[float]:
+        """Piece lengths cut from stock item ``i``, in piece order."""
+        return [float(p) for p, c in zip(self.pieces, self.counts[i]) for _ in range(int(c))]
+
+    def entries(self, grouped: bool = True) -> Iterator[dict]:
+        """``stockPatters`` entries, one per pattern (with ``count``) or, with ``grouped=False``, per bar."""
+        for length, counts, used, mult in zip(self.table.stock, self.table.counts, self.used_per_pattern,
+                                              self.table.multiplicity):
+            entry = {"size": float(length), "cuts": np.repeat(self.pieces, counts).tolist(),
+                     "waste": self.snap(length - used)}
+            if grouped:
+                yield {**entry, "count": int(mult)}
+            else:
+                for _ in range(int(mult)):
+                    yield entry
+
+    def to_dict(self, grouped: bool = True) -> dict:
+        """JSON-ready plan: total waste and the ``stockPatters`` entries."""
+        return {
+            "waste": self.total_waste,
+            "status": self.status,
+            "lowerBound": self.lower_bound,
+            "stockPatters": list(self.entries(grouped)),
+        }
+
+    def lines(self) -> Iterator[str]:
+        """Non-zero assignments in the ``Tronco:<stock>,pieza:<piece> = <count>`` format, one block per bar."""
+        for length, counts, mult in zip(*self.table):
+            block = ["Tronco:{},pieza:{} = {}".format(float(length), float(self.pieces[j]), float(counts[j]))
+                     for j in np.flatnonzero(counts)]
+            for _ in range(int(mult)):
+                yield from block
+
+
+def parse_lengths(text: str) -> List[float]:
+    """Parse a comma separated list of numbers."""
+    try:
+        return [float(x.strip()) for x in text.split(',')]
+    except ValueError:
+        raise ValueError("Please enter valid numbers separated by commas")
+
+
+def parse_stock(text: str) -> List[StockType]:
+    """Parse stock entries like ``13,10`` or ``6000x200,4000x50``.
+
+    A bare number is a single bar, ``<length>x<count>`` is ``count`` bars of
+    that length.
+    """
+    stock = []
+    try:
+        for token in text.split(','):
+            length, _, count = token.strip().lower().replace('*', 'x').partition('x')
+            stock.append(StockType(float(length), int(count) if count else 1))
+    except ValueError:
+        raise ValueError("Please enter valid stock lengths separated by commas (e.g., 13,10 or 6000x200)")
+    return stock
+
+
+def aggregate_stock(stock: Sequence) -> Tuple[np.ndarray, np.ndarray]:
+    """Merge stock items into distinct lengths (longest first) with bar counts.
+
+    ``stock`` may mix plain lengths and ``(length, count)`` pairs.
+    """
+    totals = {}
+    for item in stock:
+        length, count = (item, 1) if np.isscalar(item) else item
+        if count < 0:
+            raise ValueError(f"Stock count for length {length} must not be negative")
+        totals[float(length)] = totals.get(float(length), 0) + int(count)
+    lengths = np.array(sorted((l for l, c in totals.items() if c > 0), reverse=True))
+    counts = np.array([totals[l] for l in lengths], dtype=int)
+    return lengths, counts
+
+
+def validate_inputs(stock: Sequence, pieces: Sequence[float], min_qty: Sequence[float]
+                    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Check an instance for obvious infeasibility and return it as arrays.
+
+    Returns the distinct stock lengths, their bar counts, the piece lengths
+    and the minimum quantities.
+    """
+    if len(pieces) != len(min_qty):
+        raise ValueError("Number of required sizes must match number of minimum quantities")
+
+    if len(stock) == 0 or len(pieces) == 0 or len(min_qty) == 0:
+        raise ValueError("Please fill in all fields")
+
+    lengths, counts = aggregate_stock(stock)
+    if len(lengths) == 0:
+        raise ValueError("Please fill in all fields")
+    piezas = np.asarray(pieces, dtype=float)
+    lim_inf = np.asarray(min_qty, dtype=float)
+
+    # Check if any required size is larger than the largest stock
+    max_stock = lengths.max()
+    for size in piezas:
+        if size > max_stock:
+            raise ValueError(f"Required size {size} is larger than the largest stock size {max_stock}")
+
+    total_required_length = float(piezas @ lim_inf)
+    total_stock = float(lengths @ counts)
+    if total_required_length > total_stock * (1 + 1e-9):
+        raise ValueError(
+            f"Insufficient stock. Required length ({total_required_length}) exceeds available stock ({total_stock})")
+
+    return lengths, counts, piezas, lim_inf
+
+
+def usage_table(lengths: np.ndarray, counts: np.ndarray, usage: list, n: int) -> PatternTable:
+    """``(type, pattern, multiplicity)`` usage as pattern rows, bars left uncut as empty patterns."""
+    uncut = np.array(counts, dtype=int)
+    stock, rows, mults = [], [], []
+    for k, a, mult in usage:
+        stock.append(lengths[k])
+        rows.append(a)
+        mults.append(mult)
+        uncut[k] -= mult
+    for k in np.flatnonzero(uncut > 0):
+        stock.append(lengths[k])
+        rows.append(np.zeros(n, dtype=int))
+        mults.append(uncut[k])
+    return PatternTable(np.array(stock, dtype=float), np.array(rows, dtype=int).reshape(len(rows), n),
+                        np.array(mults, dtype=int))
+
+
+def integer_scale(values: Sequence[float], max_decimals: int = 6) -> int:
+    """Smallest power of ten that makes every value integral.
+
+    Gives up at ``max_decimals`` decimal places.
+    """
+    values = np.asarray(values, dtype=float)
+    for d in range(max_decimals + 1):
+        scaled = values * 10 ** d
+        if np.all(np.abs(scaled - np.rint(scaled)) < 1e-6):
+            return 10 ** d
+    return 10 ** max_decimals
+
+
+def normalize_lengths(lengths: np.ndarray, counts: np.ndarray, piezas: np.ndarray,
+                      precision: Optional[float] = None
+                      ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, float]:
+    """Convert lengths to small integers.
+
+    Lengths are expressed in units of ``precision`` (stock rounded down,
+    pieces rounded up, so a plan never cuts more than the real bar holds) or,
+    without a precision, of the finest decimal place used. The common GCD is
+    then divided out. Stock lengths that become equal are merged.
+
+    Returns the integer stock lengths, their counts, the integer piece
+    lengths and the unit: ``real length = integer length * unit``.
+    """
+    if precision is None:
+        scale = integer_scale(np.concatenate([lengths, piezas]))
+        stock_units = np.rint(lengths * scale)
+        piece_units = np.rint(piezas * scale)
+        unit = 1 / scale
+    else:
+        stock_units = np.floor(lengths / precision + 1e-9)
+        piece_units = np.ceil(piezas / precision - 1e-9)
+        unit = precision
+    stock_units = stock_units.astype(np.int64)
+    piece_units = piece_units.astype(np.int64)
+
+    g = int(np.gcd.reduce(np.concatenate([stock_units, piece_units])))
+    if g > 1:
+        stock_units //= g
+        piece_units //= g
+        unit *= g
+
+    if len(np.unique(stock_units)) < len(stock_units):
+        stock_units, counts = aggregate_stock(list(zip(stock_units.tolist(), counts.tolist())))
+        stock_units = stock_units.astype(np.int64)
+    return stock_units, counts, piece_units, unit
+
+
+def make_plan(lengths: np.ndarray, counts: np.ndarray, piezas: np.ndarray, lim_inf: np.ndarray,
+              usage: list, status: str, bound: Optional[float] = None,
+              decimals: Optional[int] = None) -> Plan:
+    """Turn engine usage into a verified ``Plan``."""
+    plan = Plan.from_patterns(usage_table(lengths, counts, usage, len(piezas)), piezas, lim_inf, status,
+                              lower_bound=bound, decimals=decimals)
+    verify_plan(plan)
+    return plan
+
+
+def verify_plan(plan: Plan) -> None:
+    """Raise ``ValueError`` if the plan breaks a length or quantity constraint."""
+    produced = plan.produced
+    for j in range(len(plan.pieces)):
+        if produced[j] < plan.min_qty[j]:
+            raise ValueError(f"Could not meet minimum quantity for piece size {plan.pieces[j]}")
+
+    used = plan.used_per_pattern
+    for r in range(len(plan.table.stock)):
+        if used[r] > plan.table.stock[r] + 1e-9:
+            raise ValueError(f"Solution exceeds stock length for pattern {r+1}")
+
+
+def solve_milp(lengths: np.ndarray, counts: np.ndarray, piezas: np.ndarray, lim_inf: np.ndarray,
+               options: SolveOptions) -> Tuple[list, str, Optional[float]]:
+    """Solve the pattern model over all maximal patterns with CBC.
+
+    Instances small enough for the DP engine are solved by it. Otherwise CBC
+    is warm started from the heuristic plan, and not run at all when that
+    plan already meets the quick lower bound. Returns ``(usage, status,
+    bound)``. Instances with too many patterns to enumerate are handed to
+    the column generation engine instead.
+    """
+    session = options.session
+    result = _solve_milp(lengths, counts, piezas, lim_inf, options, session)
+    if session is not None:
+        session.remember(lengths, piezas, result[0])
+    return result
+
+
+def _solve_milp(lengths, counts, piezas, lim_inf, options, session):
+    exact = solve_dp(lengths, counts, piezas, lim_inf)
+    if exact is not None:
+        return exact
+
+    candidates = []
+    try:
+        candidates.append(solve_heuristic(lengths, counts, piezas, lim_inf)[0])
+    except ValueError:
+        pass
+    if session is not None:
+        previous = session.previous_plan(lengths, counts, piezas, lim_inf)
+        if previous is not None:
+            candidates.append(previous)
+    incumbent = min(candidates, key=lambda u: usage_waste(u, lengths, piezas), default=None)
+    bound = lower_bound(lengths, counts, piezas)
+    if incumbent is not None:
+        waste = usage_waste(incumbent, lengths, piezas)
+        if options.on_incumbent is not None:
+            options.on_incumbent(waste, bound, incumbent)
+        if waste <= bound + 1e-6:
+            return incumbent, "Optimal", bound
+
+    model = None if session is None else session.model
+    if model is not None and model.matches(lengths, piezas):
+        with phase(options.trace, "build"):
+            model.update(counts, lim_inf)
+        session.updates += 1
+    else:
+        columns = []
+        with phase(options.trace, "build"):
+            for k, length in enumerate(lengths):
+                found = enumerate_patterns(length, piezas, MAX_PATTERNS)
+                if found is None:
+                    break
+                columns.extend((k, a) for a in found)
+            else:
+                model = PatternModel(lengths, counts, piezas, lim_inf, columns)
+        if model is None:
+            # Too many patterns to enumerate; colgen keeps the incumbent if it finds nothing better
+            return run_colgen(lengths, counts, piezas, lim_inf, options, initial=incumbent)
+        if session is not None:
+            session.model = model
+            session.rebuilds += 1
+
+    if options.on_plan is not None:
+        return _solve_anytime(model, lengths, piezas, lim_inf, incumbent, bound, options)
+    known = None if options.cutoff is None else options.cutoff()
+    waste = None if incumbent is None else usage_waste(incumbent, lengths, piezas)
+    cutoff = _search_cutoff(model, options.backend, known, waste)
+    y = model.solve(time_limit=options.time_limit, msg=options.msg, initial=incumbent, backend=options.backend,
+                    trace=options.trace, seed=options.seed, cutoff=_cutoff(cutoff))
+    iponch = model.master
+    usage = _model_plan(model, y, lim_inf)
+
+    if (usage is None and cutoff is not None and incumbent is not None
+            and iponch.status in (plp.LpStatusInfeasible, plp.LpStatusOptimal)):
+        # Nothing beats the incumbent or the waste found elsewhere
+        proven = waste if known is None else min(known, waste)
+        return incumbent, "Optimal" if proven >= waste - 1e-6 else "Heuristic", max(bound, proven)
+    if usage is None:
+        if incumbent is None:
+            raise ValueError(
+                f"Could not find optimal solution. Status: {plp.LpStatus[iponch.status]}\n"
+                f"Try different input values or check if the problem is feasible."
+            )
+        return incumbent, f"Heuristic (CBC: {plp.LpStatus[iponch.status]})", bound
+
+    if iponch.sol_status == plp.LpSolutionOptimal:
+        return usage, "Optimal", usage_waste(usage, lengths, piezas)
+    # Time limit hit with an integer solution; backends that were not warm
+    # started may stop on a worse plan than the incumbent
+    if incumbent is not None and waste <= usage_waste(usage, lengths, piezas) + 1e-6:
+        return incumbent, "Heuristic", bound
+    return usage, "Feasible", bound
+
+
+def _model_plan(model, y, lim_inf):
+    """Usage of a solved ``model``, or ``None`` if the backend stopped without a plan.
+
+    HiGHS reports a stop on its objective bound (the cutoff) with a
+    feasible status but no solution.
+    """
+    if model.master.status != 1:
+        return None
+    usage = usage_from_values(model.columns, y)
+    if np.any(usage_produced(usage, len(lim_inf)) < np.asarray(lim_inf) - 1e-9):
+        return None
+    return usage
+
+
+def _search_cutoff(model, backend, known, waste):
+    """Cutoff waste for solving ``model`` from an incumbent with ``waste``.
+
+    Backends that cannot be warm started only search for plans better than
+    the incumbent; ``known`` is the waste found elsewhere, if any.
+    """
+    if waste is None or choose_backend(backend, len(model.columns)).warm_starts:
+        return known
+    # Wastes are whole units
+    better = waste - 1
+    return better if known is None else min(known, better)
+
+
+def _trim_stock(plan, options):
+    """``plan`` without the bars cut only for surplus pieces, re-solved on the bars left."""
+    surplus = plan.produced - np.ceil(plan.min_qty - 1e-9)
+    table = plan.table
+    kept = table.multiplicity.copy()
+    for r, row in enumerate(table.counts):
+        cut = row > 0
+        # As many of the row's bars as the surplus covers
+        drop = kept[r] if not cut.any() else min(kept[r], int(np.min(surplus[cut] // row[cut])))
+        surplus -= drop * row
+        kept[r] -= drop
+    if np.array_equal(kept, table.multiplicity):
+        return plan
+    if not kept.any():
+        return dataclasses.replace(plan, table=PatternTable(table.stock[:0], table.counts[:0], kept[:0]),
+                                   status="Optimal", lower_bound=0.0)
+    # The kept bars already meet the demand, so the re-solve is feasible and no worse
+    options = dataclasses.replace(options, optional_stock=False, on_incumbent=None, on_plan=None, session=None,
+                                  cutoff=None, trace_path=None)
+    try:
+        return solve(list(zip(table.stock, kept)), plan.pieces, plan.min_qty, options)
+    except ValueError:
+        return Plan.from_patterns(PatternTable(table.stock, table.counts, kept), plan.pieces, plan.min_qty,
+                                  plan.status, lower_bound=plan.lower_bound, decimals=plan.decimals,
+                                  presolve=plan.presolve, trace=plan.trace)
+
+
+def _cutoff(waste):
+    """Backend cutoff that still admits plans as good as ``waste`` (wastes are whole units)."""
+    return None if waste is None else waste + 0.5
+
+
+def _solve_anytime(model, lengths, piezas, lim_inf, incumbent, bound, options):
+    """Solve ``model`` in time slices, reporting the plan after each.
+
+    The backends only return their incumbent when they stop, so the solve
+    is stopped at each of ``ANYTIME_CHECKPOINTS`` of the time limit; the
+    plan found so far is reported and warm starts the next slice. Early
+    slices are short, so a first MILP plan arrives quickly, and each one
+    doubles the time spent so the restarts cost little of the limit.
+    Without a time limit, or without a plan to warm start from (a restart
+    would throw the search away), the rest is one solve.
+    """
+    start = time.monotonic()
+    best, status = incumbent, "Heuristic"
+    best_waste = math.inf if incumbent is None else usage_waste(incumbent, lengths, piezas)
+    checkpoints = [None] if options.time_limit is None else [*ANYTIME_CHECKPOINTS, 1.0]
+    for share in checkpoints:
+        time_limit = None
+        if share is not None:
+            if best is None:
+                share = 1.0
+            time_limit = options.time_limit * share - (time.monotonic() - start)
+            if time_limit < 0.1 and share < 1.0:
+                continue
+            time_limit = max(time_limit, 0.1)
+        known = None if options.cutoff is None else options.cutoff()
+        cutoff = _search_cutoff(model, options.backend, known, None if best is None else best_waste)
+        y = model.solve(time_limit=time_limit, msg=options.msg, initial=best, backend=options.backend,
+                        trace=options.trace, seed=options.seed, cutoff=_cutoff(cutoff))
+        usage = _model_plan(model, y, lim_inf)
+        if (usage is None and known is None and cutoff is not None
+                and model.master.status in (plp.LpStatusInfeasible, plp.LpStatusOptimal)):
+            # Nothing beats the plan in hand
+            return best, "Optimal", best_waste
+        if usage is not None:
+            waste = usage_waste(usage, lengths, piezas)
+            if model.master.sol_status == plp.LpSolutionOptimal or waste <= bound + 1e-6:
+                return usage, "Optimal", waste
+            if waste < best_waste - 1e-6:
+                best, best_waste, status = usage, waste, "Feasible"
+                if options.on_incumbent is not None:
+                    options.on_incumbent(waste, bound, usage)
+        if share is None or share >= 1.0:
+            break
+    if best is None:
+        raise ValueError(
+            f"Could not find optimal solution. Status: {plp.LpStatus[model.master.status]}\n"
+            f"Try different input values or check if the problem is feasible."
+        )
+    return best, status, bound
+
+
+def run_colgen(lengths, counts, piezas, lim_inf, options, initial=None):
+    return solve_colgen(lengths, counts, piezas, lim_inf, time_limit=options.time_limit, msg=options.msg,
+                        on_incumbent=options.on_incumbent, backend=options.backend, trace=options.trace,
+                        initial=initial)
+
+
+def run_dp(lengths, counts, piezas, lim_inf, options):
+    result = solve_dp(lengths, counts, piezas, lim_inf, max_work=DP_MAX_WORK)
+    if result is None:
+        raise ValueError("Order too large for the dp engine, use milp or colgen")
+    return result
+
+
+def run_heuristic(lengths, counts, piezas, lim_inf, options):
+    return solve_heuristic(lengths, counts, piezas, lim_inf, options.engine)
+
+
+# Engines by name, all called as ``engine(lengths, counts, piezas, lim_inf,
+# options)`` and returning ``(usage, status, bound)``
+ENGINES = {
+    "milp": solve_milp,
+    "colgen": run_colgen,
+    "dp": run_dp,
+    "fast": run_heuristic,
+    "ffd": run_heuristic,
+    "bfd": run_heuristic,
+}
+
+
+def solve(stock: Sequence, pieces: Sequence[float], min_qty: Sequence[float],
+          options: Optional[SolveOptions] = None) -> Plan:
+    """Solve a cutting instance and return a verified ``Plan``.
+
+    ``stock`` is a list of lengths, one per bar, or of ``(length, count)``
+    stock types.
+    """
+    options = options or SolveOptions()
+    trace = options.trace or Trace()
+    options = caller = dataclasses.replace(options, trace=trace)
+    with trace.phase("validate"):
+        lengths, counts, piezas, lim_inf = validate_inputs(stock, pieces, min_qty)
+
+        # Engines work on small integer lengths; results are converted back below
+        lengths, counts, piezas, unit = normalize_lengths(lengths, counts, piezas, options.precision)
+        decimals = int(round(math.log10(integer_scale([unit]))))
+    reduced = None
+    offset = 0.0
+    full = (lengths, counts, piezas, lim_inf)
+    if options.presolve:
+        with trace.phase("presolve"):
+            reduced = presolve(lengths, counts, piezas, lim_inf, unit)
+        lengths, counts, piezas, lim_inf = reduced.lengths, reduced.counts, reduced.piezas, reduced.lim_inf
+        offset = reduced.fixed_waste
+    reduced_instance = (lengths, counts, piezas, lim_inf)
+    lengths, counts, piezas, lim_inf = full
+    quick = lower_bound(lengths, counts, piezas)
+
+    def finish(usage, status, bound):
+        """Plan in the caller's units from engine usage on the reduced instance."""
+        if reduced is not None:
+            usage = reduced.postsolve(usage)
+            if bound is not None:
+                bound = float(bound) + offset
+        bound = quick if bound is None else max(float(bound), quick)
+        return make_plan(np.round(lengths * unit, decimals), counts, np.round(piezas * unit, decimals), lim_inf,
+                         usage, status, round(bound * unit, decimals), decimals)
+
+    report, stream = options.on_incumbent, options.on_plan
+    if report is not None or stream is not None:
+        best = [math.inf]
+
+        def on_incumbent(waste, bound, usage):
+            # Engines may report the same plan twice (e.g. the heuristic start)
+            if waste >= best[0] - 1e-6:
+                return
+            best[0] = waste
+            if report is not None:
+                report(round((waste + offset) * unit, decimals),
+                       None if bound is None else round((bound + offset) * unit, decimals))
+            if stream is not None:
+                stream(finish(usage, "Incumbent", bound))
+        options = dataclasses.replace(options, on_incumbent=on_incumbent)
+    if options.cutoff is not None:
+        known = options.cutoff
+
+        def cutoff():
+            waste = known()
+            return None if waste is None else waste / unit - offset
+        options = dataclasses.replace(options, cutoff=cutoff)
+
+    engine = ENGINES.get(options.engine)
+    if engine is None:
+        raise ValueError(f"Unknown engine: {options.engine}")
+    trace.set_units(unit, offset, decimals)
+    if reduced is not None and reduced.empty:
+        usage, status, bound = [], "Optimal", 0.0
+    else:
+        with trace.phase("engine"):
+            usage, status, bound = engine(*reduced_instance, options)
+
+    with trace.phase("verify"):
+        plan = finish(usage, status, bound)
+    plan.presolve = reduced
+    plan.trace = trace
+    if caller.optional_stock:
+        plan = _trim_stock(plan, caller)
+    trace.info = {"engine": options.engine, "stock_types": len(lengths), "bars": int(counts.sum()),
+                  "pieces": len(piezas), "status": status, "waste": plan.total_waste,
+                  "lower_bound": plan.lower_bound}
+    if options.trace_path:
+        trace.write(options.trace_path)
+    return plan
@@ -0,0 +1,20 @@
+from benchmark import generate
+from stock_solver import SolveOptions, solve, verify_plan
+
+
+def test_streamed_plans_improve_and_end_with_the_result():
+    plans = []
+    plan = solve(*generate("uniform", 60, 0), SolveOptions(time_limit=10, on_plan=plans.append))
+    assert plans and plans[0].status == "Incumbent"
+    wastes = [p.total_waste for p in plans]
+    assert wastes == sorted(wastes, reverse=True)
+    assert plan.total_waste <= wastes[-1]
+    verify_plan(plan)
+
+
+def test_without_incumbent_the_time_limit_is_not_sliced():
+    # The heuristics cannot pack the triplets, so there is nothing to warm start from
+    instance = generate("triplet", 60, 0)
+    plan = solve(*instance, SolveOptions(time_limit=10, on_plan=lambda plan: None))
+    assert plan.status == "Optimal"
+    assert plan.total_waste == 0
@@ -0,0 +1,36 @@
+import io
+import json
+
+from cut_stock import main, read_jobs, run_batch, run_job
+
+
+def test_job_result_groups_bars():
+    line = json.dumps({"id": "A1", "stock": [[6000, 200]], "requiredSizes": [1450, 980],
+                       "minQuantities": [150, 100]})
+    result = json.loads(run_job(1, line, "milp", 10))
+    assert result["id"] == "A1"
+    assert sum(entry["count"] for entry in result["stockPatters"]) == 200
+    assert result["waste"] == sum(entry["count"] * entry["waste"] for entry in result["stockPatters"])
+
+
+def test_bad_job_reports_an_error():
+    result = json.loads(run_job(3, '{"stock": [5], "requiredSizes": [10], "minQuantities": [1]}', "milp", 10))
+    assert result["id"] == 3
+    assert "error" in result
+
+
+def test_batch_streams_one_line_per_job():
+    jobs = io.StringIO('{"id": "a", "stock": [13, 10], "requiredSizes": [5, 2], "minQuantities": [2, 0]}\n\n'
+                       '{"id": "b", "stock": [13], "requiredSizes": [4], "minQuantities": [3]}\n')
+    out = io.StringIO()
+    run_batch(read_jobs(jobs), out, workers=1, time_limit=10)
+    results = {r["id"]: r for r in map(json.loads, out.getvalue().splitlines())}
+    assert results["a"]["waste"] == 0.0
+    assert results["b"]["waste"] == 1.0
+
+
+def test_single_job_from_arguments(tmp_path):
+    path = tmp_path / "result.json"
+    main(["stock=[13,10]", "requiredSizes=[5,2]", "minQuantities=[2,0]", "-o", str(path)])
+    result = json.loads(path.read_text())
+    assert result["waste"] == 0.0
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from benchmark import generate
+from decompose import solve_decomposed
+from remnant_store import RemnantStore
+from stock_solver import SolveOptions, solve, verify_plan
+
+EXACT = ("dp", "milp", "colgen")
+INSTANCES = [("uniform", 12, seed) for seed in range(3)] + [("triplet", 12, seed) for seed in range(2)]
+
+
+def meets_demand(plan):
+    return np.all(plan.produced >= np.ceil(np.asarray(plan.min_qty) - 1e-9))
+
+
+@pytest.mark.parametrize("family,n,seed", INSTANCES)
+def test_exact_engines_agree(family, n, seed):
+    instance = generate(family, n, seed)
+    wastes = {}
+    for engine in EXACT:
+        plan = solve(*instance, SolveOptions(engine=engine, time_limit=10))
+        verify_plan(plan)
+        assert meets_demand(plan)
+        wastes[engine] = plan.total_waste
+    assert len(set(wastes.values())) == 1, wastes
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_heuristic_is_feasible_and_no_better_than_exact(seed):
+    instance = generate("uniform", 12, seed)
+    fast = solve(*instance, SolveOptions(engine="fast"))
+    verify_plan(fast)
+    assert meets_demand(fast)
+    assert fast.total_waste >= solve(*instance, SolveOptions(engine="milp")).total_waste
+
+
+def test_decimal_lengths_match_integer_lengths():
+    scaled = solve([1.3, 1.0], [0.5, 0.2], [2, 0])
+    plain = solve([13, 10], [5, 2], [2, 0])
+    assert scaled.total_waste == pytest.approx(plain.total_waste / 10)
+
+
+def test_decompose_with_several_stock_lengths():
+    pieces = [float(p) for p in range(300, 20, -13)]
+    plan = solve_decomposed([(1000, 40), (800, 20)], pieces, [3] * len(pieces), SolveOptions(time_limit=5),
+                            max_pieces=8, workers=1)
+    verify_plan(plan)
+    assert meets_demand(plan)
+    assert sorted(set(plan.stock)) == [800.0, 1000.0]
+
+
+def test_remnants_cover_demand_without_new_bars():
+    store = RemnantStore()
+    store.add([8, 8, 5])
+    plan = store.solve([13], [4], [4])
+    assert meets_demand(plan)
+    assert 13.0 not in plan.stock
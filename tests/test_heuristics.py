@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+
+from benchmark import generate
+from heuristics import fill, pack
+from stock_solver import normalize_lengths, validate_inputs
+
+
+@pytest.mark.parametrize("family,n", [("uniform", 30), ("uniform", 120), ("hard", None)])
+@pytest.mark.parametrize("best_fit", [False, True])
+def test_pack_meets_demand_and_leaves_no_room_for_a_piece(family, n, best_fit):
+    lengths, counts, piezas, lim_inf = validate_inputs(*generate(family, n, 0))
+    lengths, counts, piezas, _ = normalize_lengths(lengths, counts, piezas)
+    cuts = pack(lengths, counts, piezas, lim_inf, best_fit)
+    left = np.repeat(lengths, counts) - cuts @ piezas
+    assert np.all(left >= 0)
+    assert np.all(cuts.sum(axis=0) >= lim_inf)
+    assert np.all(left < piezas.min())
+
+
+def test_fill_restarts_beat_plain_greedy():
+    # Longest first leaves 2 in a bar of 12; starting with 4 fills it
+    assert fill(np.array([12.0]), np.array([5.0, 4.0])).tolist() == [[0, 3]]
@@ -0,0 +1,79 @@
+import io
+import json
+
+import numpy as np
+import pytest
+
+from order_import import OrderImportError, read_csv, read_json, read_order
+from plan_export import export_plan, load_plan
+from stock_solver import solve
+
+ORDER_CSV = """type,length,quantity
+stock,6000,20
+piece,1450,2
+piece,980,1
+piece,1450,3
+piece,980,
+"""
+
+
+def test_csv_order_sums_repeated_lengths():
+    order = read_csv(io.StringIO(ORDER_CSV))
+    assert order.rows == 5
+    assert order.pieces == [1450.0, 980.0]
+    assert order.min_qty == [5.0, 2.0]
+    assert [(s.length, s.count) for s in order.stock] == [(6000.0, 20)]
+
+
+def test_csv_without_header_and_semicolons():
+    order = read_csv(io.StringIO("1450;2\n980;1\n1450;1\n"))
+    assert order.pieces == [1450.0, 980.0]
+    assert order.min_qty == [3.0, 1.0]
+
+
+def test_all_row_errors_are_reported():
+    with pytest.raises(OrderImportError) as info:
+        read_csv(io.StringIO("length,quantity\nabc,1\n100,-2\n200,1\n"))
+    assert [row for row, _ in info.value.errors] == [2, 3]
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_json_job_round_trip(indent):
+    job = {"stock": [[6000, 20]], "requiredSizes": [1450, 980], "minQuantities": [5, 2]}
+    order = read_json(io.StringIO(json.dumps(job, indent=indent)))
+    assert order.as_job() == {"requiredSizes": [1450.0, 980.0], "minQuantities": [5.0, 2.0],
+                              "stock": [[6000.0, 20]]}
+
+
+def test_json_lines_and_arrays_agree():
+    items = [{"length": 1450, "qty": 2}, {"length": 980}, {"length": 1450, "qty": 3}]
+    lines = read_json(io.StringIO("\n".join(json.dumps(item) for item in items)))
+    array = read_json(io.StringIO(json.dumps(items, indent=2)))
+    assert lines.pieces == array.pieces == [1450.0, 980.0]
+    assert lines.min_qty == array.min_qty == [5.0, 1.0]
+
+
+def test_read_order_by_extension(tmp_path):
+    path = tmp_path / "orders.csv"
+    path.write_text(ORDER_CSV)
+    order = read_order(path)
+    stock, pieces, min_qty = order.as_text()
+    assert (stock, pieces, min_qty) == ("6000x20", "1450,980", "5,2")
+
+
+@pytest.fixture
+def plan():
+    return solve([(13, 4), (10, 2)], [5, 2.5, 2], [3, 2, 1])
+
+
+@pytest.mark.parametrize("name", ["plan.json", "plan.csv"])
+@pytest.mark.parametrize("grouped", [True, False])
+def test_plan_export_round_trip(plan, tmp_path, name, grouped):
+    path = tmp_path / name
+    export_plan(plan, path, grouped)
+    loaded = load_plan(path)
+    assert loaded.total_waste == pytest.approx(plan.total_waste)
+    assert np.array_equal(loaded.pieces, plan.pieces)
+    assert np.array_equal(loaded.produced, plan.produced)
+    assert sorted(loaded.stock) == sorted(plan.stock)
+    assert loaded.status == plan.status
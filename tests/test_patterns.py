@@ -0,0 +1,53 @@
+import itertools
+
+import numpy as np
+import pytest
+
+import patterns
+from patterns import best_fills, exact_knapsack, lower_bound, search
+from stock_solver import SolveOptions, solve
+
+
+def brute_fill(length, piezas):
+    ranges = [range(int(length // p) + 1) for p in piezas]
+    return max(total for a in itertools.product(*ranges) if (total := float(np.dot(a, piezas))) <= length)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_best_fills_are_exact(seed):
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(50, 200, 3).astype(float)
+    piezas = rng.integers(7, 60, 4).astype(float)
+    assert list(best_fills(lengths, piezas)) == [brute_fill(length, piezas) for length in lengths]
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_exact_knapsack_prices_like_a_complete_search(seed):
+    rng = np.random.default_rng(seed)
+    weights = rng.integers(3, 80, 6).astype(float)
+    # Dual prices on top of the lengths, as in column generation
+    values = weights + rng.random(6) * 5
+    capacity = int(rng.integers(50, 300))
+    value, a, complete = exact_knapsack(capacity, weights, values)
+    expected, _, searched = search(capacity, weights, values)
+    assert complete and searched
+    assert value == pytest.approx(expected)
+    assert a @ weights <= capacity and a @ values == pytest.approx(value)
+
+
+def test_truncated_search_counts_as_a_full_bar(monkeypatch):
+    monkeypatch.setattr(patterns, "search", lambda *args: search(*args, node_limit=1))
+    # Fractional lengths use the branch and bound, which stops at once here
+    assert list(best_fills([10.5], [3.2, 2.1])) == [10.5]
+
+
+@pytest.mark.parametrize("seed", range(6))
+@pytest.mark.parametrize("engine", ["milp", "fast"])
+def test_lower_bound_never_exceeds_waste(seed, engine):
+    rng = np.random.default_rng(seed)
+    length = int(rng.integers(2000, 10000))
+    pieces = sorted({int(p) for p in rng.integers(length // 20, length // 2, 8)}, reverse=True)
+    min_qty = [1] * len(pieces)
+    plan = solve([(length, len(pieces))], pieces, min_qty, SolveOptions(engine=engine, time_limit=5))
+    assert plan.lower_bound <= plan.total_waste + 1e-9
+    assert lower_bound(np.array([length]), np.array([len(pieces)]), np.array(pieces, float)) <= plan.total_waste
@@ -0,0 +1,68 @@
+import io
+
+import numpy as np
+
+from plan_export import read_json, write_json
+from solve_service import solution
+from stock_solver import PatternTable, Plan, solve
+
+
+def big_plan():
+    return solve([(6000, 200), (4000, 50)], [1450, 980], [150, 100])
+
+
+def test_table_is_the_plan():
+    plan = big_plan()
+    table = plan.table
+    assert table.multiplicity.sum() == 250
+    assert len(table.stock) < 20
+    assert list(table.stock) == sorted(table.stock, reverse=True)
+    assert len({(s, *c) for s, c in zip(table.stock, table.counts.tolist())}) == len(table.stock)
+    # The per-bar view is only built when asked for
+    assert "counts" not in vars(plan)
+    assert plan.total_waste == plan.snap(plan.stock.sum() - (plan.counts @ plan.pieces).sum())
+    assert list(plan.produced) == list(plan.counts.sum(axis=0))
+
+
+def test_from_bars_merges_identical_bars():
+    plan = Plan.from_bars([10, 13, 10, 13], [5, 2], [0, 0], [[2, 0], [1, 4], [2, 0], [2, 1]], "Feasible")
+    assert plan.table.stock.tolist() == [13.0, 13.0, 10.0]
+    assert plan.table.counts.tolist() == [[1, 4], [2, 1], [2, 0]]
+    assert plan.table.multiplicity.tolist() == [1, 1, 2]
+    assert plan.stock.tolist() == [13.0, 13.0, 10.0, 10.0]
+    assert plan.cuts(1) == [5.0, 5.0, 2.0]
+
+
+def test_to_dict_groups_bars():
+    plan = big_plan()
+    grouped = plan.to_dict()["stockPatters"]
+    assert sum(entry["count"] for entry in grouped) == 250
+    per_bar = plan.to_dict(grouped=False)["stockPatters"]
+    assert len(per_bar) == 250
+    assert sum(entry["waste"] for entry in per_bar) == plan.total_waste
+
+
+def test_service_solution_is_grouped():
+    plan = big_plan()
+    result = solution(plan)
+    assert sum(p["count"] for p in result["patterns"]) == 250
+    assert result["waste"] == plan.total_waste
+
+
+def test_loaded_plan_keeps_the_table():
+    plan = big_plan()
+    stream = io.StringIO()
+    write_json(plan, stream)
+    stream.seek(0)
+    loaded = read_json(stream)
+    assert "stock" not in vars(loaded)
+    for got, want in zip(loaded.table, plan.table):
+        assert np.array_equal(got, want)
+    assert loaded.total_waste == plan.total_waste
+
+
+def test_empty_plan():
+    plan = Plan.from_patterns(PatternTable(np.zeros(0), np.zeros((0, 2)), np.zeros(0)), [5, 2], [0, 0], "Optimal")
+    assert plan.total_stock == 0.0
+    assert plan.to_dict()["stockPatters"] == []
+    assert plan.stock.size == 0
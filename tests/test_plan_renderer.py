@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("matplotlib")
+
+from plan_renderer import pattern_rows, render_image
+from stock_solver import PatternTable, Plan, solve
+
+
+def test_rows_are_the_pattern_table():
+    plan = solve([(6000, 200), (4000, 50)], [1450, 980], [150, 100])
+    rows = pattern_rows(plan)
+    assert len(rows) == len(plan.table.stock)
+    assert sum(mult for _, _, mult in rows) == 250
+    fig = render_image(plan)
+    assert len(fig.axes[0].get_yticks()) > 0
+
+
+def test_empty_plan_draws_nothing():
+    plan = Plan.from_patterns(PatternTable(np.zeros(0), np.zeros((0, 2)), np.zeros(0)), [5, 2], [0, 0], "Optimal")
+    fig = render_image(plan)
+    assert len(fig.axes[0].get_yticks()) == 0
@@ -0,0 +1,37 @@
+import os
+import time
+
+import pytest
+
+from benchmark import generate
+from portfolio import solve_portfolio
+from stock_solver import SolveOptions
+
+
+def _die(plan):
+    # Stands in for a strategy process killed mid-solve
+    os._exit(3)
+
+
+CRASH = ("crash", {"engine": "milp", "on_plan": _die})
+
+
+def test_strategies_race_and_the_winner_is_recorded():
+    plan = solve_portfolio([13, 10], [5, 2], [2, 0], SolveOptions(time_limit=10),
+                           strategies=[("fast", {"engine": "fast"}), ("cbc-1", {"engine": "milp", "seed": 1})])
+    assert plan.total_waste == 0
+    assert plan.trace.info["strategy"] in ("fast", "cbc-1")
+
+
+def test_dead_strategies_do_not_block_without_a_time_limit():
+    start = time.monotonic()
+    with pytest.raises(ValueError, match="exited with code 3"):
+        solve_portfolio(*generate("uniform", 30, 0), SolveOptions(time_limit=None), strategies=[CRASH])
+    assert time.monotonic() - start < 30
+
+
+def test_survivors_win_when_a_strategy_dies():
+    plan = solve_portfolio(*generate("uniform", 60, 0), SolveOptions(time_limit=None),
+                           strategies=[CRASH, ("cbc-1", {"engine": "milp"})])
+    assert plan.trace.info["strategy"] == "cbc-1"
+    assert plan.trace.info["portfolio"]["crash"]["status"] == "Error"
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from presolve import presolve
+from stock_solver import SolveOptions, solve
+
+
+def arrays(lengths, counts, piezas, lim_inf):
+    return (np.array(lengths), np.array(counts), np.array(piezas), np.array(lim_inf, dtype=float))
+
+
+def test_zero_demand_sum_of_other_pieces_is_dropped():
+    reduced = presolve(*arrays([20], [3], [10, 4, 6], [0, 1, 1]))
+    assert reduced.dropped == [0]
+    assert list(reduced.piezas) == [4, 6]
+
+
+def test_stock_holding_one_piece_kind_is_fixed():
+    reduced = presolve(*arrays([20, 5], [2, 3], [6, 4], [1, 1]))
+    assert list(reduced.types) == [0]
+    [(k, a, mult)] = reduced.fixed
+    assert (k, list(a), mult) == (1, [0, 1], 3)
+    assert reduced.fixed_waste == 3
+    # The fixed bars already cover the 4s
+    assert list(reduced.lim_inf) == [1, 0]
+    full = reduced.postsolve([(0, np.array([3, 0]), 2)])
+    assert [(k, list(a), m) for k, a, m in full] == [(0, [3, 0], 2), (1, [0, 1], 3)]
+
+
+def test_infeasible_demand_names_the_piece():
+    with pytest.raises(ValueError, match="pieces of size 12 are required but the stock can hold at most 2"):
+        presolve(*arrays([20], [2], [12], [3]))
+
+
+def test_presolve_keeps_the_optimum():
+    args = [(20, 2), (5, 3)], [6, 4, 10], [1, 1, 0]
+    with_presolve = solve(*args, SolveOptions(time_limit=10))
+    without = solve(*args, SolveOptions(time_limit=10, presolve=False))
+    assert with_presolve.presolve is not None
+    assert with_presolve.total_waste == without.total_waste
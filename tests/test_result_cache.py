@@ -0,0 +1,73 @@
+import dataclasses
+
+import numpy as np
+
+from result_cache import PlanCache, canonical_instance
+from stock_solver import SolveOptions, solve, validate_inputs
+
+
+def key(stock, pieces, min_qty, options=None):
+    return canonical_instance(*validate_inputs(stock, pieces, min_qty), options)[0]
+
+
+def test_key_ignores_order_and_scale():
+    assert key([13, 10], [5, 2], [2, 0]) == key([10, 13], [2, 5], [0, 2])
+    assert key([13, 10], [5, 2], [2, 0]) == key([1.3, 1.0], [0.5, 0.2], [2, 0])
+    assert key([13, 13], [5], [2]) == key([(13, 2)], [5], [2])
+
+
+def test_key_depends_on_solve_options():
+    base = key([13, 10], [5, 2], [2, 0], SolveOptions())
+    for change in ({"engine": "colgen"}, {"backend": "highs"}, {"precision": 0.5}, {"optional_stock": True},
+                   {"presolve": False}, {"seed": 3}):
+        assert key([13, 10], [5, 2], [2, 0], SolveOptions(**change)) != base
+
+
+def test_hit_maps_back_to_the_callers_piece_order():
+    cache = PlanCache()
+    cache.solve([13, 10], [5, 2], [2, 1])
+    plan = cache.get([10, 13], [2, 5], [1, 2])
+    assert cache.stats()["hits"] == 1
+    assert list(plan.pieces) == [2.0, 5.0]
+    assert np.all(plan.produced >= [1, 2])
+
+
+def test_time_limited_plans_only_answer_shorter_limits():
+    cache = PlanCache()
+    plan = solve([13, 10], [5, 2], [2, 0])
+    cache.put([13, 10], [5, 2], [2, 0], dataclasses.replace(plan, status="Feasible"), SolveOptions(time_limit=5))
+    assert cache.get([13, 10], [5, 2], [2, 0], SolveOptions(time_limit=5)) is not None
+    assert cache.get([13, 10], [5, 2], [2, 0], SolveOptions(time_limit=30)) is None
+    cache.put([13, 10], [5, 2], [2, 0], plan, SolveOptions(time_limit=5))
+    assert cache.get([13, 10], [5, 2], [2, 0], SolveOptions(time_limit=30)) is not None
+
+
+def test_plans_with_rounded_stock_are_hit():
+    cache = PlanCache()
+    options = SolveOptions(precision=0.1)
+    args = ([(1000.37, 3), (800.64, 2)], [250.55, 120.03], [5, 4])
+    plan = cache.solve(*args, options)
+    hit = cache.get(*args, options)
+    assert cache.stats()["hits"] == 1
+    assert hit.total_waste == plan.total_waste
+    assert list(hit.stock) == list(plan.stock)
+
+
+def test_plans_that_leave_stock_uncut_are_hit():
+    cache = PlanCache()
+    options = SolveOptions(optional_stock=True)
+    plan = cache.solve([8, 8, 5, 13], [4], [4], options)
+    assert len(plan.stock) < 4
+    hit = cache.get([8, 8, 5, 13], [4], [4], options)
+    assert cache.stats()["hits"] == 1
+    assert sorted(hit.stock) == sorted(plan.stock)
+
+
+def test_disk_cache_survives_reopening(tmp_path):
+    path = str(tmp_path / "plans.sqlite")
+    cache = PlanCache(path)
+    plan = cache.solve([13, 10], [5, 2], [2, 0])
+    cache.close()
+    reopened = PlanCache(path)
+    assert reopened.get([13, 10], [5, 2], [2, 0]).total_waste == plan.total_waste
+    reopened.close()
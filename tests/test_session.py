@@ -0,0 +1,25 @@
+from benchmark import generate
+from stock_solver import SolveOptions, SolveSession, solve
+
+
+def test_changed_quantity_updates_the_model():
+    stock, pieces, min_qty = generate("uniform", 10, 0)[:3]
+    session = SolveSession()
+    solve(stock, pieces, min_qty, SolveOptions(time_limit=20, session=session))
+    assert (session.rebuilds, session.updates) == (1, 0)
+
+    more = list(min_qty)
+    more[0] += 1
+    reused = solve(stock, pieces, more, SolveOptions(time_limit=20, session=session))
+    assert (session.rebuilds, session.updates) == (1, 1)
+    fresh = solve(stock, pieces, more, SolveOptions(time_limit=20))
+    assert reused.total_waste == fresh.total_waste
+
+
+def test_changed_lengths_rebuild_the_model():
+    stock, pieces, min_qty = generate("uniform", 10, 0)[:3]
+    session = SolveSession()
+    solve(stock, pieces, min_qty, SolveOptions(time_limit=20, session=session))
+    shorter = [p - 1 for p in pieces]
+    solve(stock, shorter, min_qty, SolveOptions(time_limit=20, session=session))
+    assert session.rebuilds == 2
@@ -0,0 +1,83 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from solve_service import HTTPError, SolveService
+
+
+def body(pieces, min_qty):
+    return json.dumps({"stockSizes": [13, 10], "requiredSizes": pieces, "minQuantities": min_qty}).encode()
+
+
+def test_full_queue_is_refused_and_duplicates_wait():
+    async def run():
+        service = SolveService(workers=1, max_queue=1, timeout=0.5)
+        # No dispatcher, so queued requests stay queued
+        service.queue = asyncio.Queue(maxsize=1)
+        try:
+            first = asyncio.create_task(service.solve(body([5, 2], [2, 0])))
+            duplicate = asyncio.create_task(service.solve(body([2, 5], [0, 2])))
+            await asyncio.sleep(0)
+            with pytest.raises(HTTPError) as refused:
+                await service.solve(body([4, 3], [1, 1]))
+            for task in (first, duplicate):
+                with pytest.raises(HTTPError) as timed_out:
+                    await task
+                assert timed_out.value.status == 504
+        finally:
+            await service.close()
+        return service, refused.value
+
+    service, refused = asyncio.run(run())
+    assert refused.status == 503
+    assert refused.headers["Retry-After"]
+    assert service.stats["deduplicated"] == 1
+    assert service.stats["rejected"] == 1
+
+
+def test_solves_and_then_answers_from_cache():
+    async def run():
+        service = SolveService(workers=1, timeout=30)
+        service.start()
+        try:
+            first = await service.solve(body([5, 2], [2, 0]))
+            second = await service.solve(body([5, 2], [2, 0]))
+        finally:
+            await service.close()
+        return service, first, second
+
+    service, first, second = asyncio.run(run())
+    assert first["status"] == "optimal"
+    assert second == first
+    assert service.stats["solved"] == 1
+    assert service.stats["from_cache"] == 1
+
+
+def run_burst(workers, count):
+    async def run():
+        service = SolveService(workers=workers, timeout=30)
+        # Threads instead of processes, so the test needs no spawned interpreters
+        service.pool.shutdown()
+        service.pool = ThreadPoolExecutor(max_workers=workers)
+        service.start()
+        try:
+            await asyncio.gather(*(service.solve(body([5, 2 + k], [2, 1])) for k in range(count)))
+        finally:
+            await service.close()
+        return service.stats
+
+    return asyncio.run(run())
+
+
+def test_idle_workers_are_not_left_waiting_behind_a_batch():
+    stats = run_burst(workers=4, count=4)
+    assert stats["batches"] == 4
+    assert stats["solved"] == 4
+
+
+def test_jobs_are_batched_when_every_worker_is_busy():
+    stats = run_burst(workers=1, count=4)
+    assert stats["solved"] == 4
+    assert stats["batches"] < 4
@@ -0,0 +1,30 @@
+import pytest
+
+from benchmark import generate
+from solve_trace import Trace
+from stock_solver import SolveOptions, solve
+
+
+def test_sub_solves_are_summed_and_kept():
+    trace = Trace()
+    trace.record_solver("cbc", {"nodes": 3, "iterations": 10, "objective": 5.0, "best_bound": 4.0})
+    trace.record_solver("cbc", {"nodes": 2, "iterations": 7, "objective": 1.0, "best_bound": 1.0})
+    assert trace.solver["solves"] == 2
+    assert trace.solver["nodes"] == 5 and trace.solver["iterations"] == 17
+    assert [s["objective"] for s in trace.solves] == [5.0, 1.0]
+
+
+def test_stats_are_recorded_in_the_plans_units():
+    trace = Trace()
+    trace.set_units(0.1, 2.0, 1)
+    trace.record_solver("cbc", {"objective": 10.0, "best_bound": 8.0})
+    assert trace.solves[0]["objective"] == pytest.approx(1.2)
+    assert trace.solves[0]["gap"] == pytest.approx(0.2 / 1.2)
+
+
+def test_summary_reports_the_plans_bound():
+    plan = solve(*generate("uniform", 30, 0), SolveOptions(engine="colgen", time_limit=5))
+    assert plan.trace.solver["solves"] > 1
+    assert set(plan.trace.phases) >= {"validate", "engine", "verify"}
+    line = plan.trace.summary()[-1]
+    assert line.startswith(f"Plan: {plan.status}") and f"bound {plan.lower_bound:g}" in line
@@ -0,0 +1,23 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+HEAVY = ("numpy", "pulp", "matplotlib")
+
+
+def loaded_after(module):
+    code = f"import sys, {module}; print(' '.join(m for m in {HEAVY!r} if m in sys.modules))"
+    return subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                          cwd=ROOT).stdout.split()
+
+
+def test_solve_worker_imports_no_solver_stack():
+    assert loaded_after("solve_worker") == []
+
+
+def test_app_imports_no_solver_stack():
+    pytest.importorskip("customtkinter")
+    assert loaded_after("stock_cutter_gui") == []